@@ -0,0 +1,151 @@
+"""
+Deterministic stand-in for the crew's LLMs.
+
+``ScriptedLLM`` replays a fixed list of steps in CrewAI's ReAct text
+format instead of calling a model, so a full crew run exercises the real
+agents, tools and NiFi client with no network and no randomness. A step
+is either a tool call or a final answer:
+
+    {"tool": "create_nifi_process_group", "input": {"name": "Bench"}, "save_as": "pg"}
+    {"tool": "add_nifi_processor", "input": {"process_group_id": "${pg}", ...}, "save_as": "p0"}
+    {"final": "done"}
+
+``save_as`` stores the id (or the whole text) of the tool's observation,
+and ``${name}`` placeholders in later inputs are replaced with it. Once
+the script runs out every call answers with the last final answer.
+"""
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from crewai import BaseLLM
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from nifi_nl_builder.metrics import record_llm_call  # noqa: E402
+
+_UUID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+_PLACEHOLDER = re.compile(r"\$\{(\w+)\}")
+
+
+def _content(message):
+    return message.get("content", "") if isinstance(message, dict) else str(message)
+
+
+class ScriptedLLM(BaseLLM):
+    """Replay ``steps`` one completion at a time"""
+
+    def __init__(self, steps, model="scripted", latency=0.0):
+        super().__init__(model=model)
+        self.steps = list(steps)
+        self.latency = latency
+        self.position = 0
+        self.values = {}
+        self.calls = 0
+        self._pending = None
+
+    def _capture(self, messages):
+        """Store the observation of the previous tool step under its ``save_as`` name"""
+        if self._pending is None:
+            return
+        last = _content(messages[-1]) if isinstance(messages, list) and messages else str(messages)
+        # CrewAI may append its tool instructions (which mention "Observation:") after the result
+        observation = last.split("Observation:", 1)[-1].split("\n\n\n", 1)[0].strip()
+        match = _UUID.search(observation)
+        self.values[self._pending] = match.group(0) if match else observation
+        self._pending = None
+
+    def _fill(self, value):
+        if isinstance(value, str):
+            return _PLACEHOLDER.sub(lambda m: str(self.values.get(m.group(1), m.group(0))), value)
+        if isinstance(value, dict):
+            return {k: self._fill(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._fill(v) for v in value]
+        return value
+
+    def next_completion(self, messages):
+        self._capture(messages)
+        if self.position >= len(self.steps):
+            finals = [s["final"] for s in self.steps if "final" in s]
+            return f"Thought: I now know the final answer\nFinal Answer: {self._fill(finals[-1]) if finals else 'done'}"
+        step = self.steps[self.position]
+        self.position += 1
+        if "final" in step:
+            return f"Thought: I now know the final answer\nFinal Answer: {self._fill(step['final'])}"
+        self._pending = step.get("save_as")
+        return (f"Thought: step {self.position} of the script\n"
+                f"Action: {step['tool']}\n"
+                f"Action Input: {json.dumps(self._fill(step.get('input', {})))}")
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        completion = self.next_completion(messages)
+        self.calls += 1
+        prompt = "".join(_content(m) for m in messages) if isinstance(messages, list) else str(messages)
+        # ~4 characters per token, close enough to compare runs
+        record_llm_call(self.model, time.perf_counter() - started, len(prompt) // 4, len(completion) // 4)
+        return completion
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return False
+
+    def get_context_window_size(self):
+        return 1_000_000
+
+
+def build_flow_script(processors, connections, flow_name="Benchmark Flow"):
+    """Tool steps that create a group, every processor and every connection by hand.
+
+    ``processors`` and ``connections`` use the ``templates/*.json`` shape.
+    CrewAI validates tool input against the full signature, so optional
+    arguments are always passed.
+    """
+    steps = [{"tool": "create_nifi_process_group", "input": {"name": flow_name, "parent": "root"}, "save_as": "pg"}]
+    for i, processor in enumerate(processors):
+        steps.append({"tool": "add_nifi_processor",
+                      "input": {"process_group_id": "${pg}", "processor_type": processor["type"],
+                                "config": processor.get("config", {})},
+                      "save_as": f"p{i}"})
+    index = {processor["name"]: i for i, processor in enumerate(processors)}
+    for connection in connections:
+        steps.append({"tool": "connect_nifi_processors",
+                      "input": {"source_id": f"${{p{index[connection['source']]}}}",
+                                "target_id": f"${{p{index[connection['target']]}}}",
+                                "process_group_id": "${pg}"}})
+    steps.append({"final": "${pg}"})
+    return steps
+
+
+def bulk_flow_script(spec):
+    """One ``build_nifi_flow_from_spec`` call for the whole spec"""
+    return [
+        {"tool": "build_nifi_flow_from_spec",
+         "input": {"flow_name": spec["name"], "processors": spec["processors"],
+                   "connections": spec["connections"], "parent_id": "root",
+                   "process_group_id": ""},
+         "save_as": "pg"},
+        {"final": "${pg}"},
+    ]
+
+
+def crew_scripts(spec, bulk=False):
+    """Scripts for every agent of the default crew building ``spec``"""
+    builder = bulk_flow_script(spec) if bulk else build_flow_script(spec["processors"], spec["connections"], spec["name"])
+    return {
+        "nl_parser": [{"final": "source_type: generate\ntransforms: [replace]\ndestination_type: file"}],
+        "flow_planner": [
+            {"tool": "search_nifi_templates", "input": {"requirements": "generate replace file", "top_k": 3}},
+            {"final": "simple_logging: closest match"},
+        ],
+        "flow_builder": builder,
+        "cdf_deployer": [{"final": "crn:cdp:df:benchmark:deployment/0"}],
+    }
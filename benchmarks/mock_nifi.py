@@ -0,0 +1,785 @@
+"""
+In-memory stand-in for the NiFi REST API used by ``nifi_api``.
+
+Implements process groups, processors, connections, queues, bulk
+scheduling, recursive status, flow download/upload and templates with
+NiFi's optimistic-locking rules:
+
+- every write must carry the current revision (409 otherwise)
+- a processor is invalid until each relationship is connected or auto-terminated
+- running components cannot be modified, deleted or unwired
+- connections must be emptied before they are deleted
+
+Latency, jitter, random errors and revision conflicts can be injected, and
+every call is counted per endpoint template so benchmarks can report API
+call counts. Run standalone for manual testing:
+
+    python benchmarks/mock_nifi.py --port 8080 --latency 0.02 --jitter 0.01
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from nifi_nl_builder.tools.compiler import RELATIONSHIPS, STANDARD, _bundle  # noqa: E402
+
+DEFAULT_RELATIONSHIPS = ["success", "failure"]
+NIFI_VERSION = "2.0.0"
+# Properties the mock's processor definitions mark as required
+REQUIRED_PROPERTIES = {"PutFile": ["Directory"], "GetFile": ["Input Directory"]}
+BACKPRESSURE_OBJECTS = 10000
+
+_ID = r"([^/]+)"
+_UUID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+class Conflict(Exception):
+    """Maps to HTTP 409"""
+
+
+class NotFound(Exception):
+    """Maps to HTTP 404"""
+
+
+class BadRequest(Exception):
+    """Maps to HTTP 400"""
+
+
+def relationships_for(ptype):
+    return list(RELATIONSHIPS.get(ptype.rsplit(".", 1)[-1], DEFAULT_RELATIONSHIPS))
+
+
+def _processor_types():
+    """Types the mock advertises: the compiler's vocabularies plus its relationship table"""
+    from nifi_nl_builder.tools.compiler import SOURCE_TYPES, TRANSFORM_TYPES, DESTINATION_TYPES
+
+    full = {entry[0] for table in (SOURCE_TYPES, TRANSFORM_TYPES, DESTINATION_TYPES) for entry in table.values()}
+    known = {t.rsplit(".", 1)[-1] for t in full}
+    full.update(STANDARD + short for short in RELATIONSHIPS if short not in known)
+    return {ptype: _bundle(ptype) for ptype in sorted(full)}
+
+
+def processor_definition(ptype):
+    short = ptype.rsplit(".", 1)[-1]
+    return {
+        "type": ptype,
+        "supportedRelationships": [{"name": r, "description": ""} for r in relationships_for(ptype)],
+        "supportsDynamicProperties": True,
+        "supportsDynamicRelationships": short == "RouteOnAttribute",
+        "propertyDescriptors": {
+            name: {"name": name, "displayName": name, "required": True}
+            for name in REQUIRED_PROPERTIES.get(short, [])
+        },
+    }
+
+
+class FlowState:
+    """The mock's flow graph; every method runs under ``lock``"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.root_id = str(uuid.uuid4())
+        self.groups = {self.root_id: {"id": self.root_id, "name": "NiFi Flow", "parent": None, "version": 0}}
+        self.processors = {}
+        self.connections = {}
+        self.drop_requests = {}
+        self.templates = {}
+
+    # -- lookups -----------------------------------------------------------
+
+    def group_id(self, gid):
+        gid = self.root_id if gid == "root" else gid
+        if gid not in self.groups:
+            raise NotFound(f"Unable to find process group with id '{gid}'")
+        return gid
+
+    def processor(self, pid):
+        if pid not in self.processors:
+            raise NotFound(f"Unable to find processor with id '{pid}'")
+        return self.processors[pid]
+
+    def connection(self, cid):
+        if cid not in self.connections:
+            raise NotFound(f"Unable to find connection with id '{cid}'")
+        return self.connections[cid]
+
+    def subtree(self, gid):
+        ids, frontier = {gid}, [gid]
+        while frontier:
+            parent = frontier.pop()
+            for group in self.groups.values():
+                if group["parent"] == parent and group["id"] not in ids:
+                    ids.add(group["id"])
+                    frontier.append(group["id"])
+        return ids
+
+    @staticmethod
+    def check_revision(component, revision):
+        version = (revision or {}).get("version")
+        if version is None or int(version) != component["version"]:
+            raise Conflict(f"{version} is not the most up-to-date revision. "
+                           f"This component appears to have been modified ({component['version']})")
+
+    # -- processors --------------------------------------------------------
+
+    def settle(self, processor):
+        """Apply a scheduled state change once its delay has passed"""
+        pending = processor.get("pending")
+        if pending and time.time() >= pending[1]:
+            processor["state"] = pending[0]
+            processor.pop("pending")
+
+    def connected_relationships(self, pid):
+        return {r for c in self.connections.values() if c["source"] == pid for r in c["relationships"]}
+
+    def validation_errors(self, processor):
+        connected = self.connected_relationships(processor["id"])
+        return [f"'Relationship {r}' is invalid because Relationship '{r}' is not connected to any "
+                f"component and is not auto-terminated"
+                for r in processor["relationships"] if r not in connected and r not in processor["auto"]]
+
+    def run_status(self, processor):
+        self.settle(processor)
+        if processor["state"] == "RUNNING":
+            return "Running"
+        if processor["state"] == "DISABLED":
+            return "Disabled"
+        return "Invalid" if self.validation_errors(processor) else "Stopped"
+
+    def processor_entity(self, p):
+        self.settle(p)
+        errors = self.validation_errors(p)
+        return {
+            "id": p["id"],
+            "revision": {"version": p["version"]},
+            "component": {
+                "id": p["id"],
+                "name": p["name"],
+                "type": p["type"],
+                "parentGroupId": p["group"],
+                "state": p["state"],
+                "config": dict(p["config"], autoTerminatedRelationships=sorted(p["auto"])),
+                "relationships": [{"name": r, "autoTerminate": r in p["auto"]} for r in p["relationships"]],
+                "validationErrors": errors,
+                "validationStatus": "INVALID" if errors else "VALID",
+            },
+            "status": {"runStatus": self.run_status(p)},
+        }
+
+    def add_processor(self, gid, component, pid=None):
+        gid = self.group_id(gid)
+        if "type" not in component:
+            raise BadRequest("The type of processor to create must be specified.")
+        config = dict(component.get("config") or {})
+        processor = {
+            "id": pid or str(uuid.uuid4()),
+            "group": gid,
+            "name": component.get("name") or component["type"].rsplit(".", 1)[-1],
+            "type": component["type"],
+            "state": "STOPPED",
+            "relationships": relationships_for(component["type"]),
+            "auto": set(config.pop("autoTerminatedRelationships", None) or []),
+            "config": config,
+            "version": 1,
+        }
+        self.processors[processor["id"]] = processor
+        return processor
+
+    def update_processor(self, p, body):
+        self.check_revision(p, body.get("revision"))
+        self.settle(p)
+        component = body.get("component", {})
+        state = component.get("state")
+        if state and state != p["state"]:
+            if state == "RUNNING" and self.validation_errors(p):
+                raise Conflict(f"{p['id']} is not in a valid state: {'; '.join(self.validation_errors(p))}")
+            p["state"] = state
+        changes = {k: v for k, v in component.items() if k not in ("id", "state", "position")}
+        if changes and p["state"] == "RUNNING" and not state:
+            raise Conflict(f"{p['id']} is currently running and cannot be modified")
+        if "name" in changes:
+            p["name"] = changes["name"]
+        if "config" in changes:
+            config = dict(changes["config"])
+            if "autoTerminatedRelationships" in config:
+                p["auto"] = set(config.pop("autoTerminatedRelationships") or [])
+            properties = dict(p["config"].get("properties") or {})
+            properties.update(config.pop("properties", None) or {})
+            p["config"] = dict(p["config"], **config, properties=properties)
+        if "relationships" in changes:
+            p["auto"] = {r["name"] for r in changes["relationships"] if r.get("autoTerminate")}
+        p["version"] += 1
+
+    def delete_processor(self, p, version):
+        self.check_revision(p, {"version": version})
+        self.settle(p)
+        if p["state"] == "RUNNING":
+            raise Conflict(f"Processor {p['id']} is currently running")
+        if any(p["id"] in (c["source"], c["destination"]) for c in self.connections.values()):
+            raise Conflict(f"Processor {p['id']} has incoming or outgoing connections")
+        del self.processors[p["id"]]
+
+    # -- connections -------------------------------------------------------
+
+    def connection_entity(self, c):
+        return {
+            "id": c["id"],
+            "revision": {"version": c["version"]},
+            "component": {
+                "id": c["id"],
+                "parentGroupId": c["group"],
+                "name": c.get("name", ""),
+                "source": {"id": c["source"], "type": "PROCESSOR", "groupId": self.processors[c["source"]]["group"]},
+                "destination": {"id": c["destination"], "type": "PROCESSOR",
+                                "groupId": self.processors[c["destination"]]["group"]},
+                "selectedRelationships": list(c["relationships"]),
+                "availableRelationships": self.processors[c["source"]]["relationships"],
+                "backPressureObjectThreshold": BACKPRESSURE_OBJECTS,
+            },
+            "status": {"aggregateSnapshot": {"flowFilesQueued": c["queued"]}},
+        }
+
+    def add_connection(self, gid, component, cid=None):
+        gid = self.group_id(gid)
+        source_id = component.get("source", {}).get("id")
+        target_id = component.get("destination", {}).get("id")
+        if source_id not in self.processors or target_id not in self.processors:
+            raise NotFound(f"Unable to find connection endpoints {source_id} -> {target_id}")
+        source = self.processors[source_id]
+        relationships = list(component.get("selectedRelationships") or [])
+        if not relationships:
+            raise BadRequest("Connections from processors must specify at least one relationship.")
+        unknown = [r for r in relationships if r not in source["relationships"]]
+        if unknown:
+            raise BadRequest(f"Unknown relationship(s) {unknown} for {source['type']}")
+        connection = {"id": cid or str(uuid.uuid4()), "group": gid, "source": source_id,
+                      "destination": target_id, "relationships": relationships,
+                      "name": component.get("name", ""), "queued": 0, "version": 1}
+        self.connections[connection["id"]] = connection
+        return connection
+
+    def delete_connection(self, c, version):
+        self.check_revision(c, {"version": version})
+        for endpoint in (c["source"], c["destination"]):
+            processor = self.processors[endpoint]
+            self.settle(processor)
+            if processor["state"] == "RUNNING":
+                raise Conflict(f"Connection {c['id']} cannot be removed while {endpoint} is running")
+        if c["queued"]:
+            raise Conflict(f"Cannot delete connection {c['id']} because it has {c['queued']} queued flowfiles")
+        del self.connections[c["id"]]
+
+    # -- process groups ----------------------------------------------------
+
+    def group_entity(self, g):
+        return {"id": g["id"], "revision": {"version": g["version"]},
+                "component": {"id": g["id"], "name": g["name"], "parentGroupId": g["parent"],
+                              "comments": g.get("comments", "")}}
+
+    def add_group(self, parent, name, gid=None, comments=""):
+        parent = self.group_id(parent)
+        group = {"id": gid or str(uuid.uuid4()), "name": name, "parent": parent, "version": 1,
+                 "comments": comments}
+        self.groups[group["id"]] = group
+        return group
+
+    def delete_group(self, g, version):
+        self.check_revision(g, {"version": version})
+        members = self.subtree(g["id"])
+        for p in self.processors.values():
+            self.settle(p)
+            if p["group"] in members and p["state"] == "RUNNING":
+                raise Conflict(f"Cannot delete process group {g['id']}: processor {p['id']} is running")
+        if any(c["group"] in members and c["queued"] for c in self.connections.values()):
+            raise Conflict(f"Cannot delete process group {g['id']}: a connection has queued data")
+        for cid in [c["id"] for c in self.connections.values() if c["group"] in members]:
+            del self.connections[cid]
+        for pid in [p["id"] for p in self.processors.values() if p["group"] in members]:
+            del self.processors[pid]
+        for member in members:
+            del self.groups[member]
+
+    def schedule(self, gid, state, delay):
+        members = self.subtree(self.group_id(gid))
+        for p in self.processors.values():
+            if p["group"] not in members:
+                continue
+            self.settle(p)
+            if state == "RUNNING" and self.validation_errors(p):
+                continue
+            if p["state"] != state:
+                p["pending"] = (state, time.time() + delay)
+                p["version"] += 1
+
+    def group_status(self, gid, recursive):
+        processors = [p for p in self.processors.values() if p["group"] == gid]
+        connections = [c for c in self.connections.values() if c["group"] == gid]
+        children = [g for g in self.groups.values() if g["parent"] == gid]
+        snapshot = {
+            "id": gid,
+            "name": self.groups[gid]["name"],
+            "processorStatusSnapshots": [{
+                "id": p["id"],
+                "processorStatusSnapshot": {
+                    "id": p["id"], "groupId": gid, "name": p["name"], "type": p["type"].rsplit(".", 1)[-1],
+                    "runStatus": self.run_status(p), "flowFilesIn": 0, "bytesIn": 0, "flowFilesOut": 0,
+                    "bytesOut": 0, "bytesRead": 0, "bytesWritten": 0, "taskCount": 0, "activeThreadCount": 0,
+                },
+            } for p in processors],
+            "connectionStatusSnapshots": [{
+                "id": c["id"],
+                "connectionStatusSnapshot": {
+                    "id": c["id"], "groupId": gid, "name": c.get("name", ""),
+                    "sourceId": c["source"], "sourceName": self.processors[c["source"]]["name"],
+                    "destinationId": c["destination"], "destinationName": self.processors[c["destination"]]["name"],
+                    "flowFilesIn": 0, "bytesIn": 0, "flowFilesOut": 0, "bytesOut": 0,
+                    "flowFilesQueued": c["queued"], "bytesQueued": c["queued"] * 1024,
+                    "percentUseCount": min(100, c["queued"] * 100 // BACKPRESSURE_OBJECTS), "percentUseBytes": 0,
+                },
+            } for c in connections],
+            "processGroupStatusSnapshots": [],
+        }
+        if recursive:
+            snapshot["processGroupStatusSnapshots"] = [
+                {"id": g["id"], "processGroupStatusSnapshot": self.group_status(g["id"], True)} for g in children
+            ]
+        nested = [s["processGroupStatusSnapshot"] for s in snapshot["processGroupStatusSnapshots"]]
+        snapshot["flowFilesQueued"] = sum(c["queued"] for c in connections) + sum(s["flowFilesQueued"] for s in nested)
+        snapshot["bytesQueued"] = snapshot["flowFilesQueued"] * 1024
+        for field in ("flowFilesIn", "bytesIn", "flowFilesOut", "bytesOut", "activeThreadCount"):
+            snapshot[field] = 0
+        return snapshot
+
+    # -- flow definitions --------------------------------------------------
+
+    def definition(self, gid):
+        group = self.groups[gid]
+        return {
+            "identifier": gid,
+            "name": group["name"],
+            "componentType": "PROCESS_GROUP",
+            "processGroups": [self.definition(g["id"]) for g in self.groups.values() if g["parent"] == gid],
+            "processors": [{
+                "identifier": p["id"], "name": p["name"], "type": p["type"], "groupIdentifier": gid,
+                "properties": dict(p["config"].get("properties") or {}),
+                "autoTerminatedRelationships": sorted(p["auto"]),
+                "schedulingPeriod": p["config"].get("schedulingPeriod", "0 sec"),
+                "componentType": "PROCESSOR",
+            } for p in self.processors.values() if p["group"] == gid],
+            "connections": [{
+                "identifier": c["id"], "name": c.get("name", ""), "groupIdentifier": gid,
+                "source": {"id": c["source"], "type": "PROCESSOR", "groupId": self.processors[c["source"]]["group"]},
+                "destination": {"id": c["destination"], "type": "PROCESSOR",
+                                "groupId": self.processors[c["destination"]]["group"]},
+                "selectedRelationships": list(c["relationships"]),
+                "componentType": "CONNECTION",
+            } for c in self.connections.values() if c["group"] == gid],
+            "inputPorts": [], "outputPorts": [], "funnels": [], "labels": [],
+            "controllerServices": [], "remoteProcessGroups": [],
+        }
+
+    def instantiate(self, contents, parent, name=None):
+        """Create a group from versioned ``flowContents``, with fresh ids"""
+        group = self.add_group(parent, name or contents.get("name", "Uploaded Flow"))
+        ids = {}
+        for child in contents.get("processGroups", []):
+            self.instantiate(child, group["id"])
+        for processor in contents.get("processors", []):
+            created = self.add_processor(group["id"], {
+                "type": processor["type"],
+                "name": processor.get("name"),
+                "config": {
+                    "properties": processor.get("properties") or {},
+                    "autoTerminatedRelationships": processor.get("autoTerminatedRelationships") or [],
+                    "schedulingPeriod": processor.get("schedulingPeriod", "0 sec"),
+                },
+            })
+            ids[processor["identifier"]] = created["id"]
+        for connection in contents.get("connections", []):
+            source, target = ids.get(connection["source"]["id"]), ids.get(connection["destination"]["id"])
+            if source is None or target is None:
+                raise BadRequest(f"Connection {connection.get('identifier')} references a component outside the flow")
+            self.add_connection(group["id"], {
+                "source": {"id": source}, "destination": {"id": target},
+                "selectedRelationships": connection.get("selectedRelationships"),
+                "name": connection.get("name", ""),
+            })
+        return group
+
+
+class MockNiFiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, error_statuses=(503,),
+                 conflict_rate=0.0, schedule_delay=0.2, seed=0):
+        super().__init__(address, MockNiFiHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.processor_types = _processor_types()
+        self.conflict_rate = conflict_rate
+        self.schedule_delay = schedule_delay
+        self.random = random.Random(seed)
+        self.state = FlowState()
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.calls = 0
+            self.by_route = {}
+            self.injected = {"errors": 0, "conflicts": 0}
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                "calls": self.calls,
+                "by_route": dict(sorted(self.by_route.items())),
+                "injected": dict(self.injected),
+                "groups": len(self.state.groups),
+                "processors": len(self.state.processors),
+                "connections": len(self.state.connections),
+            }
+
+    def roll(self, probability):
+        with self.stats_lock:
+            return probability > 0 and self.random.random() < probability
+
+    def delay(self):
+        with self.stats_lock:
+            delay = self.latency + (self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class MockNiFiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; avoid the Nagle/delayed-ACK stall
+    disable_nagle_algorithm = True
+    server_version = "MockNiFi/2.0"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _send(self, status, payload=None, content_type="application/json", headers=None):
+        if isinstance(payload, (dict, list)):
+            data = json.dumps(payload).encode()
+        elif isinstance(payload, str):
+            data, content_type = payload.encode(), "text/plain"
+        else:
+            data = b""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _form(self, raw):
+        """Parse a multipart/form-data body into {name: bytes}"""
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode()
+        message = BytesParser(policy=HTTP).parsebytes(header + raw)
+        return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+                for part in message.iter_parts()}
+
+    def _handle(self, method):
+        server = self.server
+        url = urlparse(self.path)
+        path, query = url.path, {k: v[0] for k, v in parse_qs(url.query).items()}
+        raw = self._read_body()
+
+        if path.startswith("/__mock__/"):
+            return self._control(method, path)
+
+        route = _UUID.sub("{id}", path.replace("/process-groups/root", "/process-groups/{id}"))
+        with server.stats_lock:
+            server.calls += 1
+            server.by_route[f"{method} {route}"] = server.by_route.get(f"{method} {route}", 0) + 1
+
+        server.delay()
+        if server.roll(server.error_rate):
+            with server.stats_lock:
+                server.injected["errors"] += 1
+            status = server.random.choice(server.error_statuses)
+            return self._send(status, f"Injected error {status}")
+
+        try:
+            if self.headers.get("Content-Type", "").startswith("multipart/form-data"):
+                body = self._form(raw)
+            else:
+                body = json.loads(raw) if raw else {}
+            with server.state.lock:
+                status, payload = self._dispatch(method, path, query, body)
+        except Conflict as e:
+            status, payload = 409, str(e)
+        except NotFound as e:
+            status, payload = 404, str(e)
+        except (BadRequest, KeyError, ValueError) as e:
+            status, payload = 400, str(e)
+
+        if isinstance(payload, tuple):
+            return self._send(status, *payload)
+        return self._send(status, payload)
+
+    def _inject_conflict(self, component):
+        """Simulate another client editing ``component`` first"""
+        if self.server.roll(self.server.conflict_rate):
+            with self.server.stats_lock:
+                self.server.injected["conflicts"] += 1
+            component["version"] += 1
+
+    def _dispatch(self, method, path, query, body):
+        state, server = self.server.state, self.server
+
+        m = re.fullmatch(f"/nifi-api/process-groups/{_ID}/process-groups/upload", path)
+        if m and method == "POST":
+            definition = json.loads(body["file"])
+            name = (body.get("groupName") or b"").decode() or None
+            group = state.instantiate(definition["flowContents"], m.group(1), name)
+            return 201, state.group_entity(group)
+
+        m = re.fullmatch(f"/nifi-api/process-groups/{_ID}/process-groups", path)
+        if m and method == "POST":
+            group = state.add_group(m.group(1), body["component"]["name"],
+                                    comments=body["component"].get("comments", ""))
+            return 201, state.group_entity(group)
+        if m and method == "GET":
+            gid = state.group_id(m.group(1))
+            return 200, {"processGroups": [state.group_entity(g) for g in state.groups.values() if g["parent"] == gid]}
+
+        m = re.fullmatch(f"/nifi-api/process-groups/{_ID}/processors", path)
+        if m and method == "POST":
+            return 201, state.processor_entity(state.add_processor(m.group(1), body["component"]))
+        if m and method == "GET":
+            gid = state.group_id(m.group(1))
+            return 200, {"processors": [state.processor_entity(p) for p in state.processors.values() if p["group"] == gid]}
+
+        m = re.fullmatch(f"/nifi-api/process-groups/{_ID}/connections", path)
+        if m and method == "POST":
+            return 201, state.connection_entity(state.add_connection(m.group(1), body["component"]))
+        if m and method == "GET":
+            gid = state.group_id(m.group(1))
+            return 200, {"connections": [state.connection_entity(c) for c in state.connections.values() if c["group"] == gid]}
+
+        m = re.fullmatch(f"/nifi-api/process-groups/{_ID}/download", path)
+        if m and method == "GET":
+            gid = state.group_id(m.group(1))
+            return 200, {"flowContents": state.definition(gid), "externalControllerServices": {},
+                         "parameterContexts": {}, "flowEncodingVersion": "1.0"}
+
+        m = re.fullmatch(f"/nifi-api/process-groups/{_ID}/templates", path)
+        if m and method == "POST":
+            gid = state.group_id(m.group(1))
+            template_id = str(uuid.uuid4())
+            state.templates[template_id] = state.definition(gid)
+            return 201, {"id": template_id, "template": {"id": template_id, "name": body.get("name")}}
+
+        m = re.fullmatch(f"/nifi-api/process-groups/{_ID}/template-instance", path)
+        if m and method == "POST":
+            template = state.templates.get(body.get("templateId")) or {"processors": [], "connections": []}
+            group = state.instantiate(template, m.group(1))
+            return 201, {"flow": {"processGroups": [state.group_entity(group)]}}
+
+        m = re.fullmatch(f"/nifi-api/process-groups/{_ID}", path)
+        if m:
+            group = state.groups[state.group_id(m.group(1))]
+            if method == "GET":
+                return 200, state.group_entity(group)
+            if method == "PUT":
+                self._inject_conflict(group)
+                state.check_revision(group, body.get("revision"))
+                group["name"] = body.get("component", {}).get("name", group["name"])
+                group["version"] += 1
+                return 200, state.group_entity(group)
+            if method == "DELETE":
+                self._inject_conflict(group)
+                entity = state.group_entity(group)
+                state.delete_group(group, query.get("version"))
+                return 200, entity
+
+        m = re.fullmatch(f"/nifi-api/processors/{_ID}", path)
+        if m:
+            processor = state.processor(m.group(1))
+            if method == "GET":
+                return 200, state.processor_entity(processor)
+            if method == "PUT":
+                self._inject_conflict(processor)
+                state.update_processor(processor, body)
+                return 200, state.processor_entity(processor)
+            if method == "DELETE":
+                self._inject_conflict(processor)
+                entity = state.processor_entity(processor)
+                state.delete_processor(processor, query.get("version"))
+                return 200, entity
+
+        m = re.fullmatch(f"/nifi-api/connections/{_ID}", path)
+        if m:
+            connection = state.connection(m.group(1))
+            if method == "GET":
+                return 200, state.connection_entity(connection)
+            if method == "DELETE":
+                self._inject_conflict(connection)
+                entity = state.connection_entity(connection)
+                state.delete_connection(connection, query.get("version"))
+                return 200, entity
+
+        m = re.fullmatch(f"/nifi-api/flowfile-queues/{_ID}/drop-requests", path)
+        if m and method == "POST":
+            connection = state.connection(m.group(1))
+            request_id = str(uuid.uuid4())
+            dropped, connection["queued"] = connection["queued"], 0
+            state.drop_requests[request_id] = {
+                "id": request_id, "finished": True, "percentCompleted": 100,
+                "droppedCount": dropped, "currentCount": 0, "originalCount": dropped,
+            }
+            return 202, {"dropRequest": state.drop_requests[request_id]}
+        m = re.fullmatch(f"/nifi-api/flowfile-queues/{_ID}/drop-requests/{_ID}", path)
+        if m:
+            request = state.drop_requests.get(m.group(2))
+            if request is None:
+                raise NotFound(f"Unable to find drop request {m.group(2)}")
+            if method == "DELETE":
+                state.drop_requests.pop(m.group(2))
+            return 200, {"dropRequest": request}
+
+        if path == "/nifi-api/flow/about" and method == "GET":
+            return 200, {"about": {"title": "NiFi", "version": NIFI_VERSION, "buildRevision": "mock"}}
+        if path == "/nifi-api/flow/processor-types" and method == "GET":
+            etag = f'"{NIFI_VERSION}-{len(server.processor_types)}"'
+            if self.headers.get("If-None-Match") == etag:
+                return 304, (None, "application/json", {"ETag": etag})
+            types = [{"type": t, "bundle": b, "description": "", "tags": []} for t, b in server.processor_types.items()]
+            return 200, ({"processorTypes": types}, "application/json", {"ETag": etag})
+        m = re.fullmatch(f"/nifi-api/flow/processor-definition/{_ID}/{_ID}/{_ID}/{_ID}", path)
+        if m and method == "GET":
+            if m.group(4) not in server.processor_types:
+                raise NotFound(f"Unknown processor type {m.group(4)}")
+            return 200, processor_definition(m.group(4))
+
+        m = re.fullmatch(f"/nifi-api/flow/process-groups/{_ID}", path)
+        if m and method == "PUT":
+            state.schedule(m.group(1), body["state"], server.schedule_delay)
+            return 200, {"id": m.group(1), "state": body["state"]}
+
+        m = re.fullmatch(f"/nifi-api/flow/process-groups/{_ID}/status", path)
+        if m and method == "GET":
+            gid = state.group_id(m.group(1))
+            recursive = query.get("recursive", "false") == "true"
+            return 200, {"processGroupStatus": {"id": gid, "name": state.groups[gid]["name"],
+                                                "aggregateSnapshot": state.group_status(gid, recursive)}}
+
+        return 404, f"No mock route for {method} {path}"
+
+    def _control(self, method, path):
+        """Out-of-band endpoints used by benchmarks (not counted)"""
+        server = self.server
+        if path == "/__mock__/stats":
+            return self._send(200, server.stats())
+        if path == "/__mock__/reset" and method == "POST":
+            with server.state.lock:
+                server.state = FlowState()
+            server.reset_stats()
+            return self._send(200, {"reset": True})
+        if path == "/__mock__/reset-stats" and method == "POST":
+            server.reset_stats()
+            return self._send(200, {"reset": True})
+        if path == "/__mock__/fill-queues" and method == "POST":
+            with server.state.lock:
+                for connection in server.state.connections.values():
+                    connection["queued"] += BACKPRESSURE_OBJECTS // 2
+            return self._send(200, {"connections": len(server.state.connections)})
+        return self._send(404, f"No mock control route {path}")
+
+
+class MockNiFi:
+    """Run a ``MockNiFiServer`` on a background thread (``with MockNiFi() as nifi:``)"""
+
+    def __init__(self, host="127.0.0.1", port=0, **options):
+        self.server = MockNiFiServer((host, port), **options)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-nifi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self):
+        return self.server.stats()
+
+    def reset_stats(self):
+        self.server.reset_stats()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local mock of the NiFi REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of uniform jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected error")
+    parser.add_argument("--error-status", type=int, action="append", help="status codes to inject (default 503)")
+    parser.add_argument("--conflict-rate", type=float, default=0.0, help="probability of a revision conflict on writes")
+    parser.add_argument("--schedule-delay", type=float, default=0.2, help="seconds before start/stop takes effect")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = MockNiFiServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, error_statuses=args.error_status or (503,),
+                            conflict_rate=args.conflict_rate, schedule_delay=args.schedule_delay, seed=args.seed)
+    host, port = server.server_address[:2]
+    # First line of output is the base URL; benchmark runners read it
+    print(f"http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,351 @@
+"""
+End-to-end build benchmarks against a local mock NiFi and scripted LLMs.
+
+Starts ``mock_nifi.py`` in a subprocess, generates flow specs of several
+sizes (a GenerateFlowFile -> transforms -> PutFile chain) and builds each
+one through every path the project offers:
+
+- ``sequential``: one ``NiFiClient`` call per processor and connection, as the tools do
+- ``async_deploy``: ``deploy_spec`` with concurrent waves
+- ``reconcile_noop``: re-running ``reconcile`` against the deployed group
+- ``compile_upload``: ``compile_and_upload``, one multipart upload
+- ``start_stop``: bulk ``start_flow``/``stop_flow`` of the uploaded group
+- ``tool_outputs``: the list/status/export tools on that group, with raw vs projected output size
+- ``crew``: the full crew driven by ``ScriptedLLM``, one tool call per processor and connection
+- ``crew_bulk``: the same crew building the flow with one ``build_nifi_flow_from_spec`` call
+
+For each it reports wall time, NiFi API calls seen by the mock (total
+and per endpoint) and peak Python memory (tracemalloc, measured in a
+second pass so it does not skew the timings). Needs no network or API keys:
+
+    python benchmarks/run_benchmarks.py --sizes 5,50,500 --latency 0.005 --json results.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import requests
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent / "src"))
+
+# Keep CrewAI and the result cache offline and out of the measurements
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ["NIFI_NL_CACHE"] = "0"
+# Each mock listens on a new port; keep its processor catalogs out of the user's cache
+os.environ.setdefault("NIFI_CATALOG_DIR", tempfile.mkdtemp(prefix="nifi-bench-catalog-"))
+
+DEFAULT_SIZES = (5, 50, 500)
+SCENARIOS = ("sequential", "async_deploy", "reconcile_noop", "compile_upload", "start_stop", "tool_outputs",
+             "crew", "crew_bulk", "teardown")
+# The crew builds one processor per LLM step, so larger flows only measure the agent loop
+CREW_MAX_SIZE = 50
+
+STANDARD = "org.apache.nifi.processors.standard."
+TRANSFORMS = (
+    (STANDARD + "ReplaceText", "Replacement Value", ["failure"]),
+    ("org.apache.nifi.processors.attributes.UpdateAttribute", "stage", None),
+)
+
+
+def make_spec(size, name=None):
+    """A linear flow of ``size`` processors (at least 2)"""
+    size = max(2, size)
+    processors = [{"name": "source", "type": STANDARD + "GenerateFlowFile",
+                   "config": {"properties": {"File Size": "1KB"}, "schedulingPeriod": "1 sec"}}]
+    for i in range(size - 2):
+        ptype, prop, auto_terminated = TRANSFORMS[i % len(TRANSFORMS)]
+        # Distinct properties per step: CrewAI caches identical tool calls
+        config = {"properties": {prop: f"step_{i:03d}"}}
+        if auto_terminated:
+            config["autoTerminatedRelationships"] = auto_terminated
+        processors.append({"name": f"step_{i:03d}", "type": ptype, "config": config})
+    processors.append({"name": "sink", "type": STANDARD + "PutFile",
+                       "config": {"properties": {"Directory": "/tmp/bench"},
+                                  "autoTerminatedRelationships": ["success", "failure"]}})
+    connections = [{"source": a["name"], "target": b["name"], "relationship": "success"}
+                   for a, b in zip(processors, processors[1:])]
+    return {"name": name or f"Benchmark {size}", "processors": processors, "connections": connections}
+
+
+class MockProcess:
+    """``mock_nifi.py`` running in a child process"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, conflict_rate=0.0, schedule_delay=0.05):
+        args = [sys.executable, str(BENCHMARKS_DIR / "mock_nifi.py"), "--port", "0",
+                "--latency", str(latency), "--jitter", str(jitter), "--error-rate", str(error_rate),
+                "--conflict-rate", str(conflict_rate), "--schedule-delay", str(schedule_delay)]
+        self.process = subprocess.Popen(args, stdout=subprocess.PIPE, text=True)
+        self.url = self.process.stdout.readline().strip()
+        if not self.url:
+            raise RuntimeError("mock NiFi server failed to start")
+
+    def control(self, action):
+        return requests.post(f"{self.url}/__mock__/{action}", timeout=10).json()
+
+    def stats(self):
+        return requests.get(f"{self.url}/__mock__/stats", timeout=10).json()
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+class Context:
+    """State shared by the scenarios of one flow size"""
+
+    def __init__(self, url, size):
+        from nifi_nl_builder.tools.nifi_api import NiFiClient, set_client
+
+        self.url = url
+        self.size = size
+        self.spec = make_spec(size)
+        self.client = NiFiClient(base_url=url)
+        set_client(self.client)
+        self.groups = {}
+
+    def processor_count(self, pg_id):
+        return len(self.client.list_processors(pg_id))
+
+
+def run_sequential(ctx, run):
+    client, spec = ctx.client, ctx.spec
+    pg_id = client.create_pg(f"{spec['name']} sequential {run}")
+    ids = {p["name"]: client.add_processor(pg_id, p["type"], p["config"], p["name"]) for p in spec["processors"]}
+    for connection in spec["connections"]:
+        client.create_connection(pg_id, ids[connection["source"]], ids[connection["target"]],
+                                 [connection["relationship"]])
+    return pg_id, []
+
+
+def run_async_deploy(ctx, run):
+    from nifi_nl_builder.tools.deployer import deploy_spec
+    from nifi_nl_builder.tools.nifi_async import AsyncNiFiClient
+
+    async def deploy():
+        async with AsyncNiFiClient(base_url=ctx.url) as client:
+            return await deploy_spec(ctx.spec, client=client, name=f"{ctx.spec['name']} async {run}")
+
+    result = asyncio.run(deploy())
+    ctx.groups["async_deploy"] = result["process_group_id"]
+    return result["process_group_id"], result["errors"]
+
+
+def run_reconcile_noop(ctx, run):
+    from nifi_nl_builder.tools.reconcile import reconcile
+
+    pg_id = ctx.groups.get("async_deploy")
+    if pg_id is None:
+        pg_id, _ = run_async_deploy(ctx, f"{run} (setup)")
+        ctx.client.entities.invalidate()
+    result = reconcile(ctx.spec, pg_id=pg_id, client=ctx.client)
+    errors = list(result["errors"])
+    if result["operations"]:
+        errors.append(f"expected a no-op, planned {result['operations']} operations")
+    return pg_id, errors
+
+
+def run_compile_upload(ctx, run):
+    from nifi_nl_builder.tools.compiler import compile_and_upload
+
+    spec = dict(ctx.spec, name=f"{ctx.spec['name']} compiled {run}")
+    result = compile_and_upload(spec, client=ctx.client, resolve_ids=False)
+    ctx.groups["compile_upload"] = result["process_group_id"]
+    return result["process_group_id"], []
+
+
+def run_tool_outputs(ctx, run):
+    """Inspection tools as an agent calls them; measures what projection saves"""
+    from nifi_nl_builder.tools.crewai_tools import ExportFlowTool, GetFlowStatusTool, ListProcessorsTool
+
+    pg_id = ctx.groups.get("compile_upload") or run_compile_upload(ctx, f"{run} (setup)")[0]
+    for tool in (ListProcessorsTool(), GetFlowStatusTool(), ExportFlowTool()):
+        tool._run(pg_id)
+    return pg_id, []
+
+
+def run_start_stop(ctx, run):
+    pg_id = ctx.groups.get("compile_upload") or run_compile_upload(ctx, f"{run} (setup)")[0]
+    errors = []
+    for action in (ctx.client.start_flow, ctx.client.stop_flow):
+        result = action(pg_id)
+        if not result["converged"]:
+            errors.append(f"{action.__name__}: {result['pending']} pending, {result['failed']} failed")
+    return pg_id, errors
+
+
+def run_crew(ctx, run, bulk=False):
+    from fake_llm import ScriptedLLM, crew_scripts
+    from nifi_nl_builder.crew import NiFiNLCrew
+
+    spec = dict(ctx.spec, name=f"{ctx.spec['name']} crew{' bulk' if bulk else ''} {run}")
+    scripts = crew_scripts(spec, bulk=bulk)
+    crew = NiFiNLCrew(
+        llm_factory=lambda agent_id, settings: ScriptedLLM(scripts.get(agent_id, [{"final": "done"}]),
+                                                           model=f"scripted/{agent_id}"),
+        memory=False,
+    )
+    for agent_id, agent in crew._get_agents().items():
+        agent.max_iter = len(scripts.get(agent_id, ())) + 5
+    # Agents are verbose; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = crew.run(f"Generate flowfiles, rewrite them {ctx.size - 2} times and write them to disk",
+                          use_cache=False)
+    # flow_builder answers with the id of the group it created
+    match = re.search(r"[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}", result.tasks_output[2].raw)
+    if match is None:
+        return None, [f"flow_builder returned no process group id: {result.tasks_output[2].raw[:80]}"]
+    return match.group(0), []
+
+
+def run_teardown(ctx, run):
+    """Stop, empty and delete every group the other scenarios built at this size"""
+    from nifi_nl_builder.tools.teardown import teardown_groups
+
+    def built():
+        return [g["id"] for g in ctx.client.list_process_groups("root")
+                if g["component"]["name"].startswith(ctx.spec["name"] + " ")]
+
+    pg_ids = built()
+    if not pg_ids:
+        pg_ids = [run_compile_upload(ctx, f"{run} (setup {i})")[0] for i in range(2)]
+    requests.post(f"{ctx.url}/__mock__/fill-queues", timeout=10)
+    result = teardown_groups(pg_ids, client=ctx.client)
+    ctx.groups.clear()
+    errors = list(result["errors"])
+    if built():
+        errors.append(f"{len(built())} group(s) left after teardown")
+    # Nothing is left to count
+    return None, errors
+
+
+RUNNERS = {
+    "sequential": run_sequential,
+    "async_deploy": run_async_deploy,
+    "reconcile_noop": run_reconcile_noop,
+    "compile_upload": run_compile_upload,
+    "start_stop": run_start_stop,
+    "tool_outputs": run_tool_outputs,
+    "crew": run_crew,
+    "crew_bulk": lambda ctx, run: run_crew(ctx, run, bulk=True),
+    "teardown": run_teardown,
+}
+
+
+def measure(mock, ctx, scenario, run, memory):
+    """Run one scenario; returns wall time, mock call counts and optionally peak memory"""
+    from nifi_nl_builder.metrics import REGISTRY
+
+    mock.control("reset-stats")
+    REGISTRY.reset()
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        pg_id, errors = RUNNERS[scenario](ctx, run)
+    except Exception as e:
+        pg_id, errors = None, [f"{type(e).__name__}: {e}"]
+    seconds = time.perf_counter() - started
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    stats = mock.stats()
+    totals = REGISTRY.to_json()["totals"]
+    if pg_id and not errors and scenario != "reconcile_noop":
+        built = ctx.processor_count(pg_id)
+        if built != len(ctx.spec["processors"]):
+            errors.append(f"built {built} of {len(ctx.spec['processors'])} processors")
+    return {
+        "size": ctx.size,
+        "scenario": scenario,
+        "seconds": round(seconds, 4),
+        "api_calls": stats["calls"],
+        "by_route": stats["by_route"],
+        "injected": stats["injected"],
+        "peak_memory_bytes": peak,
+        "llm_calls": totals["llm_calls"],
+        "llm_prompt_tokens": totals["llm_prompt_tokens"],
+        "tool_calls": totals["tool_calls"],
+        "tool_output_chars": totals["tool_output_chars"],
+        "tool_output_saved_chars": totals["tool_output_saved_chars"],
+        "errors": errors,
+    }
+
+
+def run_suite(mock, sizes, scenarios, crew_max=CREW_MAX_SIZE, memory=True):
+    results = []
+    for size in sizes:
+        ctx = Context(mock.url, size)
+        for scenario in scenarios:
+            if scenario == "crew" and size > crew_max:
+                continue
+            row = measure(mock, ctx, scenario, "timed", memory=False)
+            if memory:
+                row["peak_memory_bytes"] = measure(mock, ctx, scenario, "traced", memory=True)["peak_memory_bytes"]
+            results.append(row)
+            print(format_row(row), flush=True)
+    return results
+
+
+def format_row(row):
+    peak = "-" if row["peak_memory_bytes"] is None else f"{row['peak_memory_bytes'] / 1048576:.1f}"
+    status = "ok" if not row["errors"] else f"{len(row['errors'])} error(s): {row['errors'][0][:60]}"
+    if row["tool_output_saved_chars"]:
+        raw = row["tool_output_chars"] + row["tool_output_saved_chars"]
+        status += f" (tool output {int(row['tool_output_chars'])} of {int(raw)} chars)"
+    return (f"{row['size']:>5}  {row['scenario']:<15} {row['seconds']:>9.3f} {row['api_calls']:>7} "
+            f"{row['llm_calls']:>5} {peak:>9}  {status}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark flow builds against a local mock NiFi")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated processor counts (default %(default)s)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of scenarios")
+    parser.add_argument("--crew-max", type=int, default=CREW_MAX_SIZE,
+                        help="largest flow to build through the crew (default %(default)s)")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock NiFi latency per call in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="mock NiFi latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected 503")
+    parser.add_argument("--conflict-rate", type=float, default=0.0, help="probability of a revision conflict on writes")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", help="write full results (including per-endpoint calls) to this file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = [s for s in scenarios if s not in RUNNERS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    mock = MockProcess(args.latency, args.jitter, args.error_rate, args.conflict_rate)
+    try:
+        print(f"mock NiFi at {mock.url} (latency {args.latency}s ± {args.jitter}s)")
+        print(f"{'size':>5}  {'scenario':<15} {'seconds':>9} {'calls':>7} {'llm':>5} {'peak MiB':>9}  status")
+        results = run_suite(mock, sizes, scenarios, args.crew_max, memory=not args.no_memory)
+    finally:
+        mock.close()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"sizes": sizes, "latency": args.latency, "jitter": args.jitter,
+                       "error_rate": args.error_rate, "conflict_rate": args.conflict_rate,
+                       "results": results}, f, indent=2)
+    return 1 if any(row["errors"] for row in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,82 @@
+"""
+Startup benchmark backed by ``python -X importtime``.
+
+Each target module is imported in a fresh interpreter. Its import cost
+is the sum of the per-module "self" times that -X importtime reports,
+minus the same sum for an interpreter that imports nothing (``site`` and
+.pth hooks vary between machines). A target fails if its median cost
+exceeds its budget, or if it pulls in a module it must not depend on
+(for example crewai for the plain REST helpers). Exits non-zero on any
+regression so it can gate CI.
+
+    python benchmarks/startup.py [--repeat 5] [--scale 1.0]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+# (module, budget in seconds, modules that must not be imported)
+TARGETS = [
+    ("nifi_nl_builder", 0.05, ["crewai", "yaml", "dotenv", "aiohttp", "requests"]),
+    ("nifi_nl_builder.tools", 0.05, ["crewai", "aiohttp", "requests"]),
+    ("nifi_nl_builder.tools.nifi_api", 0.5, ["crewai", "litellm", "aiohttp", "yaml"]),
+]
+
+
+def measure(module):
+    """Return (total import seconds, set of imported module names)
+
+    ``module=None`` measures the bare interpreter baseline.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(SRC_DIR), os.getenv("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        capture_output=True, text=True, env=env,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    total_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        imported.add(name.strip())
+    return total_us / 1e6, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time startup benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow CI machines)")
+    args = parser.parse_args()
+
+    baseline = statistics.median(measure(None)[0] for _ in range(args.repeat))
+    failures = 0
+    print(f"{'module':<36} {'median':>9} {'budget':>9}  result")
+    for module, budget, forbidden in TARGETS:
+        runs = [measure(module) for _ in range(args.repeat)]
+        median = max(0.0, statistics.median(seconds for seconds, _ in runs) - baseline)
+        imported = runs[0][1]
+        leaked = sorted(f for f in forbidden if any(m == f or m.startswith(f + ".") for m in imported))
+        limit = budget * args.scale
+        ok = median <= limit and not leaked
+        failures += not ok
+        note = "ok" if ok else "REGRESSION"
+        if leaked:
+            note += f" (imports {', '.join(leaked)})"
+        print(f"{module:<36} {median * 1000:>7.1f}ms {limit * 1000:>7.1f}ms  {note}")
+    print(f"(interpreter baseline {baseline * 1000:.1f}ms subtracted)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,11 +5,24 @@ A CrewAI-powered system that converts natural language descriptions
 into Apache NiFi flows using specialized agents.
 """
 
-from .crew import NiFiNLCrew
-
 __version__ = "0.1.0"
 __author__ = "NiFi NL Builder Team"
 
 __all__ = [
-    'NiFiNLCrew'
-] 
\ No newline at end of file
+    'NiFiNLCrew',
+    'CrewExecutionService',
+    'get_service'
+]
+
+
+def __getattr__(name):
+    # crewai is slow to import; only pay for it when the crew is used
+    if name == 'NiFiNLCrew':
+        from .crew import NiFiNLCrew
+        globals()[name] = NiFiNLCrew
+        return NiFiNLCrew
+    if name in ('CrewExecutionService', 'get_service'):
+        from . import service
+        globals()[name] = getattr(service, name)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,224 @@
+"""
+Batch mode: run many descriptions concurrently and stream results to JSONL.
+
+Input is a JSONL file (one ``{"id": ..., "description": ...}`` object or
+plain JSON string per line) or a directory of ``.txt``/``.md``/``.json``
+files, one description each. Descriptions run on a
+``CrewExecutionService`` with ``parallelism`` workers; LLM and NiFi calls
+from every worker share the process-wide limiters in ``ratelimit``.
+
+Each finished description is appended to the output file as one JSON
+line and flushed immediately. Re-running with the same output skips ids
+that already succeeded, so an interrupted batch resumes where it stopped:
+
+    python -m nifi_nl_builder.batch flows.jsonl -o results.jsonl -j 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError, wait
+from pathlib import Path
+
+from .cache import normalize_description, stable_hash
+from .ratelimit import limiter_stats
+from .service import CrewExecutionService, SUCCEEDED, SERVICE_JOB_TIMEOUT
+
+BATCH_PARALLELISM = int(os.getenv("NIFI_NL_BATCH_PARALLELISM", "4"))
+DESCRIPTION_SUFFIXES = (".txt", ".md", ".json")
+
+
+def _item(description, item_id=None):
+    description = description.strip()
+    if item_id is None:
+        # Stable across runs and input order, so resume still matches
+        item_id = stable_hash(normalize_description(description))[:12]
+    return {"id": str(item_id), "description": description}
+
+
+def load_descriptions(path):
+    """Descriptions from a JSONL file or a directory, as ``{"id", "description"}`` dicts"""
+    path = Path(path)
+    items = []
+    if path.is_dir():
+        for file in sorted(p for p in path.iterdir() if p.is_file() and p.suffix in DESCRIPTION_SUFFIXES):
+            text = file.read_text()
+            if file.suffix == ".json":
+                data = json.loads(text)
+                items.append(_item(data["description"], data.get("id", file.stem)))
+            else:
+                items.append(_item(text, file.stem))
+    else:
+        with open(path, "r") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{number}: invalid JSON ({e})") from None
+                if isinstance(data, str):
+                    items.append(_item(data))
+                else:
+                    items.append(_item(data["description"], data.get("id") or data.get("name")))
+
+    seen = set()
+    for item in items:
+        if item["id"] in seen:
+            raise ValueError(f"Duplicate description id: {item['id']}")
+        seen.add(item["id"])
+    return items
+
+
+def completed_ids(output):
+    """Ids recorded as succeeded in an existing output file"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interruption; that id is simply rerun
+                continue
+            if record.get("status") == SUCCEEDED:
+                done.add(record["id"])
+    return done
+
+
+class JsonlWriter:
+    """Thread-safe appender that flushes every record"""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        needs_newline = os.path.exists(path) and os.path.getsize(path) > 0
+        if needs_newline:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(path, "a")
+        if needs_newline:
+            self._file.write("\n")
+
+    def write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _record(item, job, result=None, error=None):
+    """Output line for one finished job"""
+    record = {
+        "id": item["id"],
+        "description": item["description"],
+        "status": job["status"],
+        "error": error,
+        "queued_seconds": round((job["started_at"] or job["finished_at"]) - job["submitted_at"], 3),
+        "run_seconds": round(job["finished_at"] - job["started_at"], 3) if job["started_at"] else None,
+        "finished_at": job["finished_at"],
+        # Tasks whose output came from the result cache instead of the LLM
+        "cached_tasks": job["cached_tasks"],
+        "cached": bool(job["cached_tasks"]),
+    }
+    if result is not None:
+        record["output"] = result.raw
+        record["tasks"] = {getattr(t, "name", None) or str(i): t.raw for i, t in enumerate(result.tasks_output)}
+        usage = getattr(result, "token_usage", None)
+        if usage is not None:
+            record["total_tokens"] = getattr(usage, "total_tokens", None)
+    return record
+
+
+def run_batch(items, output, parallelism=BATCH_PARALLELISM, use_cache=True,
+              timeout=SERVICE_JOB_TIMEOUT, crew_factory=None, on_record=None):
+    """Run ``items`` (from ``load_descriptions``) and append results to ``output``.
+
+    Ids already succeeded in ``output`` are skipped. Returns a summary with
+    counts per status and the wall time.
+    """
+    done = completed_ids(output)
+    todo = [item for item in items if item["id"] not in done]
+    summary = {"total": len(items), "skipped": len(items) - len(todo)}
+    started = time.time()
+    writer = JsonlWriter(output)
+    service = CrewExecutionService(workers=parallelism, queue_size=parallelism,
+                                   timeout=timeout, crew_factory=crew_factory)
+    counts_lock = threading.Lock()
+
+    def finished(item, job_id, future):
+        result, error = None, None
+        try:
+            result = future.result()
+        except CancelledError:
+            error = "cancelled"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        record = _record(item, service.status(job_id), result, error)
+        writer.write(record)
+        with counts_lock:
+            summary[record["status"]] = summary.get(record["status"], 0) + 1
+        if on_record is not None:
+            on_record(record)
+
+    futures = []
+    interrupted = False
+    try:
+        for item in todo:
+            # Blocks while every worker is busy and the queue is full
+            job_id = service.submit(item["description"], use_cache=use_cache, block=True)
+            future = service.future(job_id)
+            future.add_done_callback(lambda f, item=item, job_id=job_id: finished(item, job_id, f))
+            futures.append(future)
+        wait(futures)
+    except KeyboardInterrupt:
+        interrupted = True
+        raise
+    finally:
+        # On interrupt queued descriptions are cancelled; running ones
+        # finish in the background and still write their line
+        service.shutdown(wait=not interrupted, cancel_pending=True)
+        if not interrupted:
+            writer.close()
+
+    summary["seconds"] = round(time.time() - started, 3)
+    summary["rate_limiters"] = limiter_stats()
+    return summary
+
+
+def main(argv=None):
+    """Run a batch from the command line"""
+    parser = argparse.ArgumentParser(description="Generate NiFi flows for many descriptions concurrently")
+    parser.add_argument("input", help="JSONL file or directory of .txt/.md/.json descriptions")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results file (appended; resumes)")
+    parser.add_argument("-j", "--parallelism", type=int, default=BATCH_PARALLELISM,
+                        help="descriptions run at once (default %(default)s)")
+    parser.add_argument("--timeout", type=float, default=SERVICE_JOB_TIMEOUT, help="seconds per description")
+    parser.add_argument("--no-cache", action="store_true", help="ignore cached task outputs")
+    args = parser.parse_args(argv)
+
+    items = load_descriptions(args.input)
+
+    def progress(record):
+        print(f"{record['status']:>10}  {record['id']}  {record['run_seconds'] or 0:.1f}s"
+              + (f"  {record['error']}" if record["error"] else ""), flush=True)
+
+    try:
+        summary = run_batch(items, args.output, args.parallelism, not args.no_cache,
+                            args.timeout, on_record=progress)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; finished results are in {args.output}. Re-run to resume.")
+        return 130
+    print(json.dumps(summary, indent=2))
+    return 0 if summary.get(SUCCEEDED, 0) + summary["skipped"] == summary["total"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Persistent cache of per-task crew outputs.
+
+Each task output is stored as one JSON file whose name is a hash of the
+normalized description plus the agent, task and model configuration of
+that task and every task before it. A changed prompt or model therefore
+invalidates exactly the affected suffix of the pipeline. Entries are
+evicted by TTL, then least-recently-used order once the entry or byte
+cap is exceeded. Only tasks without side effects in NiFi are cached
+(``crew.CACHED_TASKS``).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+CACHE_DIR = Path(os.getenv("NIFI_NL_CACHE_DIR", Path.home() / ".cache" / "nifi_nl_builder"))
+CACHE_TTL = float(os.getenv("NIFI_NL_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("NIFI_NL_CACHE_MAX_ENTRIES", "1000"))
+CACHE_MAX_BYTES = int(os.getenv("NIFI_NL_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+
+def normalize_description(description):
+    """Collapse whitespace so trivially different inputs share a key"""
+    return " ".join(description.split())
+
+
+def stable_hash(*parts):
+    """SHA-256 over a canonical JSON encoding of ``parts``"""
+    encoded = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ResultCache:
+    """On-disk key/value cache with TTL, LRU eviction and a size cap"""
+
+    def __init__(self, directory=CACHE_DIR, max_entries=CACHE_MAX_ENTRIES,
+                 max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> [size, last access]; file mtime doubles as the access time
+        self._index = {}
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                self._index[entry.name[:-5]] = [stat.st_size, stat.st_mtime]
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    def get(self, key):
+        """Return the cached value or None (expired entries count as misses)"""
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "r") as f:
+                    payload = json.load(f)
+            except (OSError, ValueError):
+                self._drop(key)
+                self.misses += 1
+                return None
+            if time.time() - payload["created_at"] > self.ttl:
+                self._drop(key)
+                self.misses += 1
+                return None
+            now = time.time()
+            os.utime(self._path(key), (now, now))
+            self._index[key][1] = now
+            self.hits += 1
+            return payload["value"]
+
+    def put(self, key, value):
+        """Store a JSON-serializable value and evict if over the caps"""
+        data = json.dumps({"created_at": time.time(), "value": value})
+        with self._lock:
+            path = self._path(key)
+            tmp_path = path.with_suffix(".part")
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._index[key] = [len(data), time.time()]
+            self._evict()
+
+    def _drop(self, key):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        total = sum(size for size, _ in self._index.values())
+        if len(self._index) <= self.max_entries and total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if len(self._index) <= self.max_entries and total <= self.max_bytes:
+                break
+            self._drop(key)
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": sum(size for size, _ in self._index.values()),
+            }
+
@@ -1,4 +1,7 @@
 import os
+import sys
+import threading
+from collections.abc import Mapping
 import yaml
 from dotenv import load_dotenv
 from crewai import Crew, Agent, Task, LLM
@@ -6,13 +9,70 @@ from crewai import Crew, Agent, Task, LLM
 # Load environment variables
 load_dotenv()
 from .tools.crewai_tools import (
-    CreateProcessGroupTool, AddProcessorTool, ConnectProcessorsTool,
+    BuildFlowFromSpecTool, ValidateFlowSpecTool, CreateProcessGroupTool, AddProcessorTool, ConnectProcessorsTool,
     StartProcessorTool, StopProcessorTool, ListProcessorsTool,
-    GetFlowStatusTool, ExportFlowTool
+    GetFlowStatusTool, ExportFlowTool, FetchMoreOutputTool, SearchTemplatesTool, listen_tool_calls
 )
+from .cache import ResultCache, normalize_description, stable_hash
+from .metrics import install_llm_metrics, serve_metrics, METRICS_PORT
+from .ratelimit import llm_limiter
+
+# Model parameters per agent; part of the result cache key
+LLM_SETTINGS = {
+    "nl_parser": {"model": "gpt-4o", "max_tokens": 2000, "temperature": 0.1},
+    "flow_planner": {"model": "gpt-4o", "max_tokens": 1500, "temperature": 0.1},
+    "flow_builder": {"model": "gpt-4o-mini", "max_tokens": 3000, "temperature": 0.2},
+    "cdf_deployer": {"model": "gpt-4o", "max_tokens": 1000, "temperature": 0.1}
+}
+DEFAULT_LLM_SETTINGS = {"model": "gpt-4o"}
+# Tasks without side effects in NiFi; every run executes the tasks after them
+CACHED_TASKS = ("parse_req", "plan_templates")
+
+class RateLimitedLLM(LLM):
+    """LLM whose calls wait on the process-wide limiter for its model (``NIFI_NL_LLM_RPM``)"""
+    
+    def call(self, *args, **kwargs):
+        limiter = llm_limiter(self.model)
+        if limiter is not None:
+            limiter.acquire()
+        return super().call(*args, **kwargs)
+
+class LazyLLMs(Mapping):
+    """Agent id -> LLM, each constructed on first use"""
+    
+    def __init__(self, settings, default_settings=DEFAULT_LLM_SETTINGS, factory=None):
+        self._settings = settings
+        self._default_settings = default_settings
+        # factory(agent_id, settings) -> LLM; lets benchmarks swap in fakes
+        self._factory = factory or (lambda agent_id, settings: RateLimitedLLM(**settings))
+        self._llms = {}
+        self._lock = threading.Lock()
+    
+    def _build(self, agent_id, settings):
+        with self._lock:
+            if agent_id not in self._llms:
+                self._llms[agent_id] = self._factory(agent_id, settings)
+            return self._llms[agent_id]
+    
+    def __getitem__(self, agent_id):
+        if agent_id in self._llms:
+            return self._llms[agent_id]
+        return self._build(agent_id, self._settings[agent_id])
+    
+    def __iter__(self):
+        return iter(self._settings)
+    
+    def __len__(self):
+        return len(self._settings)
+    
+    def for_agent(self, agent_id):
+        """Configured LLM for an agent, or the shared default model"""
+        if agent_id in self._settings:
+            return self[agent_id]
+        return self._build(None, self._default_settings)
 
 class NiFiNLCrew:
-    def __init__(self, config_dir=None):
+    def __init__(self, config_dir=None, cache=None, llm_factory=None, memory=True):
         if config_dir is None:
             # Get the directory where this file is located
             current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -22,14 +82,29 @@ class NiFiNLCrew:
         self.agents = self._load_agents()
         self.tasks = self._load_tasks()
         
-        # Configure LLMs for different agents
-        self.llms = {
-            "nl_parser": LLM(model="gpt-4o", max_tokens=2000, temperature=0.1),
-            "flow_planner": LLM(model="gpt-4o", max_tokens=1500, temperature=0.1),
-            "flow_builder": LLM(model="gpt-4o-mini", max_tokens=3000, temperature=0.2),
-            "cdf_deployer": LLM(model="gpt-4o", max_tokens=1000, temperature=0.1)
-        }
-        
+        # Configure LLMs for different agents (built on first use)
+        self.llms = LazyLLMs(LLM_SETTINGS, factory=llm_factory)
+        # Crew memory needs an embedding model; off for offline runs
+        self.memory = memory
+        # Latency and token usage of every completion (see metrics.py)
+        install_llm_metrics()
+        if METRICS_PORT:
+            serve_metrics()
+
+        # Per-task output cache; NIFI_NL_CACHE=0 disables it
+        if cache is None and os.getenv("NIFI_NL_CACHE", "1") != "0":
+            cache = ResultCache()
+        self.cache = cache
+
+        # Agents, tools and the full crew are built once and reused by
+        # every run; kickoff binds agents to their crew, so runs on one
+        # instance are serialized (use CrewExecutionService for parallelism)
+        self._built_agents = None
+        self._crew = None
+        self._run_lock = threading.Lock()
+        # Progress callback of the run in flight (see run())
+        self._listener = None
+
     def _load_agents(self):
         """Load agent configurations from YAML"""
         try:
@@ -57,6 +132,8 @@ class NiFiNLCrew:
         # Attach NiFi tools specifically to flow_builder agent
         if agent_id == "flow_builder":
             tools = [
+                BuildFlowFromSpecTool(),
+                ValidateFlowSpecTool(),
                 CreateProcessGroupTool(),
                 AddProcessorTool(),
                 ConnectProcessorsTool(),
@@ -64,11 +141,14 @@ class NiFiNLCrew:
                 StopProcessorTool(),
                 ListProcessorsTool(),
                 GetFlowStatusTool(),
-                ExportFlowTool()
+                ExportFlowTool(),
+                FetchMoreOutputTool()
             ]
+        elif agent_id == "flow_planner":
+            tools = [SearchTemplatesTool()]
         
         # Use configured LLM for the agent
-        llm = self.llms.get(agent_id, LLM(model="gpt-4o"))
+        llm = self.llms.for_agent(agent_id)
         
         return Agent(
             role=config["role"],
@@ -80,27 +160,39 @@ class NiFiNLCrew:
             allow_delegation=False
         )
     
-    def _create_task(self, task_id, config, agents):
+    def _create_task(self, task_id, config, agents, prior_outputs=None):
         """Create a CrewAI task from configuration"""
         agent = agents[config["agent"]]
+        description = config["description"]
+        if prior_outputs:
+            # Resuming after cached tasks: hand their results forward
+            previous = "\n\n".join(f"[{tid}]\n{output}" for tid, output in prior_outputs)
+            description = f"{description}\n\nResults of earlier steps:\n{previous}"
         
         return Task(
-            description=config["description"],
+            description=description,
             expected_output=config["expected_output"],
-            agent=agent
+            agent=agent,
+            name=task_id
         )
     
-    def build_crew(self):
-        """Build the complete crew with agents and tasks"""
-        # Create agents
-        agents = {}
-        for agent_id, config in self.agents.items():
-            agents[agent_id] = self._create_agent(agent_id, config)
+    def _get_agents(self):
+        """Agents for this instance, created on first use"""
+        if self._built_agents is None:
+            self._built_agents = {
+                agent_id: self._create_agent(agent_id, config)
+                for agent_id, config in self.agents.items()
+            }
+        return self._built_agents
+    
+    def build_crew(self, start=0, prior_outputs=None):
+        """Build the crew with agents and the tasks from index ``start`` onwards"""
+        agents = self._get_agents()
         
         # Create tasks
         tasks = []
-        for task_id, config in self.tasks.items():
-            task = self._create_task(task_id, config, agents)
+        for task_id, config in list(self.tasks.items())[start:]:
+            task = self._create_task(task_id, config, agents, prior_outputs if not tasks else None)
             tasks.append(task)
         
         # Create crew
@@ -108,28 +200,113 @@ class NiFiNLCrew:
             agents=list(agents.values()),
             tasks=tasks,
             verbose=True,
-            memory=True
+            memory=self.memory,
+            task_callback=self._on_task_output
         )
         
         return crew
     
-    def run(self, description):
-        """Run the crew with a natural language description"""
-        crew = self.build_crew()
+    def _emit(self, event, listener=None):
+        listener = listener or self._listener
+        if listener is not None:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"⚠️ Run listener failed: {e}")
+    
+    def _on_task_output(self, output):
+        self._emit({"type": "task", "task": output.name, "agent": output.agent,
+                    "output": output.raw, "cached": False})
+    
+    def _on_tool_call(self, event):
+        self._emit(dict(event, type="tool"))
+    
+    def get_crew(self):
+        """The full crew, built once per instance"""
+        if self._crew is None:
+            self._crew = self.build_crew()
+        return self._crew
+    
+    def warm_up(self):
+        """Build agents, LLMs and the crew ahead of the first run"""
+        with self._run_lock:
+            self.get_crew()
+        return self
+    
+    def _task_cache_keys(self, description):
+        """One key per leading cacheable task, covering the description and every config it depends on"""
+        normalized = normalize_description(description)
+        keys, chain = [], []
+        for task_id, config in self.tasks.items():
+            if task_id not in CACHED_TASKS:
+                break
+            agent_id = config["agent"]
+            chain.append({
+                "task": [task_id, config],
+                "agent": self.agents.get(agent_id),
+                "llm": LLM_SETTINGS.get(agent_id, DEFAULT_LLM_SETTINGS),
+            })
+            keys.append(stable_hash(normalized, chain))
+        return keys
+    
+    def run(self, description, use_cache=True, listener=None):
+        """Run the crew with a natural language description.
         
-        # Set the description context for all tasks
-        for task in crew.tasks:
-            task.context = f"Description: {description}"
+        Outputs of the tasks in ``CACHED_TASKS`` (parsing and planning) are
+        cached on disk, and a run resumes from the first uncached task. The
+        build and deploy tasks change NiFi, so they are never replayed from
+        the cache and always run against the live instance.
         
-        result = crew.kickoff()
+        ``listener(event)`` receives progress as it happens: a ``task``
+        event per finished (or cached) task and a ``tool`` event per NiFi
+        tool call with its latency and result size.
+        """
+        task_ids = list(self.tasks)
+        keys = self._task_cache_keys(description)
+        cached = []
+        if use_cache and self.cache is not None:
+            for key in keys:
+                output = self.cache.get(key)
+                if output is None:
+                    break
+                cached.append(output)
+        for task_id, output in zip(task_ids, cached):
+            self._emit({"type": "task", "task": task_id, "agent": self.tasks[task_id]["agent"],
+                        "output": output, "cached": True}, listener)
+        
+        with self._run_lock:
+            self._listener = listener
+            if cached:
+                crew = self.build_crew(start=len(cached), prior_outputs=list(zip(task_ids, cached)))
+            else:
+                crew = self.get_crew()
+            
+            # Set the description context for all tasks
+            for task in crew.tasks:
+                task.context = f"Description: {description}"
+            
+            try:
+                with listen_tool_calls(self._on_tool_call):
+                    result = crew.kickoff()
+            finally:
+                self._listener = None
+        
+        if self.cache is not None:
+            for key, output in zip(keys[len(cached):], result.tasks_output):
+                self.cache.put(key, output.raw)
         return result
 
 def main():
-    """Main function to run the NiFi NL Builder crew"""
+    """Main function to run the NiFi NL Builder crew.
+    
+    Takes the description from the command line (an example otherwise);
+    for many descriptions use ``python -m nifi_nl_builder.batch``.
+    """
     crew_manager = NiFiNLCrew()
     
-    # Example usage
-    description = "Create a flow that reads from Kafka topic 'input-data', filters records with status 'active', and writes to HDFS path '/data/processed'"
+    description = " ".join(sys.argv[1:]) or (
+        "Create a flow that reads from Kafka topic 'input-data', filters records with status 'active', and writes to HDFS path '/data/processed'"
+    )
     
     print("Starting NiFi NL Builder Crew...")
     print(f"Processing description: {description}")
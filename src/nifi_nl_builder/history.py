@@ -0,0 +1,199 @@
+"""
+Persistent, bounded history of crew executions.
+
+Runs are rows in a local SQLite database (``NIFI_NL_HISTORY_DB``),
+indexed by time, description hash and flow name. Only the newest
+``NIFI_NL_HISTORY_MAX_RUNS`` rows are kept. Listing a page reads just the
+summary columns. The crew output and the flow snapshot are stored
+zlib-compressed and only decompressed when a single run is opened.
+
+Snapshots (exported flow definitions) are content-addressed by the hash
+of their canonical JSON. Regenerating the same flow therefore adds a
+run row but no new snapshot. A snapshot is deleted once no kept run
+refers to it.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from .cache import CACHE_DIR, normalize_description, stable_hash
+
+HISTORY_DB = Path(os.getenv("NIFI_NL_HISTORY_DB", CACHE_DIR / "history.sqlite3"))
+# Oldest runs (and snapshots only they used) are dropped beyond this
+HISTORY_MAX_RUNS = int(os.getenv("NIFI_NL_HISTORY_MAX_RUNS", "5000"))
+
+SUMMARY_COLUMNS = ("id", "job_id", "created_at", "description", "flow_name", "process_group_id",
+                   "status", "seconds", "tool_calls", "snapshot_hash")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    raw_size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT,
+    created_at REAL NOT NULL,
+    description TEXT NOT NULL,
+    description_hash TEXT NOT NULL,
+    flow_name TEXT,
+    process_group_id TEXT,
+    status TEXT NOT NULL,
+    seconds REAL,
+    tool_calls INTEGER NOT NULL DEFAULT 0,
+    result BLOB,
+    snapshot_hash TEXT REFERENCES snapshots(hash)
+);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_description_hash ON runs (description_hash, id);
+CREATE INDEX IF NOT EXISTS runs_flow_name ON runs (flow_name, id);
+CREATE INDEX IF NOT EXISTS runs_snapshot_hash ON runs (snapshot_hash);
+"""
+
+
+def description_hash(description):
+    return stable_hash(normalize_description(description))
+
+
+def _compress(text):
+    return zlib.compress(text.encode(), 6)
+
+
+def _decompress(blob):
+    return zlib.decompress(blob).decode() if blob is not None else None
+
+
+class HistoryStore:
+    """SQLite-backed execution history with deduplicated flow snapshots"""
+
+    def __init__(self, path=HISTORY_DB, max_runs=HISTORY_MAX_RUNS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        # One connection shared by Streamlit's script threads, serialized by the lock
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def _insert_snapshot(self, definition):
+        """Insert ``definition`` unless stored; caller holds the lock and transaction"""
+        encoded = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+        digest = stable_hash(definition)
+        self._db.execute(
+            "INSERT OR IGNORE INTO snapshots (hash, data, raw_size, created_at) VALUES (?, ?, ?, ?)",
+            (digest, _compress(encoded), len(encoded), time.time()))
+        return digest
+
+    def put_snapshot(self, definition):
+        """Store ``definition`` once per distinct content; returns its hash"""
+        with self._lock, self._db:
+            return self._insert_snapshot(definition)
+
+    def record_run(self, description, status, result=None, flow_name=None, process_group_id=None,
+                   seconds=None, tool_calls=0, snapshot=None, job_id=None):
+        """Append a finished run (and its flow snapshot, if any); returns the row id"""
+        # One transaction, so another process's prune cannot drop the snapshot before the run refers to it
+        with self._lock, self._db:
+            snapshot_hash = self._insert_snapshot(snapshot) if snapshot is not None else None
+            cursor = self._db.execute(
+                "INSERT INTO runs (job_id, created_at, description, description_hash, flow_name,"
+                " process_group_id, status, seconds, tool_calls, result, snapshot_hash)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, time.time(), description, description_hash(description), flow_name,
+                 process_group_id, status, seconds, tool_calls,
+                 _compress(str(result)) if result is not None else None, snapshot_hash))
+            self._prune()
+        return cursor.lastrowid
+
+    def _prune(self):
+        """Keep the newest ``max_runs`` rows; caller holds the lock and transaction"""
+        pruned = self._db.execute(
+            "DELETE FROM runs WHERE id <= (SELECT id FROM runs ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (self.max_runs,)).rowcount
+        if pruned:
+            self._db.execute(
+                "DELETE FROM snapshots WHERE NOT EXISTS"
+                " (SELECT 1 FROM runs WHERE runs.snapshot_hash = snapshots.hash)")
+        return pruned
+
+    def page(self, limit=20, before=None, flow_name=None, description=None):
+        """Newest-first run summaries with ``id < before``, optionally for one flow or description.
+
+        Pass the last row's id as ``before`` to get the next page.
+        """
+        where, args = [], []
+        if before is not None:
+            where.append("id < ?")
+            args.append(before)
+        if flow_name is not None:
+            where.append("flow_name = ?")
+            args.append(flow_name)
+        if description is not None:
+            where.append("description_hash = ?")
+            args.append(description_hash(description))
+        query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM runs"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id DESC LIMIT ?", (*args, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_run(self, run_id):
+        """Full run including its decompressed result; None if pruned"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        run.pop("description_hash")
+        run["result"] = _decompress(run["result"])
+        return run
+
+    def snapshot(self, digest):
+        """Flow definition stored under ``digest``; None if unknown"""
+        with self._lock:
+            row = self._db.execute("SELECT data FROM snapshots WHERE hash = ?", (digest,)).fetchone()
+        return json.loads(_decompress(row["data"])) if row else None
+
+    def flow_names(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT flow_name FROM runs WHERE flow_name IS NOT NULL ORDER BY flow_name").fetchall()
+        return [row["flow_name"] for row in rows]
+
+    def stats(self):
+        with self._lock:
+            runs = self._db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            snapshots, raw, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM snapshots"
+            ).fetchone()
+            referenced = self._db.execute(
+                "SELECT COUNT(*) FROM runs WHERE snapshot_hash IS NOT NULL").fetchone()[0]
+        return {"runs": runs, "snapshots": snapshots, "snapshot_references": referenced,
+                "snapshot_raw_bytes": raw, "snapshot_stored_bytes": stored}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_history():
+    """Process-wide history store, opened on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
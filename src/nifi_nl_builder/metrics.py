@@ -0,0 +1,280 @@
+"""
+In-process metrics for NiFi requests, CrewAI tool calls and LLM calls.
+
+Every ``NiFiClient``/``AsyncNiFiClient`` request records its method,
+endpoint template (ids replaced by ``{id}``), status, latency and
+response size. Every NiFi tool ``_run`` records its latency and output
+size, plus the characters saved when its output is projected. Every LLM
+completion routed through LiteLLM records its latency and
+prompt/completion tokens. Values are aggregated into fixed-bucket
+histograms and counters, exported as Prometheus text or JSON, so a slow
+run can be attributed to NiFi, the LLM or oversized tool outputs.
+"""
+
+import json
+import os
+import re
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = os.getenv("NIFI_METRICS_PORT")
+
+# Seconds; spans a cached GET up to a slow multi-step LLM completion
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Bytes or characters
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+TOKEN_BUCKETS = (64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 131072)
+
+_UUID = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+_ABSOLUTE = re.compile(r"^https?://[^/]+")
+
+
+class Histogram:
+    """Cumulative-bucket histogram with sum and count"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile (0-1) by interpolating inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.buckets[i - 1] if i else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class MetricsRegistry:
+    """Named, labelled histograms and counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._series = {}
+
+    def describe(self, name, kind, help_text, buckets=None):
+        self._meta[name] = {"kind": kind, "help": help_text, "buckets": buckets}
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = Histogram(self._meta[name]["buckets"] or LATENCY_BUCKETS)
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def _grouped(self):
+        with self._lock:
+            series = {key: (value.to_dict() if isinstance(value, Histogram) else value)
+                      for key, value in self._series.items()}
+        grouped = {}
+        for (name, labels), value in sorted(series.items()):
+            grouped.setdefault(name, []).append((dict(labels), value))
+        return grouped
+
+    def to_json(self):
+        """All series plus per-subsystem totals"""
+        grouped = self._grouped()
+        metrics = {
+            name: {"type": self._meta[name]["kind"], "help": self._meta[name]["help"],
+                   "series": [{"labels": labels, "value": value} for labels, value in rows]}
+            for name, rows in grouped.items()
+        }
+
+        def total(name, field="sum"):
+            return round(sum(v[field] if isinstance(v, dict) else v for _, v in grouped.get(name, [])), 6)
+
+        return {
+            "totals": {
+                "nifi_requests": total("nifi_request_duration_seconds", "count"),
+                "nifi_seconds": total("nifi_request_duration_seconds"),
+                "nifi_response_bytes": total("nifi_response_bytes"),
+                "tool_calls": total("tool_call_duration_seconds", "count"),
+                "tool_seconds": total("tool_call_duration_seconds"),
+                "tool_output_chars": total("tool_output_chars"),
+                "tool_output_saved_chars": total("tool_output_saved_chars_total"),
+                "llm_calls": total("llm_call_duration_seconds", "count"),
+                "llm_seconds": total("llm_call_duration_seconds"),
+                "llm_prompt_tokens": sum(v for labels, v in grouped.get("llm_tokens_total", [])
+                                         if labels.get("kind") == "prompt"),
+                "llm_completion_tokens": sum(v for labels, v in grouped.get("llm_tokens_total", [])
+                                             if labels.get("kind") == "completion"),
+            },
+            "metrics": metrics,
+        }
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for name, rows in self._grouped().items():
+            meta = self._meta[name]
+            lines.append(f"# HELP {name} {meta['help']}")
+            lines.append(f"# TYPE {name} {meta['kind']}")
+            for labels, value in rows:
+                if meta["kind"] == "counter":
+                    lines.append(f"{name}{_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in value["buckets"].items():
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(dict(labels, le=bound))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {value['sum']}")
+                lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe("nifi_request_duration_seconds", "histogram", "NiFi REST request latency", LATENCY_BUCKETS)
+REGISTRY.describe("nifi_response_bytes", "histogram", "NiFi REST response body size", SIZE_BUCKETS)
+REGISTRY.describe("tool_call_duration_seconds", "histogram", "CrewAI tool call latency", LATENCY_BUCKETS)
+REGISTRY.describe("tool_output_chars", "histogram", "CrewAI tool output size in characters", SIZE_BUCKETS)
+REGISTRY.describe("tool_output_raw_chars_total", "counter", "Tool output characters before projection")
+REGISTRY.describe("tool_output_saved_chars_total", "counter", "Tool output characters removed by projection")
+REGISTRY.describe("llm_call_duration_seconds", "histogram", "LLM completion latency", LATENCY_BUCKETS)
+REGISTRY.describe("llm_tokens", "histogram", "Tokens per LLM completion", TOKEN_BUCKETS)
+REGISTRY.describe("llm_tokens_total", "counter", "LLM tokens consumed")
+
+
+def endpoint_template(path):
+    """``/processors/3f2a...-...`` -> ``/processors/{id}`` (query string dropped)"""
+    path = _ABSOLUTE.sub("", path.split("?", 1)[0])
+    if path.startswith("/nifi-api"):
+        path = path[len("/nifi-api"):]
+    return "/".join("{id}" if _UUID.match(part) else part for part in path.split("/"))
+
+
+def record_request(method, path, status, seconds, response_bytes=0, registry=REGISTRY):
+    """One NiFi HTTP request; ``status`` is the HTTP code or ``"error"``"""
+    endpoint = endpoint_template(path)
+    registry.observe("nifi_request_duration_seconds", seconds, method=method, endpoint=endpoint, status=str(status))
+    registry.observe("nifi_response_bytes", response_bytes, method=method, endpoint=endpoint)
+
+
+def record_tool_call(tool, seconds, output_chars, error=None, registry=REGISTRY):
+    """One CrewAI tool ``_run``"""
+    outcome = "error" if error else "ok"
+    registry.observe("tool_call_duration_seconds", seconds, tool=tool, outcome=outcome)
+    registry.observe("tool_output_chars", output_chars, tool=tool)
+
+
+def record_projection(tool, raw_chars, projected_chars, registry=REGISTRY):
+    """One tool output shrunk by ``tools.projections`` before reaching the LLM"""
+    registry.inc("tool_output_raw_chars_total", raw_chars, tool=tool)
+    registry.inc("tool_output_saved_chars_total", max(0, raw_chars - projected_chars), tool=tool)
+
+
+def record_llm_call(model, seconds, prompt_tokens=0, completion_tokens=0, error=False, registry=REGISTRY):
+    """One LLM completion"""
+    registry.observe("llm_call_duration_seconds", seconds, model=model, outcome="error" if error else "ok")
+    for kind, tokens in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+        if tokens:
+            registry.observe("llm_tokens", tokens, model=model, kind=kind)
+            registry.inc("llm_tokens_total", tokens, model=model, kind=kind)
+
+
+def _llm_success(kwargs, response, start_time, end_time):
+    usage = getattr(response, "usage", None)
+    record_llm_call(kwargs.get("model", "unknown"), (end_time - start_time).total_seconds(),
+                    getattr(usage, "prompt_tokens", 0) or 0,
+                    getattr(usage, "completion_tokens", 0) or 0)
+
+
+def _llm_failure(kwargs, response, start_time, end_time):
+    record_llm_call(kwargs.get("model", "unknown"), (end_time - start_time).total_seconds(), error=True)
+
+
+_llm_installed = False
+_llm_lock = threading.Lock()
+
+def install_llm_metrics():
+    """Record every LiteLLM completion (which is how CrewAI calls models).
+
+    Uses ``litellm.success_callback``/``failure_callback`` rather than
+    ``litellm.callbacks``, which CrewAI overwrites on every call.
+    """
+    global _llm_installed
+    with _llm_lock:
+        if _llm_installed:
+            return
+        import litellm
+
+        litellm.success_callback.append(_llm_success)
+        litellm.failure_callback.append(_llm_failure)
+        _llm_installed = True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = json.dumps(self.registry.to_json()).encode(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = self.registry.to_prometheus().encode(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+def serve_metrics(port=None, host="0.0.0.0"):
+    """Serve ``/metrics`` (Prometheus) and ``/metrics.json`` from a daemon thread"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port or METRICS_PORT or 9464)), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="nifi-metrics", daemon=True).start()
+        return _server
@@ -0,0 +1,103 @@
+"""
+Process-wide rate limiters for the LLM APIs and NiFi.
+
+Concurrent crews (``CrewExecutionService``, batch mode) share these
+limiters, so raising parallelism queues requests locally instead of
+tripping provider rate limits (429) or overloading the NiFi node.
+
+A ``TokenBucket`` hands out reservations: ``reserve()`` takes the
+tokens immediately (the balance may go negative) and returns how long the
+caller must wait, so the same bucket serves threads (``acquire``) and
+asyncio tasks (``acquire_async``) fairly in arrival order.
+"""
+
+import os
+import threading
+import time
+
+# Requests per minute per model; 0 disables
+LLM_RPM = float(os.getenv("NIFI_NL_LLM_RPM", "0"))
+# Requests per second to NiFi from this process; 0 disables
+NIFI_RATE_LIMIT = float(os.getenv("NIFI_RATE_LIMIT", "0"))
+NIFI_RATE_BURST = float(os.getenv("NIFI_RATE_BURST", "0"))
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``burst``"""
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+        self.requests = 0
+
+    def reserve(self, tokens=1):
+        """Take ``tokens`` now; returns seconds to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            self.requests += 1
+            self.waited += wait
+            return wait
+
+    def acquire(self, tokens=1):
+        """Block the calling thread until ``tokens`` are available"""
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=1):
+        """Sleep the calling task until ``tokens`` are available"""
+        import asyncio
+
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {"rate": self.rate, "burst": self.burst, "requests": self.requests,
+                    "waited": round(self.waited, 3)}
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name, rate=None, burst=None):
+    """Shared bucket registered under ``name``, created on first use.
+
+    Returns None when no rate is configured, so callers can skip limiting.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None and rate:
+            limiter = _limiters[name] = TokenBucket(rate, burst)
+        return limiter
+
+
+def nifi_limiter():
+    """Limiter for every NiFi request of this process (``NIFI_RATE_LIMIT``)"""
+    return get_limiter("nifi", NIFI_RATE_LIMIT, NIFI_RATE_BURST or None)
+
+
+def llm_limiter(model):
+    """Limiter for one model (``NIFI_NL_LLM_RPM`` requests per minute)"""
+    if not LLM_RPM:
+        return None
+    # Allow a few requests back to back, then settle at the configured rate
+    return get_limiter(f"llm:{model}", LLM_RPM / 60.0, max(1.0, LLM_RPM / 60.0 * 5))
+
+
+def limiter_stats():
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,314 @@
+"""
+Long-lived execution service for crew runs.
+
+Building a crew instantiates every agent, tool and LLM and sets up crew
+memory, and ``kickoff`` blocks the calling thread for the whole
+multi-agent run. The service keeps a pool of warm ``NiFiNLCrew``
+instances (one per worker) and runs submitted descriptions on a bounded
+thread pool. Each submission gets a job id backed by a future, with
+cancellation, per-job timeouts and a bounded admission queue.
+
+Threads are used rather than processes: crews hold LLM clients and tool
+objects that cannot be pickled, and a run spends nearly all of its time
+waiting on the LLM and NiFi APIs.
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+SERVICE_WORKERS = int(os.getenv("NIFI_NL_WORKERS", "2"))
+SERVICE_QUEUE_SIZE = int(os.getenv("NIFI_NL_QUEUE_SIZE", "32"))
+SERVICE_JOB_TIMEOUT = float(os.getenv("NIFI_NL_JOB_TIMEOUT", "900"))
+SERVICE_HISTORY = int(os.getenv("NIFI_NL_JOB_HISTORY", "200"))
+# Progress events kept per job; older ones are dropped first
+JOB_EVENT_LIMIT = 1000
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED, TIMED_OUT)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the admission queue is full and the caller won't wait"""
+
+
+class JobTimeoutError(TimeoutError):
+    """Raised from a job's result when it exceeded its time limit"""
+
+
+class Job:
+    """One submitted description and its future"""
+
+    def __init__(self, description, use_cache=True, timeout=None):
+        self.id = uuid.uuid4().hex
+        self.description = description
+        self.use_cache = use_cache
+        self.timeout = timeout
+        self.status = QUEUED
+        self.future = Future()
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.events = deque(maxlen=JOB_EVENT_LIMIT)
+        # Kept apart from the bounded events, which may drop them
+        self.cached_tasks = []
+        self._next_seq = 0
+        self._timer = None
+
+    def record(self, event):
+        """Append a progress event, stamped with a sequence number and time"""
+        event = dict(event, seq=self._next_seq, at=time.time())
+        self._next_seq += 1
+        self.events.append(event)
+        if event.get("type") == "task" and event.get("cached"):
+            self.cached_tasks.append(event["task"])
+
+    @property
+    def done(self):
+        return self.status in FINISHED_STATES
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "description": self.description,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "cached_tasks": list(self.cached_tasks),
+        }
+
+
+class CrewExecutionService:
+    """Bounded worker pool running descriptions on reusable crews.
+
+    ``crew_factory`` builds one crew per worker (default: ``NiFiNLCrew``
+    sharing a single result cache). A running job cannot be interrupted
+    inside CrewAI; cancelling it or hitting its timeout resolves the job
+    immediately and the worker discards the result when the run ends.
+    """
+
+    def __init__(self, workers=SERVICE_WORKERS, queue_size=SERVICE_QUEUE_SIZE,
+                 timeout=SERVICE_JOB_TIMEOUT, history=SERVICE_HISTORY,
+                 crew_factory=None, warm=False):
+        self.workers = workers
+        self.timeout = timeout
+        self.history = history
+        self._crew_factory = crew_factory or self._default_crew
+        self._shared_cache = None
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        # Running plus queued jobs; submit() is refused beyond this
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nifi-crew")
+        self._jobs = OrderedDict()
+        self._closed = False
+        if warm:
+            self.warm_up()
+
+    def _default_crew(self):
+        from .crew import NiFiNLCrew
+
+        with self._lock:
+            if self._shared_cache is None and os.getenv("NIFI_NL_CACHE", "1") != "0":
+                from .cache import ResultCache
+                self._shared_cache = ResultCache()
+        return NiFiNLCrew(cache=self._shared_cache)
+
+    def _reserve_crew(self):
+        """Claim one of the ``workers`` crew slots; False once all exist"""
+        with self._lock:
+            if self._created >= self.workers:
+                return False
+            self._created += 1
+            return True
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        # Crews are built outside the lock so status queries stay responsive
+        return self._crew_factory() if self._reserve_crew() else self._idle.get()
+
+    def warm_up(self):
+        """Build every worker's crew now instead of on its first job"""
+        while self._reserve_crew():
+            crew = self._crew_factory()
+            if hasattr(crew, "warm_up"):
+                crew.warm_up()
+            self._idle.put(crew)
+        return self
+
+    def submit(self, description, use_cache=True, timeout=None, block=False):
+        """Queue a description and return its job id.
+
+        ``timeout`` (seconds of run time, default the service timeout)
+        bounds the job. Raises ``QueueFullError`` when the queue is full
+        unless ``block`` is set.
+        """
+        if self._closed:
+            raise RuntimeError("CrewExecutionService is shut down")
+        if not self._slots.acquire(blocking=block):
+            raise QueueFullError(f"{self.workers} running and queue full; try again later")
+        job = Job(description, use_cache, self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim_history()
+        try:
+            self._executor.submit(self._execute, job).add_done_callback(lambda _: self._slots.release())
+        except RuntimeError:
+            self._slots.release()
+            raise
+        return job.id
+
+    def _trim_history(self):
+        excess = len(self._jobs) - self.history
+        for job_id in [j.id for j in self._jobs.values() if j.done][:max(0, excess)]:
+            del self._jobs[job_id]
+
+    def _finish(self, job, status, result=None, error=None):
+        """Resolve a job exactly once; later outcomes are discarded"""
+        with self._lock:
+            if job.done:
+                return False
+            job.status = status
+            job.finished_at = time.time()
+            job.error = None if error is None else str(error)
+            if job._timer is not None:
+                job._timer.cancel()
+        if status == SUCCEEDED:
+            job.future.set_result(result)
+        elif status == CANCELLED:
+            if not job.future.cancel():
+                job.future.set_exception(CancelledError(f"Job {job.id} was cancelled"))
+        else:
+            job.future.set_exception(error)
+        return True
+
+    def _expire(self, job):
+        self._finish(job, TIMED_OUT, error=JobTimeoutError(
+            f"Job {job.id} exceeded its {job.timeout:g}s time limit"))
+
+    def _execute(self, job):
+        with self._lock:
+            if job.done or not job.future.set_running_or_notify_cancel():
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+            if job.timeout:
+                job._timer = threading.Timer(job.timeout, self._expire, (job,))
+                job._timer.daemon = True
+                job._timer.start()
+
+        crew = self._checkout()
+        try:
+            result = crew.run(job.description, use_cache=job.use_cache, listener=job.record)
+        except Exception as e:
+            self._finish(job, FAILED, error=e)
+        else:
+            self._finish(job, SUCCEEDED, result=result)
+        finally:
+            self._idle.put(crew)
+
+    def _job(self, job_id):
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise KeyError(f"Unknown job id: {job_id}") from None
+
+    def status(self, job_id):
+        """Status dict of one job"""
+        return self._job(job_id).to_dict()
+
+    def future(self, job_id):
+        """The job's ``concurrent.futures.Future``"""
+        return self._job(job_id).future
+
+    def result(self, job_id, timeout=None):
+        """Wait for a job and return its crew output.
+
+        Raises the run's exception, ``JobTimeoutError``, ``CancelledError``,
+        or ``concurrent.futures.TimeoutError`` if ``timeout`` (the wait,
+        not the job) elapses first.
+        """
+        return self._job(job_id).future.result(timeout)
+
+    def events(self, job_id, since=0):
+        """Progress events of a job with ``seq >= since``, oldest first.
+
+        Poll with ``since`` set to one past the last ``seq`` seen to
+        receive only new task outputs and tool calls.
+        """
+        return [event for event in list(self._job(job_id).events) if event["seq"] >= since]
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; False if it already finished"""
+        job = self._job(job_id)
+        return self._finish(job, CANCELLED)
+
+    def jobs(self):
+        """Status dicts of known jobs, oldest first"""
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {"workers": self.workers, "crews": self._created, "jobs": counts}
+
+    def shutdown(self, wait=True, cancel_pending=True):
+        """Stop accepting jobs; optionally cancel the ones still queued"""
+        self._closed = True
+        if cancel_pending:
+            with self._lock:
+                pending = [job for job in self._jobs.values() if job.status == QUEUED]
+            for job in pending:
+                self._finish(job, CANCELLED)
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_service():
+    """Shared execution service configured from the environment"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = CrewExecutionService()
+        return _service
+
+
+def run_many(descriptions, timeout=None, service=None):
+    """Run several descriptions concurrently; returns results or exceptions in order"""
+    service = service or get_service()
+    job_ids = [service.submit(d, timeout=timeout, block=True) for d in descriptions]
+    results = []
+    for job_id in job_ids:
+        try:
+            results.append(service.result(job_id))
+        except (Exception, CancelledError) as e:
+            results.append(e)
+    return results
+
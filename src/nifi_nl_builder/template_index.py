@@ -0,0 +1,186 @@
+"""
+Sparse TF-IDF retrieval index over the ``templates/`` catalog.
+
+Each template is tokenized from its name, description, processor names,
+processor types (split on camel case) and property keys. Documents are
+stored as L2-normalized sparse vectors with an inverted index, so a
+query only touches the postings of its own terms and returns the top-k
+templates in milliseconds even for thousands of templates. Term counts
+are persisted per file and only changed files are re-read on refresh.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+from .cache import CACHE_DIR
+from .tools.flow_spec import TEMPLATES_DIR
+
+INDEX_PATH = Path(os.getenv("NIFI_TEMPLATE_INDEX", CACHE_DIR / "template_index.json"))
+INDEX_VERSION = 1
+
+# Field weights: a match in the name says more than one in a property key
+FIELD_WEIGHTS = {"name": 3, "description": 2, "types": 2, "processors": 1, "properties": 1}
+
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase word tokens, splitting camelCase (``PutHDFS`` -> put, hdfs)"""
+    return _WORD.findall(_CAMEL.sub(" ", str(text)).lower())
+
+
+def template_terms(spec):
+    """Weighted term counts for one template spec"""
+    counts = Counter()
+    fields = {
+        "name": [spec.get("name", "")],
+        "description": [spec.get("description", "")],
+        "processors": [p.get("name", "") for p in spec.get("processors", [])],
+        "types": [p.get("type", "").rsplit(".", 1)[-1] for p in spec.get("processors", [])],
+        "properties": [key for p in spec.get("processors", [])
+                       for key in (p.get("config", {}).get("properties") or {})],
+    }
+    for field, values in fields.items():
+        for value in values:
+            for token in tokenize(value):
+                counts[token] += FIELD_WEIGHTS[field]
+    return counts
+
+
+def requirement_text(requirement):
+    """Flatten a parse_req requirement (dict, YAML text or plain text) to text"""
+    if isinstance(requirement, dict):
+        return " ".join(requirement_text(v) for v in requirement.values())
+    if isinstance(requirement, (list, tuple)):
+        return " ".join(requirement_text(v) for v in requirement)
+    return str(requirement)
+
+
+class TemplateIndex:
+    """Persistent, incrementally refreshed TF-IDF index of flow templates"""
+
+    def __init__(self, templates_dir=TEMPLATES_DIR, index_path=INDEX_PATH):
+        self.templates_dir = Path(templates_dir)
+        self.index_path = Path(index_path)
+        self._lock = threading.Lock()
+        self.docs = {}
+        self._load()
+        self.refresh()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("templates_dir") == str(self.templates_dir):
+                self.docs = data["docs"]
+        except (OSError, ValueError):
+            self.docs = {}
+
+    def _save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".part")
+        with open(tmp_path, "w") as f:
+            json.dump({"version": INDEX_VERSION, "templates_dir": str(self.templates_dir),
+                       "docs": self.docs}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def refresh(self):
+        """Re-read only added or modified templates; returns the number changed"""
+        with self._lock:
+            seen, changed = set(), 0
+            if self.templates_dir.is_dir():
+                for entry in os.scandir(self.templates_dir):
+                    if not entry.name.endswith(".json"):
+                        continue
+                    seen.add(entry.name)
+                    stat = entry.stat()
+                    doc = self.docs.get(entry.name)
+                    if doc and doc["mtime"] == stat.st_mtime and doc["size"] == stat.st_size:
+                        continue
+                    try:
+                        with open(entry.path, "r") as f:
+                            spec = json.load(f)
+                    except (OSError, ValueError) as e:
+                        print(f"⚠️ Skipping template {entry.name}: {e}")
+                        continue
+                    self.docs[entry.name] = {
+                        "mtime": stat.st_mtime,
+                        "size": stat.st_size,
+                        "name": spec.get("name", entry.name[:-5]),
+                        "description": spec.get("description", ""),
+                        "processor_types": [p.get("type", "") for p in spec.get("processors", [])],
+                        "terms": dict(template_terms(spec)),
+                    }
+                    changed += 1
+            for name in [n for n in self.docs if n not in seen]:
+                del self.docs[name]
+                changed += 1
+            if changed or not hasattr(self, "_postings"):
+                self._build_vectors()
+            if changed:
+                self._save()
+            return changed
+
+    def _build_vectors(self):
+        """Compute IDF weights, normalized document vectors and postings"""
+        df = Counter()
+        for doc in self.docs.values():
+            df.update(doc["terms"].keys())
+        n = len(self.docs)
+        self._idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+        self._postings = {}
+        for key, doc in self.docs.items():
+            vector = {t: (1 + math.log(c)) * self._idf[t] for t, c in doc["terms"].items()}
+            norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+            for term, weight in vector.items():
+                self._postings.setdefault(term, []).append((key, weight / norm))
+
+    def search(self, requirement, k=5):
+        """Top-k templates for a requirement, best first, with cosine scores"""
+        query = Counter(tokenize(requirement_text(requirement)))
+        with self._lock:
+            vector = {t: (1 + math.log(c)) * self._idf[t] for t, c in query.items() if t in self._idf}
+            norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+            scores = Counter()
+            for term, weight in vector.items():
+                for key, doc_weight in self._postings.get(term, ()):
+                    scores[key] += weight / norm * doc_weight
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [
+                {
+                    "template": key[:-5],
+                    "name": self.docs[key]["name"],
+                    "description": self.docs[key]["description"],
+                    "processor_types": self.docs[key]["processor_types"],
+                    "score": round(score, 4),
+                }
+                for key, score in best if score > 0
+            ]
+
+    def __len__(self):
+        return len(self.docs)
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+def get_template_index():
+    """Shared index over TEMPLATES_DIR, refreshed on each call for new files"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = TemplateIndex()
+        else:
+            _default_index.refresh()
+    return _default_index
+
+def search_templates(requirement, k=5):
+    """Top-k template matches for a parsed requirement"""
+    return get_template_index().search(requirement, k)
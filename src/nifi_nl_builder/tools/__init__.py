@@ -1,20 +1,58 @@
-from .nifi_tool import NiFiTool
-from .nifi_api import *
-
-__all__ = [
-    'NiFiTool',
-    'create_pg',
-    'add_processor', 
-    'connect',
-    'export_flow',
-    'start_processor',
-    'stop_processor',
-    'get_processor_status',
-    'update_processor_config',
-    'delete_processor',
-    'list_processors',
-    'list_process_groups',
-    'get_flow_status',
-    'create_template',
-    'instantiate_template'
-] 
\ No newline at end of file
+"""
+NiFi REST helpers and CrewAI tools.
+
+Attributes are resolved lazily so importing this package (or one of the
+plain REST helpers) does not pull in aiohttp or crewai.
+"""
+
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    'NiFiClient': '.nifi_api',
+    'get_client': '.nifi_api',
+    'set_client': '.nifi_api',
+    'create_pg': '.nifi_api',
+    'add_processor': '.nifi_api',
+    'connect': '.nifi_api',
+    'export_flow': '.nifi_api',
+    'export_flow_to_file': '.nifi_api',
+    'upload_flow': '.nifi_api',
+    'start_processor': '.nifi_api',
+    'stop_processor': '.nifi_api',
+    'start_flow': '.nifi_api',
+    'stop_flow': '.nifi_api',
+    'get_processor_status': '.nifi_api',
+    'update_processor_config': '.nifi_api',
+    'delete_processor': '.nifi_api',
+    'list_processors': '.nifi_api',
+    'list_process_groups': '.nifi_api',
+    'list_connections': '.nifi_api',
+    'delete_connection': '.nifi_api',
+    'get_flow_status': '.nifi_api',
+    'create_template': '.nifi_api',
+    'instantiate_template': '.nifi_api',
+    'AsyncNiFiClient': '.nifi_async',
+    'AIMDController': '.concurrency',
+    'ProcessorCatalog': '.catalog',
+    'get_catalog': '.catalog',
+    'deploy_to_targets': '.fanout',
+    'validate_spec': '.validator',
+    'check_spec': '.validator',
+    'SpecValidationError': '.validator',
+    'teardown_groups': '.teardown',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,274 @@
+"""
+Local catalog of NiFi processor types, relationships and property descriptors.
+
+The type list (``/flow/processor-types``) is fetched from NiFi once and
+persisted per NiFi URL under ``NIFI_CATALOG_DIR``. It is revalidated at
+most every ``NIFI_CATALOG_TTL`` seconds: a changed ``/flow/about``
+version drops everything, otherwise the list is re-requested with its
+ETag and a 304 keeps the cached copy. Per-type definitions (relationships
+and property descriptors) come from ``/flow/processor-definition`` on
+first use and are kept until the version changes.
+
+Lookups are plain dicts: by fully qualified type, by simple class name
+(case-insensitive) and by property name or display name. So choosing
+relationships, auto-terminating unused ones and checking types and
+properties need no per-component GETs.
+"""
+
+import difflib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from ..cache import CACHE_DIR, stable_hash
+
+CATALOG_DIR = Path(os.getenv("NIFI_CATALOG_DIR", CACHE_DIR / "catalog"))
+# Seconds between revalidations against NiFi
+CATALOG_TTL = float(os.getenv("NIFI_CATALOG_TTL", "3600"))
+# Set to 0 to skip type checks before add_processor
+CATALOG_ENABLED = os.getenv("NIFI_CATALOG", "1").lower() not in ("0", "false", "no")
+CATALOG_FORMAT = 1
+
+
+def short_type(ptype):
+    return ptype.rsplit(".", 1)[-1]
+
+
+def _definition(raw):
+    """Compact form of a NiFi ProcessorDefinition"""
+    properties = {}
+    for name, descriptor in (raw.get("propertyDescriptors") or {}).items():
+        properties[name] = {
+            "display_name": descriptor.get("displayName") or name,
+            "required": bool(descriptor.get("required")),
+            "default": descriptor.get("defaultValue"),
+            "allowable": [v.get("value") for v in descriptor.get("allowableValues") or []] or None,
+            # Required only when another property has a particular value
+            "conditional": bool(descriptor.get("dependencies")),
+        }
+    return {
+        "relationships": [r["name"] for r in raw.get("supportedRelationships") or []],
+        "dynamic_relationships": bool(raw.get("supportsDynamicRelationships")),
+        "dynamic_properties": bool(raw.get("supportsDynamicProperties")),
+        "properties": properties,
+        "display_names": {p["display_name"]: name for name, p in properties.items()},
+    }
+
+
+def _property_names(definition, properties):
+    """Property key -> descriptor name (keys may be display names; None if unknown)"""
+    descriptors = definition["properties"]
+    return {key: key if key in descriptors else definition["display_names"].get(key)
+            for key in properties or {}}
+
+
+class ProcessorCatalog:
+    """Processor types and definitions of one NiFi, persisted to disk"""
+
+    def __init__(self, base_url, directory=CATALOG_DIR, ttl=CATALOG_TTL):
+        self.base_url = base_url.rstrip("/")
+        self.path = Path(directory) / f"{stable_hash(self.base_url)[:16]}.json"
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self.nifi_version = None
+        self.etag = None
+        self.checked_at = 0.0
+        self.types = {}
+        self.definitions = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("format") == CATALOG_FORMAT and data.get("base_url") == self.base_url:
+                self.nifi_version = data["nifi_version"]
+                self.etag = data.get("etag")
+                self.checked_at = data.get("checked_at", 0.0)
+                self.types = data["types"]
+                self.definitions = data.get("definitions", {})
+        except (OSError, ValueError, KeyError):
+            pass
+        self._index()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".part")
+        with open(tmp_path, "w") as f:
+            json.dump({"format": CATALOG_FORMAT, "base_url": self.base_url,
+                       "nifi_version": self.nifi_version, "etag": self.etag,
+                       "checked_at": self.checked_at, "types": self.types,
+                       "definitions": self.definitions}, f)
+        os.replace(tmp_path, self.path)
+
+    def _index(self):
+        self._by_short = {}
+        for ptype in self.types:
+            self._by_short.setdefault(short_type(ptype).lower(), []).append(ptype)
+
+    @property
+    def loaded(self):
+        return bool(self.types)
+
+    def refresh(self, client, force=False):
+        """Revalidate against NiFi (at most every ``ttl``); True if the type list changed"""
+        with self._lock:
+            if not force and self.types and time.time() - self.checked_at < self.ttl:
+                return False
+            about = client.request("GET", "/flow/about").json().get("about", {})
+            version = f"{about.get('version')}/{about.get('buildRevision') or ''}"
+            if version != self.nifi_version:
+                # An upgrade can change every bundle and definition
+                self.types, self.definitions, self.etag = {}, {}, None
+                self.nifi_version = version
+            headers = {"If-None-Match": self.etag} if self.etag and self.types else {}
+            r = client.request("GET", "/flow/processor-types", headers=headers)
+            changed = False
+            if r.status_code != 304:
+                types = {
+                    t["type"]: {"bundle": t.get("bundle") or {}, "description": t.get("description") or "",
+                                "tags": t.get("tags") or []}
+                    for t in r.json().get("processorTypes", [])
+                }
+                changed = types != self.types
+                # Keep definitions only for types whose bundle is unchanged
+                self.definitions = {t: d for t, d in self.definitions.items()
+                                    if t in types and types[t]["bundle"] == self.types.get(t, {}).get("bundle")}
+                self.types = types
+                self.etag = r.headers.get("ETag")
+                self._index()
+            self.checked_at = time.time()
+            self._save()
+            return changed
+
+    def refresh_unknown(self, ptypes, client):
+        """Force one refresh if any of ``ptypes`` is not in the cached list.
+
+        The list can be up to ``ttl`` old, so a type installed since would
+        otherwise be rejected. A failed refresh keeps the cached list.
+        """
+        if not self.types or all(p in self.types for p in ptypes):
+            return
+        try:
+            self.refresh(client, force=True)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"⚠️ Processor catalog not refreshed: {e}")
+
+    def resolve(self, ptype):
+        """Fully qualified type for ``ptype`` or its simple class name; None if unknown or ambiguous"""
+        if ptype in self.types:
+            return ptype
+        matches = self._by_short.get(short_type(ptype).lower(), ())
+        return matches[0] if len(matches) == 1 else None
+
+    def suggest(self, ptype, n=3):
+        """Closest known types by simple class name"""
+        names = difflib.get_close_matches(short_type(ptype).lower(), self._by_short, n)
+        return [t for name in names for t in self._by_short[name]][:n]
+
+    def check_type(self, ptype):
+        """Error message for an unknown type; None if known or the catalog is empty"""
+        if not self.types or ptype in self.types:
+            return None
+        resolved = self.resolve(ptype)
+        if resolved:
+            return f"Unknown processor type '{ptype}'; did you mean '{resolved}'?"
+        suggestions = self.suggest(ptype)
+        hint = f"; did you mean {', '.join(repr(s) for s in suggestions)}?" if suggestions else ""
+        return f"Unknown processor type '{ptype}'{hint}"
+
+    def bundle(self, ptype):
+        info = self.types.get(self.resolve(ptype) or ptype)
+        return dict(info["bundle"]) if info and info["bundle"] else None
+
+    def prefetch(self, ptypes, client):
+        """Fetch missing definitions for ``ptypes``; returns how many were fetched"""
+        with self._lock:
+            missing = {self.resolve(p) for p in ptypes} - set(self.definitions) - {None}
+            for ptype in sorted(missing):
+                bundle = self.types[ptype]["bundle"]
+                try:
+                    r = client.request("GET", f"/flow/processor-definition/{bundle['group']}/"
+                                              f"{bundle['artifact']}/{bundle['version']}/{ptype}")
+                    self.definitions[ptype] = _definition(r.json())
+                except (requests.exceptions.HTTPError, KeyError):
+                    # NiFi before 1.21 has no definition endpoint; remember not to ask again
+                    self.definitions[ptype] = None
+            if missing:
+                self._save()
+            return len(missing)
+
+    def definition(self, ptype, client=None):
+        """Cached definition, fetched on first use when a ``client`` is given"""
+        resolved = self.resolve(ptype) or ptype
+        if resolved not in self.definitions and client is not None and resolved in self.types:
+            self.prefetch([resolved], client)
+        return self.definitions.get(resolved)
+
+    def relationships(self, ptype):
+        """Relationship names of ``ptype``, or None if its definition is not cached"""
+        definition = self.definitions.get(self.resolve(ptype) or ptype)
+        return list(definition["relationships"]) if definition else None
+
+    def missing_properties(self, ptype, properties):
+        """Required properties of ``ptype`` with no default that ``properties`` does not set"""
+        definition = self.definitions.get(self.resolve(ptype) or ptype)
+        if not definition:
+            return []
+        present = set(_property_names(definition, properties).values())
+        return [name for name, descriptor in definition["properties"].items()
+                if descriptor["required"] and not descriptor["conditional"]
+                and descriptor["default"] in (None, "") and name not in present]
+
+    def property_errors(self, ptype, properties, required=True):
+        """Unknown properties, disallowed values and (with ``required``) missing required properties"""
+        definition = self.definitions.get(self.resolve(ptype) or ptype)
+        if not definition:
+            return []
+        errors = []
+        descriptors = definition["properties"]
+        for key, name in _property_names(definition, properties).items():
+            if name is None:
+                if not definition["dynamic_properties"]:
+                    errors.append(f"unknown property '{key}'")
+                continue
+            value = properties[key]
+            allowable = descriptors[name]["allowable"]
+            # Expression Language and parameter references resolve at runtime
+            if allowable and value is not None and str(value) not in allowable and not any(
+                    marker in str(value) for marker in ("${", "#{")):
+                errors.append(f"property '{key}' must be one of {allowable}")
+        if required:
+            errors.extend(f"missing required property '{name}'"
+                          for name in self.missing_properties(ptype, properties))
+        return errors
+
+    def dynamic_relationships(self, ptype):
+        """True if ``ptype`` adds relationships at runtime; None if its definition is not cached"""
+        definition = self.definitions.get(self.resolve(ptype) or ptype)
+        return definition["dynamic_relationships"] if definition else None
+
+    def stats(self):
+        return {"nifi_version": self.nifi_version, "types": len(self.types),
+                "definitions": sum(1 for d in self.definitions.values() if d),
+                "checked_at": self.checked_at}
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_catalog(base_url=None):
+    """Shared catalog for a NiFi URL (default ``NIFI_URL``), loaded from disk on first use"""
+    if base_url is None:
+        from .nifi_api import NIFI
+        base_url = NIFI
+    base_url = base_url.rstrip("/")
+    with _catalogs_lock:
+        catalog = _catalogs.get(base_url)
+        if catalog is None:
+            catalog = _catalogs[base_url] = ProcessorCatalog(base_url)
+        return catalog
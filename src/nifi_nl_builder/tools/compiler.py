@@ -0,0 +1,396 @@
+"""
+Offline compiler from structured flow specs to NiFi flow definitions.
+
+Turns a ``templates/*.json`` spec, or the YAML requirement produced by
+the ``parse_req`` task (source_type, transforms[], destination_type),
+into a complete versioned flow definition document. Processors,
+connections, relationships and layout are generated locally. The
+document is then uploaded as a new process group in a single request.
+"""
+
+import json
+import os
+import uuid
+from collections import deque
+
+from .flow_spec import connection_relationships
+from .nifi_api import get_client
+
+# NiFi resolves compatible bundles on upload, so the version is a hint
+BUNDLE_VERSION = os.getenv("NIFI_BUNDLE_VERSION", "2.0.0")
+ID_NAMESPACE = uuid.UUID("6f1c1c52-8a3e-4d0e-9b7a-2f4e5c1d9a10")
+
+STANDARD = "org.apache.nifi.processors.standard."
+STANDARD_NAR = "nifi-standard-nar"
+
+# Bundle artifact for processor packages outside the standard NAR
+ARTIFACTS = {
+    "org.apache.nifi.processors.kafka.pubsub.": "nifi-kafka-2-6-nar",
+    "org.apache.nifi.processors.hadoop.": "nifi-hadoop-nar",
+    "org.apache.nifi.processors.aws.s3.": "nifi-aws-nar",
+    "org.apache.nifi.processors.elasticsearch.": "nifi-elasticsearch-restapi-nar",
+    "org.apache.nifi.processors.attributes.": "nifi-update-attribute-nar",
+    "org.apache.nifi.processors.jolt.": "nifi-jolt-nar",
+}
+
+# Relationships of the processors the requirement mapping can emit; any
+# that are not connected get auto-terminated so the processor is valid
+RELATIONSHIPS = {
+    "GetFile": ["success"],
+    "PutFile": ["success", "failure"],
+    "GenerateFlowFile": ["success"],
+    "LogAttribute": ["success"],
+    "ReplaceText": ["success", "failure"],
+    "RouteOnAttribute": ["matched", "unmatched"],
+    "UpdateAttribute": ["success"],
+    "SplitText": ["splits", "original", "failure"],
+    "MergeContent": ["merged", "original", "failure"],
+    "ConvertRecord": ["success", "failure"],
+    "EvaluateJsonPath": ["matched", "unmatched", "failure"],
+    "CompressContent": ["success", "failure"],
+    "JoltTransformJSON": ["success", "failure"],
+    "ListenHTTP": ["success"],
+    "InvokeHTTP": ["Original", "Response", "Retry", "No Retry", "Failure"],
+    "QueryDatabaseTable": ["success"],
+    "PutDatabaseRecord": ["success", "failure", "retry"],
+    "GetSFTP": ["success"],
+    "PutSFTP": ["success", "failure", "reject"],
+    "ConsumeKafka_2_6": ["success"],
+    "PublishKafka_2_6": ["success", "failure"],
+    "GetHDFS": ["success"],
+    "PutHDFS": ["success", "failure"],
+    "ListS3": ["success"],
+    "PutS3Object": ["success", "failure"],
+    "PutElasticsearchJson": ["original", "failure", "retry", "errors", "successful"],
+}
+
+# parse_req vocabulary -> (processor type, default properties, outgoing relationship)
+SOURCE_TYPES = {
+    "kafka": ("org.apache.nifi.processors.kafka.pubsub.ConsumeKafka_2_6", {}, "success"),
+    "file": (STANDARD + "GetFile", {}, "success"),
+    "hdfs": ("org.apache.nifi.processors.hadoop.GetHDFS", {}, "success"),
+    "s3": ("org.apache.nifi.processors.aws.s3.ListS3", {}, "success"),
+    "http": (STANDARD + "ListenHTTP", {}, "success"),
+    "sftp": (STANDARD + "GetSFTP", {}, "success"),
+    "database": (STANDARD + "QueryDatabaseTable", {}, "success"),
+    "generate": (STANDARD + "GenerateFlowFile", {}, "success"),
+}
+TRANSFORM_TYPES = {
+    "filter": (STANDARD + "RouteOnAttribute", {"Routing Strategy": "Route to 'matched' if all match"}, "matched"),
+    "route": (STANDARD + "RouteOnAttribute", {"Routing Strategy": "Route to 'matched' if all match"}, "matched"),
+    "replace": (STANDARD + "ReplaceText", {}, "success"),
+    "convert": (STANDARD + "ConvertRecord", {}, "success"),
+    "json": ("org.apache.nifi.processors.jolt.JoltTransformJSON", {}, "success"),
+    "evaluate": (STANDARD + "EvaluateJsonPath", {}, "matched"),
+    "split": (STANDARD + "SplitText", {}, "splits"),
+    "merge": (STANDARD + "MergeContent", {}, "merged"),
+    "compress": (STANDARD + "CompressContent", {}, "success"),
+    "attribute": ("org.apache.nifi.processors.attributes.UpdateAttribute", {}, "success"),
+    "log": (STANDARD + "LogAttribute", {}, "success"),
+}
+DESTINATION_TYPES = {
+    "hdfs": ("org.apache.nifi.processors.hadoop.PutHDFS", {}, None),
+    "kafka": ("org.apache.nifi.processors.kafka.pubsub.PublishKafka_2_6", {}, None),
+    "file": (STANDARD + "PutFile", {}, None),
+    "s3": ("org.apache.nifi.processors.aws.s3.PutS3Object", {}, None),
+    "http": (STANDARD + "InvokeHTTP", {}, None),
+    "sftp": (STANDARD + "PutSFTP", {}, None),
+    "database": (STANDARD + "PutDatabaseRecord", {}, None),
+    "elasticsearch": ("org.apache.nifi.processors.elasticsearch.PutElasticsearchJson", {}, None),
+    "log": (STANDARD + "LogAttribute", {}, None),
+}
+
+
+def _short_type(ptype):
+    return ptype.rsplit(".", 1)[-1]
+
+
+def known_relationships(ptype, catalog=None):
+    """Relationships of ``ptype`` from the processor catalog, else the built-in table"""
+    if catalog is not None:
+        relationships = catalog.relationships(ptype)
+        if relationships is not None:
+            return relationships
+    return RELATIONSHIPS.get(_short_type(ptype), [])
+
+
+def _bundle(ptype, catalog=None):
+    bundle = catalog.bundle(ptype) if catalog is not None else None
+    if bundle:
+        return bundle
+    artifact = STANDARD_NAR
+    for package, nar in ARTIFACTS.items():
+        if ptype.startswith(package):
+            artifact = nar
+            break
+    return {"group": "org.apache.nifi", "artifact": artifact, "version": BUNDLE_VERSION}
+
+
+def _lookup(table, item, kind):
+    """Resolve a parse_req entry (string or {type, properties}) against a vocabulary"""
+    if isinstance(item, dict):
+        label = str(item.get("type") or item.get("name") or "")
+        properties = item.get("properties") or {}
+    else:
+        label, properties = str(item), {}
+    words = label.lower()
+    for keyword, (ptype, defaults, relationship) in table.items():
+        if keyword in words:
+            return ptype, dict(defaults, **properties), relationship
+    raise ValueError(f"Unknown {kind} '{label}'; expected one of: {', '.join(table)}")
+
+
+def spec_from_requirement(requirement, name="Generated Flow"):
+    """Build a linear flow spec from a parse_req requirement (YAML text or dict)"""
+    if isinstance(requirement, str):
+        import yaml
+        requirement = yaml.safe_load(requirement)
+
+    stages = [("source", _lookup(SOURCE_TYPES, requirement["source_type"], "source_type"))]
+    for i, transform in enumerate(requirement.get("transforms") or []):
+        stages.append((f"transform_{i + 1}", _lookup(TRANSFORM_TYPES, transform, "transform")))
+    stages.append(("destination", _lookup(DESTINATION_TYPES, requirement["destination_type"], "destination_type")))
+
+    processors, connections = [], []
+    for i, (stage_name, (ptype, properties, relationship)) in enumerate(stages):
+        processors.append({"name": stage_name, "type": ptype, "config": {"properties": properties}})
+        if i + 1 < len(stages):
+            connections.append({"source": stage_name, "target": stages[i + 1][0],
+                                "relationships": [relationship]})
+    return {
+        "name": requirement.get("name", name),
+        "description": requirement.get("description", ""),
+        "processors": processors,
+        "connections": connections,
+    }
+
+
+def _layout(spec):
+    """Grid positions by topological level (cycles fall to the last level)"""
+    names = [p["name"] for p in spec.get("processors", [])]
+    indegree = {name: 0 for name in names}
+    edges = {name: [] for name in names}
+    for connection in spec.get("connections", []):
+        if connection["source"] in edges and connection["target"] in indegree:
+            edges[connection["source"]].append(connection["target"])
+            indegree[connection["target"]] += 1
+
+    level = {}
+    queue = deque(name for name in names if indegree[name] == 0)
+    for name in queue:
+        level[name] = 0
+    while queue:
+        name = queue.popleft()
+        for target in edges[name]:
+            indegree[target] -= 1
+            level[target] = max(level.get(target, 0), level[name] + 1)
+            if indegree[target] == 0:
+                queue.append(target)
+    last = max(level.values(), default=-1) + 1
+    for name in names:
+        if indegree[name] > 0:
+            level[name] = last
+
+    positions, columns = {}, {}
+    for name in names:
+        column = columns.get(level[name], 0)
+        columns[level[name]] = column + 1
+        positions[name] = {"x": float(column * 400), "y": float(level[name] * 200)}
+    return positions
+
+
+def resolve_relationships(spec, catalog=None):
+    """Copy of ``spec`` ready to build against a live NiFi.
+
+    Connections without explicit relationships are pinned to the one
+    NiFi would pick (the processor's first relationship), and processors
+    without ``autoTerminatedRelationships`` get every known relationship
+    that is not connected, so they are valid once built. Relationships
+    come from ``catalog`` when it has the type, else from RELATIONSHIPS.
+    """
+    processors = {p["name"]: p for p in spec.get("processors", [])}
+    connected = {name: set() for name in processors}
+    connections = []
+    for connection in spec.get("connections", []):
+        relationships = connection_relationships(connection)
+        source = processors.get(connection["source"])
+        if relationships is None:
+            known = known_relationships(source["type"], catalog) if source else []
+            relationships = known[:1] or ["success"]
+        if source is not None:
+            connected[source["name"]].update(relationships)
+        pinned = {k: v for k, v in connection.items() if k not in ("relationship", "relationships")}
+        connections.append(dict(pinned, relationships=list(relationships)))
+
+    resolved = []
+    for processor in spec.get("processors", []):
+        config = dict(processor.get("config") or {})
+        if "autoTerminatedRelationships" not in config:
+            known = known_relationships(processor["type"], catalog)
+            unused = [r for r in known if r not in connected[processor["name"]]]
+            if unused:
+                config["autoTerminatedRelationships"] = unused
+        resolved.append(dict(processor, config=config))
+    return dict(spec, processors=resolved, connections=connections)
+
+
+def _identifier(*parts):
+    return str(uuid.uuid5(ID_NAMESPACE, "/".join(parts)))
+
+
+def compile_flow(spec, catalog=None):
+    """Compile a flow spec into a NiFi versioned flow definition document.
+
+    Relationships are pinned and auto-terminated by
+    ``resolve_relationships`` first. With a processor ``catalog`` the
+    target NiFi's real bundles and relationships are used instead of the
+    built-in defaults.
+    """
+    spec = resolve_relationships(spec, catalog)
+    flow_name = spec["name"]
+    group_id = _identifier(flow_name)
+    positions = _layout(spec)
+    ids = {p["name"]: _identifier(flow_name, p["name"]) for p in spec.get("processors", [])}
+
+    connections = []
+    for connection in spec.get("connections", []):
+        source, target = connection["source"], connection["target"]
+        if source not in ids or target not in ids:
+            raise ValueError(f"Connection {source} -> {target} references an unknown processor")
+        relationships = connection["relationships"]
+        connections.append({
+            "identifier": _identifier(flow_name, source, target, *relationships),
+            "name": "",
+            "source": {"id": ids[source], "type": "PROCESSOR", "groupId": group_id, "name": source},
+            "destination": {"id": ids[target], "type": "PROCESSOR", "groupId": group_id, "name": target},
+            "selectedRelationships": relationships,
+            "labelIndex": 1,
+            "zIndex": 0,
+            "backPressureObjectThreshold": 10000,
+            "backPressureDataSizeThreshold": "1 GB",
+            "flowFileExpiration": "0 sec",
+            "prioritizers": [],
+            "bends": [],
+            "loadBalanceStrategy": "DO_NOT_LOAD_BALANCE",
+            "partitioningAttribute": "",
+            "loadBalanceCompression": "DO_NOT_COMPRESS",
+            "componentType": "CONNECTION",
+            "groupIdentifier": group_id,
+        })
+
+    processors = []
+    for processor in spec.get("processors", []):
+        config = processor["config"]
+        processors.append({
+            "identifier": ids[processor["name"]],
+            "name": processor["name"],
+            "comments": config.get("comments", ""),
+            "position": positions[processor["name"]],
+            "type": processor["type"],
+            "bundle": _bundle(processor["type"], catalog),
+            "properties": dict(config.get("properties", {})),
+            "propertyDescriptors": {},
+            "style": {},
+            "schedulingPeriod": config.get("schedulingPeriod", "0 sec"),
+            "schedulingStrategy": config.get("schedulingStrategy", "TIMER_DRIVEN"),
+            "executionNode": config.get("executionNode", "ALL"),
+            "penaltyDuration": config.get("penaltyDuration", "30 sec"),
+            "yieldDuration": config.get("yieldDuration", "1 sec"),
+            "bulletinLevel": config.get("bulletinLevel", "WARN"),
+            "runDurationMillis": config.get("runDurationMillis", 0),
+            "concurrentlySchedulableTaskCount": config.get("concurrentlySchedulableTaskCount", 1),
+            "autoTerminatedRelationships": list(config.get("autoTerminatedRelationships") or []),
+            "scheduledState": "ENABLED",
+            "retryCount": 10,
+            "retriedRelationships": [],
+            "backoffMechanism": "PENALIZE_FLOWFILE",
+            "maxBackoffPeriod": "10 mins",
+            "componentType": "PROCESSOR",
+            "groupIdentifier": group_id,
+        })
+
+    return {
+        "flowContents": {
+            "identifier": group_id,
+            "name": flow_name,
+            "comments": spec.get("description", ""),
+            "position": {"x": 0.0, "y": 0.0},
+            "processGroups": [],
+            "remoteProcessGroups": [],
+            "processors": processors,
+            "inputPorts": [],
+            "outputPorts": [],
+            "connections": connections,
+            "labels": [],
+            "funnels": [],
+            "controllerServices": [],
+            "defaultFlowFileExpiration": "0 sec",
+            "defaultBackPressureObjectThreshold": 10000,
+            "defaultBackPressureDataSizeThreshold": "1 GB",
+            "flowFileConcurrency": "UNBOUNDED",
+            "flowFileOutboundPolicy": "STREAM_WHEN_AVAILABLE",
+            "componentType": "PROCESS_GROUP",
+        },
+        "externalControllerServices": {},
+        "parameterContexts": {},
+        "parameterProviders": {},
+        "flowEncodingVersion": "1.0",
+    }
+
+
+def compile_and_upload(spec, parent="root", client=None, resolve_ids=True):
+    """Compile ``spec`` locally and create it as a process group in one upload.
+
+    With ``resolve_ids`` one extra listing maps processor names to the
+    ids NiFi assigned; otherwise the result only has the group id. Raises
+    ``SpecValidationError`` before uploading if the spec is invalid.
+    """
+    from .validator import check_spec
+
+    client = client or get_client()
+    catalog = client.processor_catalog()
+    if catalog.loaded:
+        ptypes = [p["type"] for p in spec.get("processors", [])]
+        catalog.refresh_unknown(ptypes, client)
+        catalog.prefetch(ptypes, client)
+    check_spec(spec, catalog)
+    definition = compile_flow(spec, catalog)
+    pg_id = client.upload_flow(definition, spec["name"], parent)
+    result = {"process_group_id": pg_id}
+    if resolve_ids:
+        result["processors"] = {p["component"]["name"]: p["id"] for p in client.list_processors(pg_id)}
+    return result
+
+
+def main():
+    """Compile a spec (templates JSON or parse_req YAML) from the command line"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile a flow spec into a NiFi flow definition")
+    parser.add_argument("spec", help="templates/*.json spec or parse_req YAML file")
+    parser.add_argument("-o", "--output", help="write the flow definition to this file")
+    parser.add_argument("--upload", action="store_true", help="upload as a new process group")
+    parser.add_argument("--parent", default="root", help="parent process group id for --upload")
+    args = parser.parse_args()
+
+    with open(args.spec, "r") as f:
+        text = f.read()
+    if args.spec.endswith(".json"):
+        spec = json.loads(text)
+    else:
+        spec = spec_from_requirement(text)
+
+    if args.upload:
+        print(json.dumps(compile_and_upload(spec, args.parent), indent=2))
+    else:
+        definition = json.dumps(compile_flow(spec), indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(definition)
+        else:
+            print(definition)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,192 @@
+"""
+Adaptive client-side flow control for the NiFi REST API.
+
+``AIMDController`` replaces a fixed concurrency cap. Each response that
+comes back within ``latency_target`` without an overload status grows the
+in-flight limit by about one per round trip (additive increase). A 429,
+a 5xx gateway error, a connection failure or a slow response halves it
+(multiplicative decrease), at most once per ``latency_target`` so one
+burst of failures counts as one signal. Parallel deploys therefore ramp
+up on an idle NiFi and back off on a busy one.
+
+``EndpointRateLimits`` puts a token bucket in front of individual
+endpoints (``NIFI_ENDPOINT_RATES``), for example to cap processor
+creation on a shared cluster while reads stay unthrottled.
+
+Controllers are shared per NiFi base URL, so every ``AsyncNiFiClient``
+pointed at the same cluster backs off together.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from ..metrics import endpoint_template
+from ..ratelimit import TokenBucket
+
+MIN_CONCURRENCY = int(os.getenv("NIFI_MIN_CONCURRENCY", "1"))
+# Responses slower than this count as an overload signal (seconds)
+LATENCY_TARGET = float(os.getenv("NIFI_LATENCY_TARGET", "2.0"))
+# "METHOD /endpoint/{id}=rate" pairs, comma separated; "*" matches any endpoint
+ENDPOINT_RATES = os.getenv("NIFI_ENDPOINT_RATES", "")
+OVERLOAD_STATUSES = frozenset([429, 502, 503, 504, "error"])
+MAX_RETRY_DELAY = 30.0
+
+
+def _resolve(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AIMDController:
+    """In-flight request limit adapted to observed latency and errors.
+
+    Safe to share between event loops in different threads: waiters are
+    woken with ``call_soon_threadsafe`` on their own loop.
+    """
+
+    def __init__(self, initial=None, minimum=MIN_CONCURRENCY, maximum=8,
+                 latency_target=LATENCY_TARGET, increase=1.0, decrease=0.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial or self.maximum)))
+        self.latency_target = latency_target
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.peak = 0
+        self.decreases = 0
+        self.overloads = 0
+        self._last_decrease = 0.0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        """Wait for a free slot under the current limit"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    self.peak = max(self.peak, self.in_flight)
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+                    self._wake()
+                raise
+
+    def release(self, latency, status):
+        """Free a slot and adapt the limit to how the request went"""
+        with self._lock:
+            self.in_flight -= 1
+            if status in OVERLOAD_STATUSES or latency > self.latency_target:
+                self.overloads += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= self.latency_target:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+                    self.decreases += 1
+            else:
+                self.limit = min(self.maximum, self.limit + self.increase / max(self.limit, 1.0))
+            self._wake()
+
+    def raise_maximum(self, maximum):
+        """Let the limit grow up to ``maximum`` if that is above the current ceiling"""
+        with self._lock:
+            self.maximum = max(self.maximum, maximum)
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            loop, waiter = self._waiters.popleft()
+            if loop.is_closed():
+                continue
+            loop.call_soon_threadsafe(_resolve, waiter)
+            free -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "peak": self.peak,
+                "waiting": len(self._waiters),
+                "overloads": self.overloads,
+                "decreases": self.decreases,
+            }
+
+
+class EndpointRateLimits:
+    """Token buckets keyed by ``"METHOD /endpoint/{id}"``"""
+
+    def __init__(self, rates=None):
+        self.buckets = {key: TokenBucket(rate) for key, rate in (rates or {}).items() if rate > 0}
+
+    @classmethod
+    def parse(cls, text):
+        """``"POST /process-groups/{id}/processors=20, * =50"`` -> limits"""
+        rates = {}
+        for item in text.split(","):
+            if "=" not in item:
+                continue
+            key, rate = item.rsplit("=", 1)
+            rates[" ".join(key.split())] = float(rate)
+        return cls(rates)
+
+    def get(self, method, path):
+        """Bucket for a request, or None if its endpoint is unlimited"""
+        if not self.buckets:
+            return None
+        return self.buckets.get(f"{method} {endpoint_template(path)}") or self.buckets.get("*")
+
+    def stats(self):
+        return {key: bucket.stats() for key, bucket in self.buckets.items()}
+
+    def __bool__(self):
+        return bool(self.buckets)
+
+
+def retry_delay(attempt, backoff_factor, retry_after=None):
+    """Full-jitter exponential backoff, honouring a numeric Retry-After header"""
+    if retry_after:
+        try:
+            return min(MAX_RETRY_DELAY, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(MAX_RETRY_DELAY, backoff_factor * (2 ** attempt)))
+
+
+_controllers = {}
+_endpoint_limits = {}
+_registry_lock = threading.Lock()
+
+def controller_for(base_url, maximum, initial=None):
+    """Shared controller for one NiFi base URL, created on first use.
+
+    Its ceiling is the largest ``maximum`` any client of that URL asked for.
+    """
+    with _registry_lock:
+        controller = _controllers.get(base_url)
+        if controller is None:
+            controller = _controllers[base_url] = AIMDController(initial, maximum=maximum)
+        else:
+            controller.raise_maximum(maximum)
+        return controller
+
+
+def endpoint_limits_for(base_url):
+    """Shared per-endpoint buckets for one NiFi base URL (``NIFI_ENDPOINT_RATES``)"""
+    with _registry_lock:
+        limits = _endpoint_limits.get(base_url)
+        if limits is None:
+            limits = _endpoint_limits[base_url] = EndpointRateLimits.parse(ENDPOINT_RATES)
+        return limits
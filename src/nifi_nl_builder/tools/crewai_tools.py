@@ -2,72 +2,249 @@
 CrewAI-compatible NiFi tools using BaseTool
 """
 
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
 from crewai.tools import BaseTool
+
+from ..metrics import record_tool_call
+from .projections import fetch_more, project
 from .nifi_api import (
-    create_pg, add_processor, connect, export_flow,
+    create_pg, add_processor, connect, export_flow, export_flow_to_file,
     start_processor, stop_processor, get_processor_status,
     update_processor_config, delete_processor, list_processors,
     list_process_groups, get_flow_status, create_template,
-    instantiate_template
+    instantiate_template, get_client
 )
 
-class CreateProcessGroupTool(BaseTool):
+_listeners = threading.local()
+
+@contextmanager
+def listen_tool_calls(callback):
+    """Report each tool call made on this thread to ``callback(event)``.
+
+    Events carry the tool name, arguments, latency in seconds, result size
+    in characters and the error message if the call raised.
+    """
+    stack = getattr(_listeners, "stack", None)
+    if stack is None:
+        stack = _listeners.stack = []
+    stack.append(callback)
+    try:
+        yield
+    finally:
+        stack.remove(callback)
+
+def _result_size(result):
+    if isinstance(result, (str, bytes)):
+        return len(result)
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return len(str(result))
+
+def _observed(run):
+    """Wrap a tool's ``_run`` to record metrics and notify active listeners"""
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        result, error = None, None
+        try:
+            result = run(self, *args, **kwargs)
+            return result
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            latency = time.perf_counter() - started
+            size = 0 if error else _result_size(result)
+            record_tool_call(self.name, latency, size, error)
+            event = {
+                "tool": self.name,
+                "arguments": kwargs or list(args),
+                "latency": round(latency, 4),
+                "result_size": size,
+                "error": error,
+            }
+            for callback in list(getattr(_listeners, "stack", ())):
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"⚠️ Tool listener failed: {e}")
+    return wrapper
+
+class NiFiBaseTool(BaseTool):
+    """BaseTool whose subclasses report their calls to ``listen_tool_calls``"""
+    
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs):
+        super().__pydantic_init_subclass__(**kwargs)
+        if "_run" in cls.__dict__:
+            cls._run = _observed(cls.__dict__["_run"])
+
+class CreateProcessGroupTool(NiFiBaseTool):
     name: str = "create_nifi_process_group"
     description: str = "Create a new process group in NiFi"
     
     def _run(self, name: str, parent: str = "root") -> str:
         return create_pg(name, parent)
 
-class AddProcessorTool(BaseTool):
+class AddProcessorTool(NiFiBaseTool):
     name: str = "add_nifi_processor"
     description: str = "Add a processor to a process group"
     
     def _run(self, process_group_id: str, processor_type: str, config: dict) -> str:
         return add_processor(process_group_id, processor_type, config)
 
-class ConnectProcessorsTool(BaseTool):
+class ConnectProcessorsTool(NiFiBaseTool):
     name: str = "connect_nifi_processors"
     description: str = "Connect two processors or process groups"
     
     def _run(self, source_id: str, target_id: str, process_group_id: str = "root") -> str:
         return connect(source_id, target_id, process_group_id)
 
-class StartProcessorTool(BaseTool):
+class StartProcessorTool(NiFiBaseTool):
     name: str = "start_nifi_processor"
     description: str = "Start a processor"
     
     def _run(self, processor_id: str) -> dict:
-        return start_processor(processor_id)
+        return project(self.name, start_processor(processor_id))
 
-class StopProcessorTool(BaseTool):
+class StopProcessorTool(NiFiBaseTool):
     name: str = "stop_nifi_processor"
     description: str = "Stop a processor"
     
     def _run(self, processor_id: str) -> dict:
-        return stop_processor(processor_id)
+        return project(self.name, stop_processor(processor_id))
 
-class ListProcessorsTool(BaseTool):
+class ListProcessorsTool(NiFiBaseTool):
     name: str = "list_nifi_processors"
     description: str = "List all processors in a process group"
     
-    def _run(self, process_group_id: str = "root") -> list:
-        return list_processors(process_group_id)
+    def _run(self, process_group_id: str = "root") -> dict:
+        return project(self.name, list_processors(process_group_id))
 
-class GetFlowStatusTool(BaseTool):
+class GetFlowStatusTool(NiFiBaseTool):
     name: str = "get_nifi_flow_status"
     description: str = "Get overall flow status and statistics"
     
     def _run(self, process_group_id: str = "root") -> dict:
-        return get_flow_status(process_group_id)
+        return project(self.name, get_flow_status(process_group_id))
 
-class ExportFlowTool(BaseTool):
+class ExportFlowTool(NiFiBaseTool):
     name: str = "export_nifi_flow"
-    description: str = "Export flow definition as JSON"
+    description: str = "Export flow definition as JSON. Pass output_path to stream it to a file and get back only the path and size"
     
-    def _run(self, process_group_id: str = "root") -> dict:
-        return export_flow(process_group_id)
+    def _run(self, process_group_id: str = "root", output_path: str = None) -> dict:
+        if output_path:
+            return export_flow_to_file(process_group_id, output_path)
+        return project(self.name, export_flow(process_group_id))
+
+class FetchMoreOutputTool(NiFiBaseTool):
+    name: str = "fetch_more_nifi_output"
+    description: str = (
+        "Page through a list that another NiFi tool truncated to save context. Pass the 'handle' "
+        "and 'offset' from its 'truncated' note; returns the next items and next_offset (null when done)"
+    )
+
+    def _run(self, handle: str, offset: int = 0) -> dict:
+        return fetch_more(handle, offset)
+
+def _validated_spec(flow_name, processors, connections):
+    """Spec, catalog and validation result, with definitions of its types prefetched"""
+    from .validator import validate_spec
+
+    spec = {"name": flow_name, "processors": processors, "connections": connections}
+    client = get_client()
+    catalog = client.processor_catalog()
+    if catalog.loaded and isinstance(processors, list):
+        ptypes = [p["type"] for p in processors if isinstance(p, dict) and p.get("type")]
+        catalog.refresh_unknown(ptypes, client)
+        catalog.prefetch(ptypes, client)
+    return spec, catalog, validate_spec(spec, catalog)
+
+class ValidateFlowSpecTool(NiFiBaseTool):
+    name: str = "validate_nifi_flow_spec"
+    description: str = (
+        "Check a flow spec (same flow_name, processors and connections as build_nifi_flow_from_spec) "
+        "without creating anything: unknown processor types, connections to missing processors, unknown "
+        "relationships, missing required properties, cycles without a failure/retry/unmatched path and "
+        "relationships that are neither connected nor auto-terminated. Returns valid, errors and warnings"
+    )
+
+    def _run(self, flow_name: str, processors: list, connections: list) -> dict:
+        return _validated_spec(flow_name, processors, connections)[2]
+
+# Comments of the groups build_nifi_flow_from_spec creates; only these are updated by name
+SPEC_TOOL_TAG = "Built by build_nifi_flow_from_spec"
+
+def _tagged_group(client, name, parent_id):
+    """Id of the child group called ``name`` that the spec tool created, or None"""
+    for group in client.list_process_groups(parent_id):
+        component = group["component"]
+        if component["name"] == name and component.get("comments") == SPEC_TOOL_TAG:
+            return group["id"]
+    return None
+
+class BuildFlowFromSpecTool(NiFiBaseTool):
+    name: str = "build_nifi_flow_from_spec"
+    description: str = (
+        "Build a whole flow in one call. processors: list of {name, type (fully qualified class), "
+        "config: {properties, schedulingPeriod, autoTerminatedRelationships}}; connections: list of "
+        "{source, target, relationships} using processor names. Creates a new process group flow_name "
+        "under parent_id and returns the group id, a processor name -> id map and any errors and "
+        "warnings. Leave process_group_id empty for a new flow; to fix a flow, call again with its "
+        "process_group_id and the group is updated in place. "
+        "The spec is validated first and nothing is created if it has errors. Unconnected "
+        "relationships are auto-terminated"
+    )
+
+    def _run(self, flow_name: str, processors: list, connections: list, parent_id: str = "root",
+             process_group_id: str = "") -> dict:
+        from .compiler import resolve_relationships
+        from .reconcile import reconcile
+
+        spec, catalog, validation = _validated_spec(flow_name, processors, connections)
+        if not validation["valid"]:
+            return {"process_group_id": process_group_id or None, "processors": {}, "errors": validation["errors"],
+                    "warnings": validation["warnings"]}
+        spec = resolve_relationships(spec, catalog)
+        client = get_client()
+        if not process_group_id:
+            # A retried call updates the group it built; a group that merely shares the name is left alone
+            process_group_id = _tagged_group(client, flow_name, parent_id)
+        if not process_group_id:
+            process_group_id = client.create_pg(flow_name, parent_id, comments=SPEC_TOOL_TAG)
+        result = reconcile(spec, pg_id=process_group_id, client=client)
+        return {
+            "process_group_id": result["process_group_id"],
+            "processors": result.get("processors", {}),
+            "operations": result["operations"],
+            "errors": result.get("errors", []),
+            "warnings": validation["warnings"],
+        }
+
+class SearchTemplatesTool(NiFiBaseTool):
+    name: str = "search_nifi_templates"
+    description: str = "Shortlist the best matching flow templates for parsed requirements (source, transforms, destination)"
+    
+    def _run(self, requirements: str, top_k: int = 5) -> list:
+        from ..template_index import search_templates
+        return search_templates(requirements, top_k)
 
 # Function-based tools for backward compatibility
+def build_nifi_flow_from_spec(flow_name: str, processors: list, connections: list, parent_id: str = "root",
+                              process_group_id: str = "") -> dict:
+    """Build a whole flow from a processor/connection spec, or update the group ``process_group_id``"""
+    return BuildFlowFromSpecTool()._run(flow_name, processors, connections, parent_id, process_group_id)
+
+def validate_nifi_flow_spec(flow_name: str, processors: list, connections: list) -> dict:
+    """Validate a processor/connection spec without building it"""
+    return ValidateFlowSpecTool()._run(flow_name, processors, connections)
+
 def create_nifi_process_group(name: str, parent: str = "root") -> str:
     """Create a new process group in NiFi"""
     return create_pg(name, parent)
@@ -96,6 +273,8 @@ def get_nifi_flow_status(process_group_id: str = "root") -> dict:
     """Get overall flow status and statistics"""
     return get_flow_status(process_group_id)
 
-def export_nifi_flow(process_group_id: str = "root") -> dict:
-    """Export flow definition as JSON"""
+def export_nifi_flow(process_group_id: str = "root", output_path: str = None) -> dict:
+    """Export flow definition as JSON (streamed to output_path when given)"""
+    if output_path:
+        return export_flow_to_file(process_group_id, output_path)
     return export_flow(process_group_id) 
\ No newline at end of file
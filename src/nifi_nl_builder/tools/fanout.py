@@ -0,0 +1,198 @@
+"""
+Deploy one flow to several NiFi instances at once.
+
+Targets are a list of endpoints with their credentials, usually kept in
+a JSON file:
+
+    [
+      {"name": "dev", "url": "http://nifi-dev:8080", "username": "admin", "password_env": "DEV_NIFI_PASSWORD"},
+      {"name": "prod-eu", "url": "https://nifi-eu:8443", "token_env": "PROD_EU_NIFI_TOKEN", "parent": "<pg id>"}
+    ]
+
+Secrets are given inline or read from the environment variable named by
+``token_env`` / ``password_env``. Every target gets its own
+``NiFiClient``, and so its own connection pool and rate-limit bucket.
+The deploys run on a thread pool. A flow spec is compiled per target
+against that NiFi's processor catalog and uploaded in one request. An
+exported flow definition is uploaded unchanged.
+
+With ``rollback=True`` a failure on any target deletes the process
+groups already created on the others, and targets that have not started
+yet are skipped, so the fleet ends up all-or-nothing.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..ratelimit import NIFI_RATE_BURST, NIFI_RATE_LIMIT, get_limiter
+from .compiler import compile_and_upload
+from .flow_spec import load_template
+from .nifi_api import NiFiClient, POOL_SIZE, TIMEOUT
+
+FANOUT_PARALLELISM = int(os.getenv("NIFI_FANOUT_PARALLELISM", "8"))
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+ROLLED_BACK = "rolled_back"
+
+
+def load_targets(path):
+    """Targets from a JSON file: a list, or ``{"targets": [...]}``"""
+    with open(path, "r") as f:
+        targets = json.load(f)
+    if isinstance(targets, dict):
+        targets = targets.get("targets", [])
+    return validate_targets(targets)
+
+
+def validate_targets(targets):
+    """Check every target has a url and a unique name (defaulting to the url)"""
+    names = set()
+    validated = []
+    for i, target in enumerate(targets):
+        if not isinstance(target, dict) or not target.get("url"):
+            raise ValueError(f"targets[{i}]: needs 'url'")
+        target = dict(target, name=target.get("name") or target["url"])
+        if target["name"] in names:
+            raise ValueError(f"Duplicate target name: {target['name']}")
+        names.add(target["name"])
+        validated.append(target)
+    return validated
+
+
+def _secret(target, key):
+    if target.get(key):
+        return target[key]
+    env = target.get(f"{key}_env")
+    if env:
+        value = os.getenv(env)
+        if value is None:
+            raise ValueError(f"Target {target['name']}: environment variable {env} is not set")
+        return value
+    return None
+
+
+def client_for(target):
+    """Dedicated client for one target, with its own pool and rate-limit bucket"""
+    url = target["url"].rstrip("/")
+    return NiFiClient(url, _secret(target, "token"), target.get("username"), _secret(target, "password"),
+                      pool_size=target.get("pool_size", POOL_SIZE), timeout=target.get("timeout", TIMEOUT),
+                      verify=target.get("verify", False),
+                      rate_limiter=get_limiter(f"nifi:{url}", NIFI_RATE_LIMIT, NIFI_RATE_BURST or None))
+
+
+def load_flow(name_or_path):
+    """A flow definition export (has ``flowContents``) or a ``templates/`` spec"""
+    if os.path.exists(name_or_path):
+        with open(name_or_path, "r") as f:
+            flow = json.load(f)
+        if "flowContents" in flow:
+            return flow
+    return load_template(name_or_path)
+
+
+def _deploy_one(target, flow, name, parent, resolve_ids, abort):
+    result = {"target": target["name"], "url": target["url"], "status": FAILED,
+              "process_group_id": None, "processors": {}, "error": None, "seconds": 0.0}
+    if abort.is_set():
+        result["status"] = SKIPPED
+        return result, None
+
+    started = time.perf_counter()
+    client = None
+    try:
+        client = client_for(target)
+        parent_id = target.get("parent", parent)
+        if "flowContents" in flow:
+            result["process_group_id"] = client.upload_flow(flow, name, parent_id)
+        else:
+            result["process_group_id"] = compile_and_upload(dict(flow, name=name), parent_id, client,
+                                                            resolve_ids=False)["process_group_id"]
+        if resolve_ids:
+            result["processors"] = {p["component"]["name"]: p["id"]
+                                    for p in client.list_processors(result["process_group_id"])}
+        result["status"] = SUCCEEDED
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["seconds"] = round(time.perf_counter() - started, 3)
+    return result, client
+
+
+def _roll_back(result, client):
+    try:
+        client.delete_process_group(result["process_group_id"])
+        if result["status"] == SUCCEEDED:
+            result["status"] = ROLLED_BACK
+        else:
+            result["rolled_back"] = True
+    except Exception as e:
+        result["rollback_error"] = f"{type(e).__name__}: {e}"
+
+
+def deploy_to_targets(flow, targets, parent="root", name=None, rollback=False,
+                      parallelism=FANOUT_PARALLELISM, resolve_ids=True):
+    """Deploy ``flow`` (spec or exported definition) to every target concurrently.
+
+    Returns per-target results (status, process group id, processor name
+    -> id map, seconds, error) in target order, plus counts per status.
+    """
+    targets = validate_targets(targets)
+    if name is None:
+        name = flow["flowContents"].get("name") if "flowContents" in flow else flow["name"]
+    abort = threading.Event()
+    started = time.perf_counter()
+
+    def run(target):
+        result, client = _deploy_one(target, flow, name, parent, resolve_ids, abort)
+        if rollback and result["status"] == FAILED:
+            abort.set()
+        return result, client
+
+    with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(targets)))) as pool:
+        outcomes = list(pool.map(run, targets))
+
+    try:
+        if rollback and abort.is_set():
+            # Also remove a group whose upload succeeded before a later step failed
+            created = [(r, c) for r, c in outcomes if r["process_group_id"] and r["status"] != SKIPPED]
+            with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(created) or 1))) as pool:
+                list(pool.map(lambda outcome: _roll_back(*outcome), created))
+    finally:
+        for _, client in outcomes:
+            if client is not None:
+                client.close()
+
+    results = [result for result, _ in outcomes]
+    summary = {"name": name, "targets": results, "seconds": round(time.perf_counter() - started, 3)}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return summary
+
+
+def main(argv=None):
+    """Deploy a flow to several NiFi instances from the command line"""
+    parser = argparse.ArgumentParser(description="Deploy one flow to several NiFi instances concurrently")
+    parser.add_argument("targets", help="JSON file listing the NiFi targets")
+    parser.add_argument("flow", help="template name, spec JSON or exported flow definition JSON")
+    parser.add_argument("--name", help="process group name (default: the flow's name)")
+    parser.add_argument("--parent", default="root", help="parent process group id for targets without 'parent'")
+    parser.add_argument("--rollback", action="store_true", help="delete created groups if any target fails")
+    parser.add_argument("-j", "--parallelism", type=int, default=FANOUT_PARALLELISM,
+                        help="targets deployed at once (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    summary = deploy_to_targets(load_flow(args.flow), load_targets(args.targets), args.parent, args.name,
+                                args.rollback, args.parallelism)
+    print(json.dumps(summary, indent=2))
+    return 0 if summary.get(SUCCEEDED, 0) == len(summary["targets"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""
+Helpers for ``templates/*.json`` flow specs.
+
+A spec has a ``name``, a list of ``processors`` (name, type, config) and
+a list of ``connections`` between processor names. A connection may pin
+its relationships with ``relationships`` (list) or ``relationship``;
+otherwise the first non auto-terminated relationship is used.
+"""
+
+import json
+import os
+from pathlib import Path
+
+TEMPLATES_DIR = Path(os.getenv(
+    "NIFI_TEMPLATES_DIR",
+    Path(__file__).resolve().parents[3] / "templates"
+))
+
+
+def load_template(name_or_path):
+    """Load a flow spec by template name (``simple_logging``) or file path"""
+    path = Path(name_or_path)
+    if not path.exists():
+        path = TEMPLATES_DIR / f"{name_or_path}.json"
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Template not found: {name_or_path} (looked in {TEMPLATES_DIR})")
+
+
+def connection_relationships(connection):
+    """Explicit relationships of a spec connection, or None to auto-select"""
+    if "relationships" in connection:
+        return list(connection["relationships"])
+    if "relationship" in connection:
+        return [connection["relationship"]]
+    return None
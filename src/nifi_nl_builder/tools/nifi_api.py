@@ -1,6 +1,17 @@
 import requests
 import os
 import json
+import base64
+import copy
+import threading
+import time
+import uuid
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .revisions import EntityCache, revision_changed, revision_params
+from ..metrics import record_request
+from ..ratelimit import nifi_limiter
 
 # Updated configuration for local Docker setup
 NIFI = os.getenv("NIFI_URL", "http://localhost:8080")
@@ -8,65 +19,57 @@ TOKEN = os.getenv("NIFI_TOKEN")
 USERNAME = os.getenv("NIFI_USERNAME", "admin")
 PASSWORD = os.getenv("NIFI_PASSWORD", "admin123")
 
-def _auth():
-    """Get authentication headers for NiFi API"""
-    if TOKEN:
-        return {"Authorization": f"Bearer {TOKEN}"}
-    elif USERNAME and PASSWORD:
+# Connection pool and retry tuning
+POOL_SIZE = int(os.getenv("NIFI_POOL_SIZE", "10"))
+MAX_RETRIES = int(os.getenv("NIFI_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("NIFI_BACKOFF_FACTOR", "0.3"))
+TIMEOUT = float(os.getenv("NIFI_TIMEOUT", "30"))
+EXPORT_CHUNK_SIZE = 64 * 1024
+SCHEDULE_TIMEOUT = float(os.getenv("NIFI_SCHEDULE_TIMEOUT", "60"))
+
+# Only these are safe to replay; POST would create duplicate components
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+RETRY_STATUSES = (502, 503, 504)
+# Revision refreshes per write before a 409 is given up on
+CONFLICT_RETRIES = int(os.getenv("NIFI_CONFLICT_RETRIES", "3"))
+
+
+def _auth_headers(token=None, username=None, password=None):
+    """Build authentication headers for NiFi API"""
+    if token:
+        return {"Authorization": f"Bearer {token}"}
+    elif username and password:
         # For local Docker setup, we'll use basic auth
-        import base64
-        credentials = base64.b64encode(f"{USERNAME}:{PASSWORD}".encode()).decode()
+        credentials = base64.b64encode(f"{username}:{password}".encode()).decode()
         return {"Authorization": f"Basic {credentials}"}
     return {}
 
-def _make_request(method, url, **kwargs):
-    """Make HTTP request with proper error handling"""
-    try:
-        response = requests.request(method, url, headers=_auth(), verify=False, **kwargs)
-        response.raise_for_status()
-        return response
-    except requests.exceptions.RequestException as e:
-        print(f"❌ NiFi API Error: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"   Response: {e.response.text}")
-        raise
 
-def create_pg(name, parent="root"):
+def _pg_body(name, comments=None):
     body = {"revision": {"version": 0},
             "component": {"name": name, "position": {"x": 0, "y": 0}}}
-    r = _make_request("POST", f"{NIFI}/nifi-api/process-groups/{parent}/process-groups", json=body)
-    return r.json()["id"]
+    if comments:
+        body["component"]["comments"] = comments
+    return body
 
-def add_processor(pg, ptype, cfg):
+def _processor_body(ptype, cfg, name=None):
     body = {"revision": {"version": 0},
             "component": {"type": ptype,
                           "position": {"x": 0, "y": 0},
                           "config": cfg}}
-    r = _make_request("POST", f"{NIFI}/nifi-api/process-groups/{pg}/processors", json=body)
-    return r.json()["id"]
+    if name:
+        body["component"]["name"] = name
+    return body
 
-def connect(source_id, target_id, pg_id="root", source_port="success", target_port="in"):
-    """Connect two processors or process groups"""
-    
-    # Get source processor details to find available relationships
-    source_response = _make_request("GET", f"{NIFI}/nifi-api/processors/{source_id}")
-    source_processor = source_response.json()
-    
-    # Get target processor details to find available relationships
-    target_response = _make_request("GET", f"{NIFI}/nifi-api/processors/{target_id}")
-    target_processor = target_response.json()
-    
-    # Find available relationships
-    available_relationships = []
-    for rel in source_processor['component']['relationships']:
+def _pick_relationship(processor, default="success"):
+    """Use the first non auto-terminated relationship or fallback to default"""
+    for rel in processor['component']['relationships']:
         if rel['autoTerminate'] == False:
-            available_relationships.append(rel['name'])
-    
-    # Use the first available relationship or fallback to 'success'
-    if available_relationships:
-        source_port = available_relationships[0]
-    
-    body = {
+            return rel['name']
+    return default
+
+def _connection_body(source_id, target_id, pg_id, relationships):
+    return {
         "revision": {"version": 0},
         "component": {
             "source": {
@@ -79,133 +82,568 @@ def connect(source_id, target_id, pg_id="root", source_port="success", target_po
                 "type": "PROCESSOR",
                 "groupId": pg_id
             },
-            "selectedRelationships": [source_port]
+            "selectedRelationships": list(relationships)
         }
     }
-    r = _make_request("POST", f"{NIFI}/nifi-api/process-groups/{pg_id}/connections", json=body)
-    return r.json()["id"]
 
-def export_flow(pg_id="root"):
-    """Export flow definition as JSON"""
-    r = _make_request("GET", f"{NIFI}/nifi-api/process-groups/{pg_id}/download")
-    return r.json()
+def _run_state_body(processor, state):
+    return {
+        "revision": processor["revision"],
+        "component": {
+            "id": processor["id"],
+            "state": state
+        }
+    }
 
-def start_processor(processor_id):
-    """Start a processor"""
-    # First get the current processor state
-    current_response = _make_request("GET", f"{NIFI}/nifi-api/processors/{processor_id}")
-    current_processor = current_response.json()
-    
-    # Update with running state
-    body = {
-        "revision": current_processor["revision"],
+def _config_body(processor, config):
+    return {
+        "revision": processor["revision"],
         "component": {
-            "id": processor_id,
-            "state": "RUNNING"
+            "id": processor["id"],
+            "config": config
         }
     }
-    r = _make_request("PUT", f"{NIFI}/nifi-api/processors/{processor_id}", json=body)
-    return r.json()
 
-def stop_processor(processor_id):
-    """Stop a processor"""
-    # First get the current processor state
-    current_response = _make_request("GET", f"{NIFI}/nifi-api/processors/{processor_id}")
-    current_processor = current_response.json()
-    
-    # Update with stopped state
-    body = {
-        "revision": current_processor["revision"],
+def _auto_terminate_body(processor, relationships):
+    # New dicts: ``processor`` may be shared with the entity cache
+    updated_relationships = [
+        dict(rel, autoTerminate=True) if rel["name"] in relationships else dict(rel)
+        for rel in processor["component"]["relationships"]
+    ]
+
+    config = dict(processor["component"]["config"])
+    config["autoTerminatedRelationships"] = [
+        rel["name"] for rel in updated_relationships if rel["autoTerminate"]
+    ]
+    return {
+        "revision": processor["revision"],
         "component": {
-            "id": processor_id,
-            "state": "STOPPED"
+            "id": processor["id"],
+            "config": config,
+            "relationships": updated_relationships
+        }
+    }
+
+def _iter_processor_snapshots(group_snapshot):
+    """Yield every processor status snapshot in a group and its descendants"""
+    stack = [group_snapshot]
+    while stack:
+        snapshot = stack.pop()
+        for entity in snapshot.get("processorStatusSnapshots", []):
+            yield entity["processorStatusSnapshot"]
+        for entity in snapshot.get("processGroupStatusSnapshots", []):
+            stack.append(entity["processGroupStatusSnapshot"])
+
+def _schedule_progress(status, state):
+    """Split processors into (pending, failed) for a target RUNNING/STOPPED state.
+
+    Invalid and disabled processors can never start, so they are reported
+    as failed immediately instead of being waited on.
+    """
+    pending, failed = [], []
+    for snapshot in _iter_processor_snapshots(status["processGroupStatus"]["aggregateSnapshot"]):
+        run_status = snapshot.get("runStatus")
+        summary = {
+            "id": snapshot.get("id"),
+            "name": snapshot.get("name"),
+            "groupId": snapshot.get("groupId"),
+            "runStatus": run_status,
+        }
+        if state == "RUNNING":
+            if run_status in ("Invalid", "Disabled"):
+                failed.append(summary)
+            elif run_status != "Running":
+                pending.append(summary)
+        elif run_status == "Running" or snapshot.get("activeThreadCount", 0) > 0:
+            # Stopped processors may still be finishing in-flight threads
+            pending.append(summary)
+    return pending, failed
+
+def _is_conflict(error):
+    """True for a 409 revision conflict"""
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code == 409
+
+def _template_body(name, description):
+    return {
+        "name": name,
+        "description": description,
+        "snippet": {
+            "processGroups": {},
+            "processors": {},
+            "connections": {},
+            "inputPorts": {},
+            "outputPorts": {},
+            "funnels": {},
+            "labels": {},
+            "remoteProcessGroups": {}
         }
     }
-    r = _make_request("PUT", f"{NIFI}/nifi-api/processors/{processor_id}", json=body)
-    return r.json()
+
+
+class NiFiClient:
+    """Pooled, keep-alive client for the NiFi REST API.
+
+    One client owns one ``requests.Session`` so TCP/TLS connections are
+    reused across calls. Auth headers are computed once, and idempotent
+    calls are retried with exponential backoff on connection errors and
+    gateway failures.
+
+    Entities returned by NiFi are kept in ``self.entities`` so writes can
+    supply the current revision without a GET first (see ``revisions``).
+    Requests wait on ``rate_limiter`` (default: the process-wide
+    ``NIFI_RATE_LIMIT`` bucket, if set) before they are sent.
+    """
+
+    def __init__(self, base_url=None, token=None, username=None, password=None,
+                 pool_size=POOL_SIZE, retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR,
+                 timeout=TIMEOUT, verify=False, rate_limiter=None):
+        self.base_url = (base_url or NIFI).rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.verify = verify
+        self.entities = EntityCache()
+        self.rate_limiter = rate_limiter or nifi_limiter()
+        self._catalog_checked = False
+
+        self.session = requests.Session()
+        self.session.headers.update(_auth_headers(token, username, password))
+        self.session.headers["Connection"] = "keep-alive"
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def auth_headers(self):
+        """Cached authentication headers"""
+        return {k: v for k, v in self.session.headers.items() if k == "Authorization"}
+
+    def url(self, path):
+        """Resolve a /nifi-api relative path (absolute URLs pass through)"""
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/nifi-api{path}"
+
+    def request(self, method, path, **kwargs):
+        """Make HTTP request with proper error handling"""
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("verify", self.verify)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+            response.raise_for_status()
+            return response
+        except requests.exceptions.RequestException as e:
+            print(f"❌ NiFi API Error: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"   Response: {e.response.text}")
+            raise
+        finally:
+            if response is None:
+                record_request(method, path, "error", time.perf_counter() - started)
+            else:
+                # Streamed bodies are not read here; fall back to the declared size
+                size = (int(response.headers.get("Content-Length") or 0) if kwargs.get("stream")
+                        else len(response.content))
+                record_request(method, path, response.status_code, time.perf_counter() - started, size)
+
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _entity(self, component_id, kind="processors", refresh=False):
+        """Cached entity for a component, fetched only on a cache miss"""
+        entity = None if refresh else self.entities.get(component_id)
+        if entity is None:
+            r = self.request("GET", f"/{kind}/{component_id}")
+            # A copy, like a cache hit: callers may modify it while building a body
+            entity = copy.deepcopy(self.entities.remember(r.json()))
+        return entity
+
+    def _update(self, component_id, make_body, kind="processors"):
+        """PUT with the cached revision, refreshing it on 409 revision conflicts"""
+        entity = self._entity(component_id, kind)
+        for attempt in range(CONFLICT_RETRIES + 1):
+            try:
+                r = self.request("PUT", f"/{kind}/{component_id}", json=make_body(entity))
+                return self.entities.remember(r.json())
+            except requests.exceptions.HTTPError as e:
+                if not _is_conflict(e) or attempt == CONFLICT_RETRIES:
+                    raise
+                entity = self._refresh_conflicted(component_id, kind, entity, e)
+
+    def _delete(self, component_id, kind="processors"):
+        """DELETE with the cached revision, refreshing it on 409 revision conflicts"""
+        entity = self._entity(component_id, kind)
+        for attempt in range(CONFLICT_RETRIES + 1):
+            try:
+                self.request("DELETE", f"/{kind}/{component_id}", params=revision_params(entity))
+                break
+            except requests.exceptions.HTTPError as e:
+                if not _is_conflict(e) or attempt == CONFLICT_RETRIES:
+                    raise
+                entity = self._refresh_conflicted(component_id, kind, entity, e)
+        self.entities.invalidate(component_id)
+        return True
+
+    def _refresh_conflicted(self, component_id, kind, stale, error):
+        """Fresh entity after a 409; re-raises when the revision was not the cause"""
+        entity = self._entity(component_id, kind, refresh=True)
+        if not revision_changed(stale, entity):
+            # Same revision: NiFi refused for another reason (running, queued data)
+            raise error
+        return entity
+
+    def create_pg(self, name, parent="root", comments=None):
+        r = self.request("POST", f"/process-groups/{parent}/process-groups", json=_pg_body(name, comments))
+        return self.entities.remember(r.json())["id"]
+
+    def processor_catalog(self):
+        """Processor type catalog of this NiFi, revalidated once per client (see ``catalog``)"""
+        from .catalog import get_catalog
+
+        catalog = get_catalog(self.base_url)
+        if not self._catalog_checked:
+            self._catalog_checked = True
+            try:
+                catalog.refresh(self)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"⚠️ Processor catalog not refreshed: {e}")
+        return catalog
+
+    def add_processor(self, pg, ptype, cfg, name=None):
+        from .catalog import CATALOG_ENABLED
+
+        if CATALOG_ENABLED:
+            # Fail on a mistyped class locally instead of after a round trip
+            catalog = self.processor_catalog()
+            catalog.refresh_unknown([ptype], self)
+            error = catalog.check_type(ptype)
+            if error:
+                raise ValueError(error)
+        r = self.request("POST", f"/process-groups/{pg}/processors", json=_processor_body(ptype, cfg, name))
+        return self.entities.remember(r.json())["id"]
+
+    def create_connection(self, pg_id, source_id, target_id, relationships):
+        """Create a connection for explicitly chosen relationships"""
+        body = _connection_body(source_id, target_id, pg_id, relationships)
+        r = self.request("POST", f"/process-groups/{pg_id}/connections", json=body)
+        return self.entities.remember(r.json())["id"]
+
+    def connect(self, source_id, target_id, pg_id="root", source_port="success", target_port="in"):
+        """Connect two processors or process groups"""
+        # Source relationships come from the entity cache (filled by add_processor)
+        source_processor = self._entity(source_id)
+        source_port = _pick_relationship(source_processor, source_port)
+
+        return self.create_connection(pg_id, source_id, target_id, [source_port])
+
+    def export_flow(self, pg_id="root"):
+        """Export flow definition as JSON"""
+        r = self.request("GET", f"/process-groups/{pg_id}/download")
+        return r.json()
+
+    def upload_flow(self, definition, name, parent="root", position=(0, 0)):
+        """Create a process group from a complete flow definition in one request"""
+        data = {
+            "groupName": name,
+            "positionX": str(position[0]),
+            "positionY": str(position[1]),
+            "clientId": str(uuid.uuid4()),
+            "disconnectedNodeAcknowledged": "false",
+        }
+        files = {"file": ("flow.json", json.dumps(definition), "application/json")}
+        r = self.request("POST", f"/process-groups/{parent}/process-groups/upload", data=data, files=files)
+        return self.entities.remember(r.json())["id"]
+
+    def export_flow_to_file(self, pg_id, path, chunk_size=EXPORT_CHUNK_SIZE):
+        """Stream the flow definition straight to ``path`` in bounded memory"""
+        tmp_path = f"{path}.part"
+        written = 0
+        with self.request("GET", f"/process-groups/{pg_id}/download", stream=True) as r:
+            with open(tmp_path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    written += len(chunk)
+        # Readers never observe a half-written export
+        os.replace(tmp_path, path)
+        return {"path": str(path), "bytes": written}
+
+    def start_processor(self, processor_id):
+        """Start a processor"""
+        return self._update(processor_id, lambda current: _run_state_body(current, "RUNNING"))
+
+    def stop_processor(self, processor_id):
+        """Stop a processor"""
+        return self._update(processor_id, lambda current: _run_state_body(current, "STOPPED"))
+
+    def get_processor_status(self, processor_id):
+        """Get processor status and statistics"""
+        return self._entity(processor_id, refresh=True)
+
+    def update_processor_config(self, processor_id, config):
+        """Update processor configuration"""
+        return self._update(processor_id, lambda current: _config_body(current, config))
+
+    def auto_terminate_relationships(self, processor_id, relationships):
+        """Auto-terminate specific relationships for a processor"""
+        return self._update(processor_id, lambda current: _auto_terminate_body(current, relationships))
+
+    def delete_processor(self, processor_id):
+        """Delete a processor"""
+        return self._delete(processor_id)
+
+    def list_processors(self, pg_id="root"):
+        """List all processors in a process group"""
+        r = self.request("GET", f"/process-groups/{pg_id}/processors")
+        return self.entities.remember_all(r.json()["processors"])
+
+    def get_group_status(self, pg_id="root", recursive=True):
+        """Aggregated status of a process group, including nested groups"""
+        r = self.request("GET", f"/flow/process-groups/{pg_id}/status",
+                         params={"recursive": str(recursive).lower()})
+        return r.json()
+
+    def schedule_group(self, pg_id, state):
+        """Set every component in a process group (recursively) to RUNNING or STOPPED"""
+        body = {"id": pg_id, "state": state}
+        r = self.request("PUT", f"/flow/process-groups/{pg_id}", json=body)
+        return r.json()
+
+    def wait_for_state(self, pg_id, state, timeout=SCHEDULE_TIMEOUT, initial_delay=0.25, max_delay=5.0):
+        """Poll aggregated status with backoff until the group converges to ``state``"""
+        started = time.monotonic()
+        delay = initial_delay
+        polls = 0
+        while True:
+            status = self.get_group_status(pg_id, recursive=True)
+            polls += 1
+            pending, failed = _schedule_progress(status, state)
+            elapsed = time.monotonic() - started
+            if not pending or elapsed >= timeout:
+                break
+            time.sleep(min(delay, max(timeout - elapsed, 0)))
+            delay = min(delay * 2, max_delay)
+
+        # Bulk scheduling bumps every processor revision behind our back
+        for snapshot in _iter_processor_snapshots(status["processGroupStatus"]["aggregateSnapshot"]):
+            self.entities.invalidate(snapshot.get("id"))
+
+        return {
+            "process_group_id": pg_id,
+            "state": state,
+            "converged": not pending and not failed,
+            "pending": pending,
+            "failed": failed,
+            "polls": polls,
+            "elapsed": round(time.monotonic() - started, 3),
+        }
+
+    def start_flow(self, pg_id="root", wait=True, timeout=SCHEDULE_TIMEOUT):
+        """Start every processor in a process group and its child groups"""
+        self.schedule_group(pg_id, "RUNNING")
+        if not wait:
+            return {"process_group_id": pg_id, "state": "RUNNING"}
+        return self.wait_for_state(pg_id, "RUNNING", timeout)
+
+    def stop_flow(self, pg_id="root", wait=True, timeout=SCHEDULE_TIMEOUT):
+        """Stop every processor in a process group and its child groups"""
+        self.schedule_group(pg_id, "STOPPED")
+        if not wait:
+            return {"process_group_id": pg_id, "state": "STOPPED"}
+        return self.wait_for_state(pg_id, "STOPPED", timeout)
+
+    def list_connections(self, pg_id="root"):
+        """List all connections in a process group"""
+        r = self.request("GET", f"/process-groups/{pg_id}/connections")
+        return self.entities.remember_all(r.json()["connections"])
+
+    def delete_connection(self, connection_id):
+        """Delete a connection (its queue must be empty)"""
+        return self._delete(connection_id, kind="connections")
+
+    def drop_queue(self, connection_id, timeout=SCHEDULE_TIMEOUT, initial_delay=0.1, max_delay=2.0):
+        """Drop every FlowFile queued in a connection; returns how many were dropped"""
+        path = f"/flowfile-queues/{connection_id}/drop-requests"
+        for attempt in range(self.retries + 1):
+            try:
+                drop = self.request("POST", path).json()["dropRequest"]
+                break
+            except requests.exceptions.HTTPError as e:
+                # Safe to re-send, unlike other POSTs: a second drop of an empty queue does nothing
+                if e.response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    raise
+                time.sleep(self.backoff_factor * 2 ** attempt)
+        started = time.monotonic()
+        delay = initial_delay
+        while not drop.get("finished") and time.monotonic() - started < timeout:
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+            drop = self.request("GET", f"{path}/{drop['id']}").json()["dropRequest"]
+        # NiFi keeps a drop request until it is removed (which also cancels an unfinished one)
+        self.request("DELETE", f"{path}/{drop['id']}")
+        if not drop.get("finished"):
+            raise TimeoutError(f"Dropping the queue of {connection_id} did not finish in {timeout}s")
+        return drop.get("droppedCount", 0)
+
+    def delete_process_group(self, pg_id):
+        """Delete a process group (it must be stopped with empty queues)"""
+        return self._delete(pg_id, kind="process-groups")
+
+    def list_process_groups(self, parent_id="root"):
+        """List all process groups under a parent"""
+        r = self.request("GET", f"/process-groups/{parent_id}/process-groups")
+        return self.entities.remember_all(r.json()["processGroups"])
+
+    def get_flow_status(self, pg_id="root"):
+        """Get overall flow status and statistics"""
+        try:
+            return self.get_group_status(pg_id, recursive=False)
+        except requests.exceptions.HTTPError:
+            # Fallback to getting basic process group info
+            r = self.request("GET", f"/process-groups/{pg_id}")
+            return r.json()
+
+    def create_template(self, name, description, pg_id="root"):
+        """Create a template from a process group"""
+        body = _template_body(name, description)
+        r = self.request("POST", f"/process-groups/{pg_id}/templates", json=body)
+        return r.json()["id"]
+
+    def instantiate_template(self, template_id, pg_id="root"):
+        """Instantiate a template in a process group"""
+        body = {"originX": 0, "originY": 0}
+        r = self.request("POST", f"/process-groups/{pg_id}/template-instance", json=body)
+        return r.json()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client():
+    """Return the shared client built from the NIFI_* environment settings"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = NiFiClient(NIFI, TOKEN, USERNAME, PASSWORD)
+    return _default_client
+
+def set_client(client):
+    """Replace the shared client used by the module-level functions"""
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
+
+def _auth():
+    """Get authentication headers for NiFi API"""
+    return get_client().auth_headers
+
+def _make_request(method, url, **kwargs):
+    """Make HTTP request with proper error handling"""
+    return get_client().request(method, url, **kwargs)
+
+def create_pg(name, parent="root"):
+    return get_client().create_pg(name, parent)
+
+def add_processor(pg, ptype, cfg, name=None):
+    return get_client().add_processor(pg, ptype, cfg, name)
+
+def connect(source_id, target_id, pg_id="root", source_port="success", target_port="in"):
+    """Connect two processors or process groups"""
+    return get_client().connect(source_id, target_id, pg_id, source_port, target_port)
+
+def export_flow(pg_id="root"):
+    """Export flow definition as JSON"""
+    return get_client().export_flow(pg_id)
+
+def upload_flow(definition, name, parent="root"):
+    """Create a process group from a flow definition document"""
+    return get_client().upload_flow(definition, name, parent)
+
+def export_flow_to_file(pg_id, path, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream the flow definition to a file instead of loading it into memory"""
+    return get_client().export_flow_to_file(pg_id, path, chunk_size)
+
+def start_processor(processor_id):
+    """Start a processor"""
+    return get_client().start_processor(processor_id)
+
+def stop_processor(processor_id):
+    """Stop a processor"""
+    return get_client().stop_processor(processor_id)
 
 def get_processor_status(processor_id):
     """Get processor status and statistics"""
-    r = _make_request("GET", f"{NIFI}/nifi-api/processors/{processor_id}")
-    return r.json()
+    return get_client().get_processor_status(processor_id)
 
 def update_processor_config(processor_id, config):
     """Update processor configuration"""
-    body = {"revision": {"version": 0}, "component": {"config": config}}
-    r = _make_request("PUT", f"{NIFI}/nifi-api/processors/{processor_id}", json=body)
-    return r.json()
+    return get_client().update_processor_config(processor_id, config)
 
 def auto_terminate_relationships(processor_id, relationships):
     """Auto-terminate specific relationships for a processor"""
-    # First get the current processor state
-    current_response = _make_request("GET", f"{NIFI}/nifi-api/processors/{processor_id}")
-    current_processor = current_response.json()
-    
-    # Update relationships to auto-terminate
-    updated_relationships = []
-    for rel in current_processor["component"]["relationships"]:
-        if rel["name"] in relationships:
-            rel["autoTerminate"] = True
-        updated_relationships.append(rel)
-    
-    # Update processor with auto-terminated relationships
-    body = {
-        "revision": current_processor["revision"],
-        "component": {
-            "id": processor_id,
-            "config": current_processor["component"]["config"],
-            "relationships": updated_relationships
-        }
-    }
-    r = _make_request("PUT", f"{NIFI}/nifi-api/processors/{processor_id}", json=body)
-    return r.json()
+    return get_client().auto_terminate_relationships(processor_id, relationships)
 
 def delete_processor(processor_id):
     """Delete a processor"""
-    _make_request("DELETE", f"{NIFI}/nifi-api/processors/{processor_id}")
-    return True
+    return get_client().delete_processor(processor_id)
+
+def start_flow(pg_id="root", wait=True, timeout=SCHEDULE_TIMEOUT):
+    """Start a whole process group and wait for it to reach RUNNING"""
+    return get_client().start_flow(pg_id, wait, timeout)
+
+def stop_flow(pg_id="root", wait=True, timeout=SCHEDULE_TIMEOUT):
+    """Stop a whole process group and wait for it to reach STOPPED"""
+    return get_client().stop_flow(pg_id, wait, timeout)
 
 def list_processors(pg_id="root"):
     """List all processors in a process group"""
-    r = _make_request("GET", f"{NIFI}/nifi-api/process-groups/{pg_id}/processors")
-    return r.json()["processors"]
+    return get_client().list_processors(pg_id)
+
+def list_connections(pg_id="root"):
+    """List all connections in a process group"""
+    return get_client().list_connections(pg_id)
+
+def delete_connection(connection_id):
+    """Delete a connection"""
+    return get_client().delete_connection(connection_id)
 
 def list_process_groups(parent_id="root"):
     """List all process groups under a parent"""
-    r = _make_request("GET", f"{NIFI}/nifi-api/process-groups/{parent_id}/process-groups")
-    return r.json()["processGroups"]
+    return get_client().list_process_groups(parent_id)
 
 def get_flow_status(pg_id="root"):
     """Get overall flow status and statistics"""
-    try:
-        r = _make_request("GET", f"{NIFI}/nifi-api/process-groups/{pg_id}/status")
-        return r.json()
-    except:
-        # Fallback to getting basic process group info
-        r = _make_request("GET", f"{NIFI}/nifi-api/process-groups/{pg_id}")
-        return r.json()
+    return get_client().get_flow_status(pg_id)
 
 def create_template(name, description, pg_id="root"):
     """Create a template from a process group"""
-    body = {
-        "name": name,
-        "description": description,
-        "snippet": {
-            "processGroups": {},
-            "processors": {},
-            "connections": {},
-            "inputPorts": {},
-            "outputPorts": {},
-            "funnels": {},
-            "labels": {},
-            "remoteProcessGroups": {}
-        }
-    }
-    r = _make_request("POST", f"{NIFI}/nifi-api/process-groups/{pg_id}/templates", json=body)
-    return r.json()["id"]
+    return get_client().create_template(name, description, pg_id)
 
 def instantiate_template(template_id, pg_id="root"):
     """Instantiate a template in a process group"""
-    body = {"originX": 0, "originY": 0}
-    r = _make_request("POST", f"{NIFI}/nifi-api/process-groups/{pg_id}/template-instance", json=body)
-    return r.json() 
\ No newline at end of file
+    return get_client().instantiate_template(template_id, pg_id)
@@ -0,0 +1,276 @@
+"""
+asyncio variant of the NiFi REST layer.
+
+Mirrors the functions in ``nifi_api`` so independent calls (for example
+every processor of one process group) can be issued in one concurrent
+wave instead of strictly one after another.
+"""
+
+import asyncio
+import copy
+import os
+import time
+
+import aiohttp
+
+from .nifi_api import (
+    NIFI, TOKEN, USERNAME, PASSWORD, POOL_SIZE, MAX_RETRIES, BACKOFF_FACTOR,
+    TIMEOUT, IDEMPOTENT_METHODS, RETRY_STATUSES, CONFLICT_RETRIES,
+    _auth_headers, _pg_body, _processor_body, _pick_relationship,
+    _connection_body, _run_state_body, _config_body, _auto_terminate_body,
+    _template_body
+)
+from .concurrency import AIMDController, controller_for, endpoint_limits_for, retry_delay
+from .revisions import EntityCache, revision_changed, revision_params
+from ..metrics import record_request
+from ..ratelimit import nifi_limiter
+
+# Upper bound on in-flight requests per NiFi
+MAX_CONCURRENCY = int(os.getenv("NIFI_MAX_CONCURRENCY", "8"))
+# Adapt the in-flight limit to latency and errors; 0 keeps it fixed
+ADAPTIVE_CONCURRENCY = os.getenv("NIFI_ADAPTIVE_CONCURRENCY", "1").lower() not in ("0", "false", "no")
+
+
+class AsyncNiFiClient:
+    """Concurrent NiFi REST client built on a single aiohttp session.
+
+    ``max_concurrency`` caps the number of requests in flight at once.
+    With ``adaptive`` the cap is an ``AIMDController`` shared by every
+    client of the same NiFi, which shrinks it on 429/5xx and slow responses
+    and grows it back while NiFi keeps up; everything beyond the limit
+    queues. Use as an async context manager so the underlying connector is
+    closed. Like ``NiFiClient`` it keeps an entity cache so writes need no
+    GET for the revision, and waits on the shared ``rate_limiter`` and the
+    ``NIFI_ENDPOINT_RATES`` buckets before each request.
+    """
+
+    def __init__(self, base_url=None, token=None, username=None, password=None,
+                 max_concurrency=MAX_CONCURRENCY, pool_size=POOL_SIZE,
+                 retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR,
+                 timeout=TIMEOUT, verify=False, rate_limiter=None,
+                 adaptive=ADAPTIVE_CONCURRENCY, controller=None, endpoint_limits=None):
+        self.base_url = (base_url or NIFI).rstrip("/")
+        self.headers = _auth_headers(token, username, password)
+        self.max_concurrency = max_concurrency
+        self.pool_size = max(pool_size, max_concurrency)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.verify = verify
+        self.entities = EntityCache()
+        self.rate_limiter = rate_limiter or nifi_limiter()
+        if controller is None:
+            controller = (controller_for(self.base_url, max_concurrency) if adaptive
+                          else AIMDController(minimum=max_concurrency, maximum=max_concurrency))
+        self.controller = controller
+        self.endpoint_limits = endpoint_limits if endpoint_limits is not None else endpoint_limits_for(self.base_url)
+        self._session = None
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Build a client from the same NIFI_* settings as ``nifi_api``"""
+        return cls(NIFI, TOKEN, USERNAME, PASSWORD, **kwargs)
+
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _ensure_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ssl=self.verify or False)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                                  timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        """Release pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def url(self, path):
+        """Resolve a /nifi-api relative path (absolute URLs pass through)"""
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/nifi-api{path}"
+
+    async def request(self, method, path, **kwargs):
+        """Make HTTP request and return the decoded JSON body (or None)"""
+        session = self._ensure_session()
+        replayable = method in IDEMPOTENT_METHODS
+        bucket = self.endpoint_limits.get(method, path)
+        for attempt in range(self.retries + 1):
+            final = attempt == self.retries
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            if bucket is not None:
+                await bucket.acquire_async()
+            await self.controller.acquire()
+            started = time.perf_counter()
+            status, retry_after = "error", None
+            try:
+                async with session.request(method, self.url(path), **kwargs) as response:
+                    status = response.status
+                    # 429 means the request was not processed, so even a POST can be replayed
+                    if not final and (status == 429 or (replayable and status in RETRY_STATUSES)):
+                        retry_after = response.headers.get("Retry-After")
+                        # Drain the body so the connection goes back to the pool
+                        await response.read()
+                        record_request(method, path, status, time.perf_counter() - started)
+                    else:
+                        text = await response.text()
+                        record_request(method, path, status, time.perf_counter() - started, len(text))
+                        if status >= 400:
+                            print(f"❌ NiFi API Error: {status} {method} {path}")
+                            print(f"   Response: {text}")
+                            response.raise_for_status()
+                        if not text:
+                            return None
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                # aiohttp raises a plain asyncio.TimeoutError when the total timeout runs out
+                record_request(method, path, "error", time.perf_counter() - started)
+                if final or not replayable:
+                    print(f"❌ NiFi API Error: {type(e).__name__}: {e}")
+                    raise
+            finally:
+                self.controller.release(time.perf_counter() - started, status)
+            # Back off outside the slot so other requests can use it meanwhile
+            await asyncio.sleep(retry_delay(attempt, self.backoff_factor, retry_after))
+
+    async def _entity(self, component_id, kind="processors", refresh=False):
+        """Cached entity for a component, fetched only on a cache miss"""
+        entity = None if refresh else self.entities.get(component_id)
+        if entity is None:
+            # A copy, like a cache hit: callers may modify it while building a body
+            entity = copy.deepcopy(self.entities.remember(await self.request("GET", f"/{kind}/{component_id}")))
+        return entity
+
+    async def _update(self, component_id, make_body, kind="processors"):
+        """PUT with the cached revision, refreshing it on 409 revision conflicts"""
+        entity = await self._entity(component_id, kind)
+        for attempt in range(CONFLICT_RETRIES + 1):
+            try:
+                r = await self.request("PUT", f"/{kind}/{component_id}", json=make_body(entity))
+                return self.entities.remember(r)
+            except aiohttp.ClientResponseError as e:
+                if e.status != 409 or attempt == CONFLICT_RETRIES:
+                    raise
+                entity = await self._refresh_conflicted(component_id, kind, entity, e)
+
+    async def _delete(self, component_id, kind="processors"):
+        """DELETE with the cached revision, refreshing it on 409 revision conflicts"""
+        entity = await self._entity(component_id, kind)
+        for attempt in range(CONFLICT_RETRIES + 1):
+            try:
+                await self.request("DELETE", f"/{kind}/{component_id}", params=revision_params(entity))
+                break
+            except aiohttp.ClientResponseError as e:
+                if e.status != 409 or attempt == CONFLICT_RETRIES:
+                    raise
+                entity = await self._refresh_conflicted(component_id, kind, entity, e)
+        self.entities.invalidate(component_id)
+        return True
+
+    async def _refresh_conflicted(self, component_id, kind, stale, error):
+        """Fresh entity after a 409; re-raises when the revision was not the cause"""
+        entity = await self._entity(component_id, kind, refresh=True)
+        if not revision_changed(stale, entity):
+            raise error
+        # Another writer is active; a short jittered pause avoids colliding again
+        await asyncio.sleep(retry_delay(0, self.backoff_factor / 10))
+        return entity
+
+    def flow_control_stats(self):
+        """Adaptive limit and per-endpoint bucket counters"""
+        return {"concurrency": self.controller.stats(), "endpoints": self.endpoint_limits.stats()}
+
+    async def create_pg(self, name, parent="root"):
+        r = await self.request("POST", f"/process-groups/{parent}/process-groups", json=_pg_body(name))
+        return self.entities.remember(r)["id"]
+
+    async def add_processor(self, pg, ptype, cfg, name=None):
+        r = await self.request("POST", f"/process-groups/{pg}/processors",
+                               json=_processor_body(ptype, cfg, name))
+        return self.entities.remember(r)["id"]
+
+    async def add_processors(self, pg, processors):
+        """Create several processors in one concurrent wave.
+
+        ``processors`` is an iterable of ``(ptype, cfg)`` or
+        ``(ptype, cfg, name)`` tuples; ids are returned in the same order.
+        """
+        return await asyncio.gather(*(self.add_processor(pg, *processor)
+                                      for processor in processors))
+
+    async def create_connection(self, pg_id, source_id, target_id, relationships):
+        """Create a connection for explicitly chosen relationships"""
+        body = _connection_body(source_id, target_id, pg_id, relationships)
+        r = await self.request("POST", f"/process-groups/{pg_id}/connections", json=body)
+        return self.entities.remember(r)["id"]
+
+    async def connect(self, source_id, target_id, pg_id="root", source_port="success", target_port="in"):
+        """Connect two processors or process groups"""
+        source_processor = await self._entity(source_id)
+        source_port = _pick_relationship(source_processor, source_port)
+        return await self.create_connection(pg_id, source_id, target_id, [source_port])
+
+    async def export_flow(self, pg_id="root"):
+        """Export flow definition as JSON"""
+        return await self.request("GET", f"/process-groups/{pg_id}/download")
+
+    async def start_processor(self, processor_id):
+        """Start a processor"""
+        return await self._update(processor_id, lambda current: _run_state_body(current, "RUNNING"))
+
+    async def stop_processor(self, processor_id):
+        """Stop a processor"""
+        return await self._update(processor_id, lambda current: _run_state_body(current, "STOPPED"))
+
+    async def get_processor_status(self, processor_id):
+        """Get processor status and statistics"""
+        return await self._entity(processor_id, refresh=True)
+
+    async def update_processor_config(self, processor_id, config):
+        """Update processor configuration"""
+        return await self._update(processor_id, lambda current: _config_body(current, config))
+
+    async def auto_terminate_relationships(self, processor_id, relationships):
+        """Auto-terminate specific relationships for a processor"""
+        return await self._update(processor_id, lambda current: _auto_terminate_body(current, relationships))
+
+    async def delete_processor(self, processor_id):
+        """Delete a processor"""
+        return await self._delete(processor_id)
+
+    async def list_processors(self, pg_id="root"):
+        """List all processors in a process group"""
+        r = await self.request("GET", f"/process-groups/{pg_id}/processors")
+        return self.entities.remember_all(r["processors"])
+
+    async def list_process_groups(self, parent_id="root"):
+        """List all process groups under a parent"""
+        r = await self.request("GET", f"/process-groups/{parent_id}/process-groups")
+        return self.entities.remember_all(r["processGroups"])
+
+    async def get_flow_status(self, pg_id="root"):
+        """Get overall flow status and statistics"""
+        try:
+            return await self.request("GET", f"/flow/process-groups/{pg_id}/status",
+                                      params={"recursive": "false"})
+        except aiohttp.ClientResponseError:
+            # Fallback to getting basic process group info
+            return await self.request("GET", f"/process-groups/{pg_id}")
+
+    async def create_template(self, name, description, pg_id="root"):
+        """Create a template from a process group"""
+        r = await self.request("POST", f"/process-groups/{pg_id}/templates",
+                               json=_template_body(name, description))
+        return r["id"]
+
+    async def instantiate_template(self, template_id, pg_id="root"):
+        """Instantiate a template in a process group"""
+        body = {"originX": 0, "originY": 0}
+        return await self.request("POST", f"/process-groups/{pg_id}/template-instance", json=body)
@@ -0,0 +1,218 @@
+"""
+Compact projections of NiFi results before they reach an agent's context.
+
+Raw NiFi entities carry revisions, bulletins, property descriptors and
+nested DTOs that an agent never acts on. They also stay in the prompt
+for every later turn. Each tool in ``PROJECTORS`` keeps only the fields
+needed to decide the next step (ids, names, short types, state,
+validation errors, open relationships, queue counts).
+
+The projected JSON is then held to ``NIFI_TOOL_OUTPUT_BUDGET``
+characters by cutting its longest lists. The items that were cut are
+kept in a small in-memory store, and the ``truncated`` note carries a
+handle for ``fetch_more_nifi_output`` to page through them. Raw and
+projected sizes are recorded in metrics, so the savings are measured
+(``tool_output_saved_chars_total``) rather than assumed.
+"""
+
+import json
+import os
+import threading
+import uuid
+from collections import Counter, OrderedDict
+
+from ..metrics import record_projection
+
+PROJECTION_ENABLED = os.getenv("NIFI_TOOL_PROJECTION", "1").lower() not in ("0", "false", "no")
+# About 1k tokens at ~4 characters per token
+OUTPUT_BUDGET = int(os.getenv("NIFI_TOOL_OUTPUT_BUDGET", "4000"))
+# Truncated results kept for fetch_more_nifi_output (least recently used dropped first)
+HANDLE_LIMIT = int(os.getenv("NIFI_TOOL_OUTPUT_HANDLES", "64"))
+MAX_VALUE_CHARS = 200
+
+
+def _dumps(data):
+    return json.dumps(data, default=str, separators=(",", ":"))
+
+
+def _short(ptype):
+    return (ptype or "").rsplit(".", 1)[-1]
+
+
+def _clip(value):
+    text = value if isinstance(value, str) else _dumps(value)
+    return text if len(text) <= MAX_VALUE_CHARS else text[:MAX_VALUE_CHARS] + "…"
+
+
+def project_processor(entity):
+    """Id, name, short type, state, validation errors and unterminated relationships"""
+    component = entity.get("component") or {}
+    projected = {
+        "id": entity.get("id") or component.get("id"),
+        "name": component.get("name"),
+        "type": _short(component.get("type")),
+        "state": component.get("state"),
+    }
+    errors = component.get("validationErrors")
+    if errors:
+        projected["validationErrors"] = [_clip(e) for e in errors]
+    open_relationships = [r["name"] for r in component.get("relationships") or [] if not r.get("autoTerminate")]
+    if open_relationships:
+        projected["relationships"] = open_relationships
+    return projected
+
+
+def project_processors(entities):
+    return {"count": len(entities), "processors": [project_processor(e) for e in entities]}
+
+
+def project_status(status):
+    """Aggregate counters, run states and only the non-empty queues"""
+    group = status.get("processGroupStatus")
+    if group is None:
+        # Fallback shape: a plain process group entity
+        projected = {"id": status.get("id"), "name": (status.get("component") or {}).get("name")}
+        for key in ("runningCount", "stoppedCount", "invalidCount", "disabledCount"):
+            if key in status:
+                projected[key] = status[key]
+        return projected
+    snapshot = group.get("aggregateSnapshot") or {}
+    processors = [s.get("processorStatusSnapshot", s) for s in snapshot.get("processorStatusSnapshots") or []]
+    connections = [s.get("connectionStatusSnapshot", s) for s in snapshot.get("connectionStatusSnapshots") or []]
+    return {
+        "id": group.get("id"),
+        "name": group.get("name"),
+        **{key: snapshot[key] for key in ("queued", "input", "output", "activeThreadCount") if key in snapshot},
+        "runStatus": dict(Counter(p.get("runStatus") for p in processors)),
+        "processors": [{"id": p.get("id"), "name": p.get("name"), "runStatus": p.get("runStatus")}
+                       for p in processors],
+        "queues": [{"id": c.get("id"), "source": c.get("sourceName"), "target": c.get("destinationName"),
+                    "queued": c.get("queued")}
+                   for c in connections if c.get("flowFilesQueued") or c.get("queuedCount") not in (None, "0")],
+    }
+
+
+def project_definition(definition):
+    """Processors (set properties only), connections by name and child groups"""
+    if "flowContents" not in definition:
+        # export_flow_to_file result: already just a path and a size
+        return definition
+    contents = definition["flowContents"]
+    names = {p.get("identifier"): p.get("name") for p in contents.get("processors") or []}
+    return {
+        "name": contents.get("name"),
+        "processors": [
+            {"name": p.get("name"), "type": _short(p.get("type")),
+             "properties": {k: _clip(v) for k, v in (p.get("properties") or {}).items() if v not in (None, "")},
+             "autoTerminatedRelationships": p.get("autoTerminatedRelationships") or []}
+            for p in contents.get("processors") or []
+        ],
+        "connections": [
+            {"source": names.get(c["source"]["id"], c["source"].get("name")),
+             "target": names.get(c["destination"]["id"], c["destination"].get("name")),
+             "relationships": c.get("selectedRelationships") or []}
+            for c in contents.get("connections") or []
+        ],
+        "processGroups": [g.get("name") for g in contents.get("processGroups") or []],
+    }
+
+
+PROJECTORS = {
+    "list_nifi_processors": project_processors,
+    "get_nifi_flow_status": project_status,
+    "export_nifi_flow": project_definition,
+    "start_nifi_processor": project_processor,
+    "stop_nifi_processor": project_processor,
+}
+
+
+class HandleStore:
+    """Bounded LRU of list fields cut from tool outputs"""
+
+    def __init__(self, limit=HANDLE_LIMIT):
+        self.limit = limit
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, items):
+        handle = f"h-{uuid.uuid4().hex[:10]}"
+        with self._lock:
+            self._items[handle] = items
+            while len(self._items) > self.limit:
+                self._items.popitem(last=False)
+        return handle
+
+    def get(self, handle):
+        with self._lock:
+            items = self._items.get(handle)
+            if items is not None:
+                self._items.move_to_end(handle)
+            return items
+
+
+HANDLES = HandleStore()
+
+
+def _fitting_count(items, render, budget):
+    """Largest n such that ``render(items[:n])`` fits in ``budget`` characters"""
+    low, high = 0, len(items)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if len(_dumps(render(items[:middle]))) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def fit_budget(data, budget=OUTPUT_BUDGET):
+    """Cut the longest lists of ``data`` until its JSON fits ``budget``"""
+    if not isinstance(data, dict) or len(_dumps(data)) <= budget:
+        return data
+    data = dict(data)
+    truncated = []
+    for key in sorted((k for k, v in data.items() if isinstance(v, list)),
+                      key=lambda k: len(_dumps(data[k])), reverse=True):
+        items = data[key]
+        handle = HANDLES.put(items)
+
+        def note(shown):
+            return {"field": key, "shown": shown, "total": len(items), "handle": handle,
+                    "hint": f"call fetch_more_nifi_output(handle='{handle}', offset={shown}) for the rest"}
+
+        def render(shown):
+            return dict(data, **{key: shown}, truncated=truncated + [note(len(shown))])
+
+        shown = _fitting_count(items, render, budget)
+        data[key] = items[:shown]
+        truncated.append(note(shown))
+        data["truncated"] = truncated
+        if len(_dumps(data)) <= budget:
+            break
+    return data
+
+
+def project(tool, result, budget=OUTPUT_BUDGET):
+    """Projected, budgeted form of a tool's raw result (raw if projection is off)"""
+    projector = PROJECTORS.get(tool)
+    if not PROJECTION_ENABLED or projector is None or result is None:
+        return result
+    projected = fit_budget(projector(result), budget)
+    record_projection(tool, len(_dumps(result)), len(_dumps(projected)))
+    return projected
+
+
+def fetch_more(handle, offset=0, budget=OUTPUT_BUDGET):
+    """Next page of a truncated list, as many items as fit in ``budget``"""
+    items = HANDLES.get(handle)
+    if items is None:
+        return {"error": f"Unknown or expired handle '{handle}'; call the original tool again"}
+    remaining = items[offset:]
+
+    def render(shown):
+        return {"handle": handle, "offset": offset, "total": len(items), "items": shown, "next_offset": None}
+
+    shown = max(1, _fitting_count(remaining, render, budget)) if remaining else 0
+    next_offset = offset + shown if offset + shown < len(items) else None
+    return {"handle": handle, "offset": offset, "total": len(items), "items": remaining[:shown],
+            "next_offset": next_offset}
@@ -0,0 +1,240 @@
+"""
+Idempotent reconciliation of a live process group against a flow spec.
+
+The desired state uses the ``templates/*.json`` shape. Processors are
+matched by name and connections by (source name, target name,
+relationships). Only the differences are applied, so re-running the same
+spec is a no-op and tweaking one property costs a single PUT instead of
+a full rebuild.
+"""
+
+from .flow_spec import connection_relationships
+from .nifi_api import get_client
+
+
+def _config_delta(desired, live):
+    """Keys of the desired config that differ from the live config"""
+    delta = {}
+    for key, value in desired.items():
+        if key == "properties":
+            live_properties = live.get("properties") or {}
+            changed = {k: v for k, v in value.items() if live_properties.get(k) != v}
+            if changed:
+                delta["properties"] = changed
+        elif key == "autoTerminatedRelationships":
+            if sorted(value) != sorted(live.get(key) or []):
+                delta[key] = value
+        elif live.get(key) != value:
+            delta[key] = value
+    return delta
+
+
+def _live_state(client, pg_id):
+    processors = {}
+    duplicates = []
+    for entity in client.list_processors(pg_id):
+        name = entity["component"]["name"]
+        if name in processors:
+            duplicates.append(entity)
+        else:
+            processors[name] = entity
+
+    names_by_id = {entity["id"]: name for name, entity in processors.items()}
+    connections = []
+    for entity in client.list_connections(pg_id):
+        component = entity["component"]
+        source = names_by_id.get(component["source"]["id"])
+        target = names_by_id.get(component["destination"]["id"])
+        # Connections to ports, funnels or duplicate processors are left alone
+        if source is None or target is None:
+            continue
+        connections.append({
+            "id": entity["id"],
+            "source": source,
+            "target": target,
+            "relationships": sorted(component.get("selectedRelationships") or []),
+        })
+    return processors, duplicates, connections
+
+
+def plan_reconcile(spec, pg_id, client=None):
+    """Compute the minimal operations that turn ``pg_id`` into ``spec``.
+
+    A ``pg_id`` of None plans against a group that does not exist yet.
+    """
+    client = client or get_client()
+    live_processors, duplicates, live_connections = _live_state(client, pg_id) if pg_id else ({}, [], [])
+    desired = {p["name"]: p for p in spec.get("processors", [])}
+
+    plan = {
+        "create_processors": [],
+        "update_processors": [],
+        "delete_processors": [{"name": e["component"]["name"], "id": e["id"]} for e in duplicates],
+        "create_connections": [],
+        "delete_connections": [],
+    }
+
+    replaced = set()
+    for name, processor in desired.items():
+        live = live_processors.get(name)
+        if live is None:
+            plan["create_processors"].append(processor)
+        elif live["component"]["type"] != processor["type"]:
+            # A type change cannot be patched in place
+            replaced.add(name)
+            plan["delete_processors"].append({"name": name, "id": live["id"]})
+            plan["create_processors"].append(processor)
+        else:
+            delta = _config_delta(processor.get("config", {}), live["component"].get("config", {}))
+            if delta:
+                plan["update_processors"].append({"name": name, "id": live["id"], "config": delta})
+
+    for name, live in live_processors.items():
+        if name not in desired:
+            plan["delete_processors"].append({"name": name, "id": live["id"]})
+
+    gone = replaced | {name for name in live_processors if name not in desired}
+    unmatched = [c for c in live_connections if c["source"] not in gone and c["target"] not in gone]
+    for connection in spec.get("connections", []):
+        relationships = connection_relationships(connection)
+        match = None
+        for live in unmatched:
+            if (live["source"], live["target"]) != (connection["source"], connection["target"]):
+                continue
+            if relationships is None or sorted(relationships) == live["relationships"]:
+                match = live
+                break
+        if match is not None:
+            unmatched.remove(match)
+        else:
+            plan["create_connections"].append({
+                "source": connection["source"],
+                "target": connection["target"],
+                "relationships": relationships,
+            })
+    plan["delete_connections"] = [
+        {"id": c["id"], "source": c["source"], "target": c["target"]}
+        for c in live_connections if c in unmatched or c["source"] in gone or c["target"] in gone
+    ]
+
+    plan["live_processors"] = {name: e["id"] for name, e in live_processors.items()}
+    plan["running"] = sorted(e["id"] for e in live_processors.values()
+                             if e["component"].get("state") == "RUNNING")
+    return plan
+
+
+def plan_size(plan):
+    """Number of write operations a plan will issue"""
+    return sum(len(plan[k]) for k in (
+        "create_processors", "update_processors", "delete_processors",
+        "create_connections", "delete_connections",
+    ))
+
+
+def apply_plan(plan, pg_id, client=None):
+    """Apply a plan from ``plan_reconcile`` and return the resulting name -> id map"""
+    client = client or get_client()
+    processors = dict(plan["live_processors"])
+    errors = []
+
+    def attempt(description, fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            errors.append(f"{description}: {e}")
+            return None
+
+    # Running components must be stopped before they can be changed or unwired
+    touched = {u["id"] for u in plan["update_processors"]} | {d["id"] for d in plan["delete_processors"]}
+    for connection in plan["delete_connections"]:
+        touched.update(processors.get(connection[k]) for k in ("source", "target"))
+    to_stop = [pid for pid in plan["running"] if pid in touched]
+    for processor_id in to_stop:
+        attempt(f"stop {processor_id}", client.stop_processor, processor_id)
+
+    for connection in plan["delete_connections"]:
+        attempt(f"delete connection {connection['source']} -> {connection['target']}",
+                client.delete_connection, connection["id"])
+
+    deleted = set()
+    for processor in plan["delete_processors"]:
+        if attempt(f"delete processor {processor['name']}", client.delete_processor, processor["id"]):
+            deleted.add(processor["id"])
+            if processors.get(processor["name"]) == processor["id"]:
+                del processors[processor["name"]]
+
+    for processor in plan["create_processors"]:
+        processor_id = attempt(f"create processor {processor['name']}", client.add_processor,
+                               pg_id, processor["type"], processor.get("config", {}), processor["name"])
+        if processor_id:
+            processors[processor["name"]] = processor_id
+
+    for update in plan["update_processors"]:
+        attempt(f"update processor {update['name']}", client.update_processor_config,
+                update["id"], update["config"])
+
+    for connection in plan["create_connections"]:
+        source, target = processors.get(connection["source"]), processors.get(connection["target"])
+        if source is None or target is None:
+            errors.append(f"connection {connection['source']} -> {connection['target']}: unknown processor")
+        elif connection["relationships"] is None:
+            attempt(f"connection {connection['source']} -> {connection['target']}",
+                    client.connect, source, target, pg_id)
+        else:
+            attempt(f"connection {connection['source']} -> {connection['target']}",
+                    client.create_connection, pg_id, source, target, connection["relationships"])
+
+    for processor_id in to_stop:
+        if processor_id not in deleted:
+            attempt(f"restart {processor_id}", client.start_processor, processor_id)
+
+    return {"processors": processors, "errors": errors}
+
+
+def find_process_group(name, parent="root", client=None):
+    """Id of the child group of ``parent`` called ``name``, or None"""
+    client = client or get_client()
+    for group in client.list_process_groups(parent):
+        if group["component"]["name"] == name:
+            return group["id"]
+    return None
+
+
+def reconcile(spec, pg_id=None, parent="root", client=None, dry_run=False):
+    """Converge a process group to ``spec``, creating the group if needed.
+
+    Without ``pg_id`` the group is looked up by the spec name under
+    ``parent``. With ``dry_run`` the plan is returned without applying it;
+    a group that does not exist yet is reported as ``created_group`` and
+    planned as empty.
+    A spec that fails validation changes nothing and returns its errors.
+    """
+    from .validator import validate_spec
+
+    client = client or get_client()
+    catalog = client.processor_catalog()
+    catalog.refresh_unknown([p["type"] for p in spec.get("processors") or []
+                             if isinstance(p, dict) and p.get("type")], client)
+    validation = validate_spec(spec, catalog, auto_terminate=False)
+    if not validation["valid"]:
+        result = {"process_group_id": pg_id, "created_group": False, "operations": 0,
+                  "errors": validation["errors"], "warnings": validation["warnings"]}
+        if dry_run:
+            result["plan"] = None
+        return result
+    created = False
+    if pg_id is None:
+        pg_id = find_process_group(spec["name"], parent, client)
+    if pg_id is None:
+        created = True
+        if not dry_run:
+            pg_id = client.create_pg(spec["name"], parent)
+
+    plan = plan_reconcile(spec, pg_id, client)
+    result = {"process_group_id": pg_id, "created_group": created, "operations": plan_size(plan),
+              "warnings": validation["warnings"]}
+    if dry_run:
+        result["plan"] = plan
+        return result
+    result.update(apply_plan(plan, pg_id, client))
+    return result
@@ -0,0 +1,97 @@
+"""
+In-process cache of NiFi component entities and their revisions.
+
+NiFi uses optimistic locking: every write must carry the component's
+current revision. Instead of GETting a component before each write, the
+clients remember the entity returned by every POST/PUT/GET and read the
+revision (and relationships) from here. A 409 conflict means the cached
+copy is stale; the clients then refresh it and retry (``NIFI_CONFLICT_RETRIES``).
+
+The cache is an LRU of at most ``NIFI_ENTITY_CACHE_SIZE`` entities, so a
+long-running service or batch does not keep every component it has ever
+touched. An evicted entity is simply fetched again on its next write.
+"""
+
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+ENTITY_CACHE_SIZE = int(os.getenv("NIFI_ENTITY_CACHE_SIZE", "10000"))
+
+
+class EntityCache:
+    """Thread-safe, size-bounded map of component id -> latest known entity"""
+
+    def __init__(self, limit=ENTITY_CACHE_SIZE):
+        self.limit = max(1, limit)
+        self._entities = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def remember(self, entity):
+        """Store an entity from a NiFi response (ignored if it has no revision)"""
+        if not isinstance(entity, dict) or "id" not in entity or "revision" not in entity:
+            return entity
+        with self._lock:
+            current = self._entities.get(entity["id"])
+            # Never replace a newer revision with an older response
+            if current is None or entity["revision"].get("version", 0) >= current["revision"].get("version", 0):
+                self._entities[entity["id"]] = entity
+            self._entities.move_to_end(entity["id"])
+            while len(self._entities) > self.limit:
+                self._entities.popitem(last=False)
+                self.evictions += 1
+        return entity
+
+    def remember_all(self, entities):
+        for entity in entities:
+            self.remember(entity)
+        return entities
+
+    def get(self, component_id):
+        """Return a copy of the cached entity, or None"""
+        with self._lock:
+            entity = self._entities.get(component_id)
+            if entity is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entities.move_to_end(component_id)
+            return copy.deepcopy(entity)
+
+    def revision(self, component_id):
+        entity = self.get(component_id)
+        return entity["revision"] if entity else None
+
+    def invalidate(self, component_id=None):
+        """Drop one component, or everything when no id is given"""
+        with self._lock:
+            if component_id is None:
+                self._entities.clear()
+            else:
+                self._entities.pop(component_id, None)
+
+    def __contains__(self, component_id):
+        with self._lock:
+            return component_id in self._entities
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entities)
+
+
+def revision_changed(old, new):
+    """True if ``new`` carries a different revision than ``old``"""
+    return old["revision"].get("version") != new["revision"].get("version")
+
+
+def revision_params(entity):
+    """Query parameters NiFi expects on DELETE"""
+    revision = entity["revision"]
+    params = {"version": revision.get("version", 0)}
+    if revision.get("clientId"):
+        params["clientId"] = revision["clientId"]
+    return params
@@ -0,0 +1,268 @@
+"""
+Incremental snapshots of exported NiFi flow definitions.
+
+Each export is flattened into a map of component identifier -> entry
+(collection, parent group, component body). The first snapshot stores
+the whole map; later ones store only components that changed or were
+removed since the previous snapshot. ``reconstruct`` replays the chain
+back into a regular flow definition document. A full snapshot is
+written every ``full_every`` saves so reconstruction never replays an
+unbounded chain.
+
+Saving works on the raw export stream in bounded memory. The export is
+hashed in chunks, and an export identical to the previous one becomes
+an empty delta. A full snapshot is the export itself, gzip-compressed
+chunk by chunk. The JSON is only parsed when a delta has to be computed.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from .nifi_api import EXPORT_CHUNK_SIZE, get_client
+
+# Child collections of a versioned process group
+GROUP_COLLECTIONS = (
+    "processGroups", "processors", "connections", "inputPorts", "outputPorts",
+    "funnels", "labels", "remoteProcessGroups", "controllerServices",
+)
+
+
+def _identifier(component):
+    return component.get("identifier") or component.get("id")
+
+
+def flatten_definition(definition):
+    """Flatten a flow definition into (meta, {identifier: entry})"""
+    meta = {k: v for k, v in definition.items() if k != "flowContents"}
+    components = {}
+    stack = [(definition.get("flowContents", {}), None, None)]
+    while stack:
+        group, parent, collection = stack.pop()
+        group_id = _identifier(group) or "root"
+        components[group_id] = {
+            "collection": collection,
+            "parent": parent,
+            "component": {k: v for k, v in group.items() if k not in GROUP_COLLECTIONS},
+        }
+        for name in GROUP_COLLECTIONS:
+            if name == "processGroups":
+                continue
+            for component in group.get(name, []):
+                components[_identifier(component)] = {
+                    "collection": name,
+                    "parent": group_id,
+                    "component": component,
+                }
+        # Reversed so child groups are visited in document order
+        for child in reversed(group.get("processGroups", [])):
+            stack.append((child, group_id, "processGroups"))
+    return meta, components
+
+
+def unflatten_definition(meta, components):
+    """Rebuild a nested flow definition from ``flatten_definition`` output"""
+    groups = {}
+    root = None
+    for identifier, entry in components.items():
+        if entry["collection"] in (None, "processGroups"):
+            group = dict(entry["component"])
+            for name in GROUP_COLLECTIONS:
+                group[name] = []
+            groups[identifier] = group
+            if entry["parent"] is None:
+                root = group
+    for identifier, entry in components.items():
+        if entry["parent"] is None:
+            continue
+        parent = groups.get(entry["parent"])
+        if parent is None:
+            continue
+        component = groups[identifier] if entry["collection"] == "processGroups" else entry["component"]
+        parent[entry["collection"]].append(component)
+    definition = dict(meta)
+    definition["flowContents"] = root or {}
+    return definition
+
+
+def _open_definition(definition_or_path):
+    """Binary stream of an exported definition (dict or file path)"""
+    if isinstance(definition_or_path, dict):
+        return io.BytesIO(json.dumps(definition_or_path, separators=(",", ":")).encode())
+    return open(definition_or_path, "rb")
+
+
+def _hash_stream(stream, chunk_size=EXPORT_CHUNK_SIZE):
+    """(sha256 hex digest, size in bytes) of a stream, read from its start in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class SnapshotStore:
+    """Directory of numbered full/delta snapshots for one process group"""
+
+    def __init__(self, directory, full_every=20):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.full_every = full_every
+
+    def _path(self, index):
+        return self.directory / f"{index:06d}.json"
+
+    def _full_path(self, index):
+        return self.directory / f"{index:06d}.full.json.gz"
+
+    @property
+    def _manifest_path(self):
+        return self.directory / "manifest.json"
+
+    def indexes(self):
+        """Snapshot indexes in ascending order"""
+        paths = [*self.directory.glob("[0-9]*.json"), *self.directory.glob("[0-9]*.full.json.gz")]
+        return sorted({int(p.name.split(".", 1)[0]) for p in paths})
+
+    def _read(self, index):
+        full_path = self._full_path(index)
+        if full_path.exists():
+            with gzip.open(full_path, "rb") as f:
+                meta, components = flatten_definition(json.load(f))
+            return {"kind": "full", "meta": meta, "components": components}
+        with open(self._path(index), "r") as f:
+            return json.load(f)
+
+    def _write(self, index, snapshot):
+        path = self._path(index)
+        tmp_path = path.with_suffix(".part")
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def _write_full(self, index, stream):
+        """Compress the raw export as snapshot ``index``; returns the stored size"""
+        path = self._full_path(index)
+        tmp_path = path.with_suffix(".part")
+        stream.seek(0)
+        with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            shutil.copyfileobj(stream, f, EXPORT_CHUNK_SIZE)
+        os.replace(tmp_path, path)
+        return path.stat().st_size
+
+    def _manifest(self):
+        """Hash and component count of the latest snapshot ({} if unknown)"""
+        try:
+            with open(self._manifest_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _state(self, index):
+        """Flattened (meta, components) as of snapshot ``index``"""
+        chain = []
+        for i in reversed([i for i in self.indexes() if i <= index]):
+            snapshot = self._read(i)
+            chain.append(snapshot)
+            if snapshot["kind"] == "full":
+                break
+        if not chain:
+            raise FileNotFoundError(f"No snapshot {index} in {self.directory}")
+
+        meta, components = {}, {}
+        for snapshot in reversed(chain):
+            if snapshot["kind"] == "full":
+                meta, components = snapshot["meta"], snapshot["components"]
+            else:
+                if snapshot.get("meta") is not None:
+                    meta = snapshot["meta"]
+                for identifier in snapshot["removed"]:
+                    components.pop(identifier, None)
+                components.update(snapshot["changed"])
+        return meta, components
+
+    def save(self, definition_or_path):
+        """Store a snapshot of an exported definition (dict or file path).
+
+        Returns a summary with the snapshot index, its kind, the export's
+        hash and size, and how many components changed or were removed.
+        Component counts are None when the export was not parsed (a full
+        snapshot, or an unchanged export after one).
+        """
+        existing = self.indexes()
+        index = existing[-1] + 1 if existing else 0
+        manifest = self._manifest() if existing else {}
+
+        with _open_definition(definition_or_path) as stream:
+            digest, size = _hash_stream(stream)
+            components = manifest.get("components")
+            if not existing or index % self.full_every == 0:
+                kind, changed, removed = "full", None, 0
+                components = None
+                stored = self._write_full(index, stream)
+            else:
+                kind = "delta"
+                if manifest.get("index") == existing[-1] and manifest.get("sha256") == digest:
+                    # Same bytes as the previous export: nothing to parse or diff
+                    snapshot = {"kind": kind, "meta": None, "changed": {}, "removed": []}
+                else:
+                    stream.seek(0)
+                    meta, current = flatten_definition(json.load(stream))
+                    previous_meta, previous = self._state(existing[-1])
+                    snapshot = {
+                        "kind": kind,
+                        "meta": meta if meta != previous_meta else None,
+                        "changed": {k: v for k, v in current.items() if previous.get(k) != v},
+                        "removed": [k for k in previous if k not in current],
+                    }
+                    components = len(current)
+                snapshot["created_at"] = time.time()
+                self._write(index, snapshot)
+                changed, removed = len(snapshot["changed"]), len(snapshot["removed"])
+                stored = self._path(index).stat().st_size
+
+        manifest = {"index": index, "sha256": digest, "components": components}
+        with open(self._manifest_path, "w") as f:
+            json.dump(manifest, f)
+        return {
+            "index": index,
+            "kind": kind,
+            "changed": changed,
+            "removed": removed,
+            "components": components,
+            "sha256": digest,
+            "bytes": size,
+            "stored_bytes": stored,
+        }
+
+    def reconstruct(self, index=None):
+        """Rebuild the full flow definition as of ``index`` (latest by default)"""
+        if index is None:
+            existing = self.indexes()
+            if not existing:
+                raise FileNotFoundError(f"No snapshots in {self.directory}")
+            index = existing[-1]
+        return unflatten_definition(*self._state(index))
+
+
+def snapshot_flow(pg_id, directory, client=None, full_every=20):
+    """Stream-export a process group to disk and record an incremental snapshot"""
+    client = client or get_client()
+    store = SnapshotStore(directory, full_every)
+    export_path = store.directory / "latest-export.json"
+    export = client.export_flow_to_file(pg_id, export_path)
+    summary = store.save(export_path)
+    summary["export_bytes"] = export["bytes"]
+    return summary
+
+
+def reconstruct_snapshot(directory, index=None):
+    """Rebuild a flow definition from a snapshot directory"""
+    return SnapshotStore(directory).reconstruct(index)
@@ -0,0 +1,302 @@
+"""
+Background collector of recursive process-group status.
+
+Each poll issues one ``GET /flow/process-groups/{id}/status?recursive=true``
+per watched group and records every processor, connection and nested
+group into a fixed-size ring buffer backed by a flat ``array('d')``, so
+memory stays constant however long the collector runs. On top of the
+series it offers rates, percentiles and alerts for connections nearing
+back-pressure and for processors that are running but receive nothing.
+
+NiFi reports in/out counters over a rolling five-minute window, so the
+per-second rate of a counter is its latest value divided by that window.
+Queue depths and back-pressure percentages are point-in-time gauges.
+"""
+
+import math
+import os
+import threading
+import time
+from array import array
+from collections import Counter
+
+from .nifi_api import get_client
+
+STATUS_INTERVAL = float(os.getenv("NIFI_STATUS_INTERVAL", "10"))
+STATUS_HISTORY = int(os.getenv("NIFI_STATUS_HISTORY", "360"))
+BACKPRESSURE_ALERT = float(os.getenv("NIFI_BACKPRESSURE_ALERT", "0.8"))
+# Width of NiFi's rolling in/out counters
+STATS_WINDOW = 300.0
+
+PROCESSOR_FIELDS = ("flowFilesIn", "bytesIn", "flowFilesOut", "bytesOut",
+                    "bytesRead", "bytesWritten", "taskCount", "activeThreadCount")
+CONNECTION_FIELDS = ("flowFilesIn", "bytesIn", "flowFilesOut", "bytesOut",
+                     "flowFilesQueued", "bytesQueued", "percentUseCount", "percentUseBytes")
+GROUP_FIELDS = ("flowFilesIn", "bytesIn", "flowFilesOut", "bytesOut",
+                "flowFilesQueued", "bytesQueued", "activeThreadCount")
+FIELDS = {"processor": PROCESSOR_FIELDS, "connection": CONNECTION_FIELDS, "group": GROUP_FIELDS}
+WINDOWED_FIELDS = {"flowFilesIn", "bytesIn", "flowFilesOut", "bytesOut",
+                   "bytesRead", "bytesWritten", "taskCount"}
+
+
+class RingBuffer:
+    """Fixed-capacity time series of float rows in one flat array.
+
+    Row layout is ``[timestamp, field_0, field_1, ...]``; missing values
+    are stored as NaN. Appending overwrites the oldest row once full.
+    """
+
+    def __init__(self, capacity, fields):
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._index = {name: i + 1 for i, name in enumerate(self.fields)}
+        self._width = len(self.fields) + 1
+        self._data = array("d", [math.nan]) * (capacity * self._width)
+        self._head = 0
+        self._count = 0
+
+    def append(self, timestamp, values):
+        offset = self._head * self._width
+        self._data[offset] = timestamp
+        for name, i in self._index.items():
+            value = values.get(name)
+            self._data[offset + i] = math.nan if value is None else float(value)
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def _rows(self):
+        start = (self._head - self._count) % self.capacity
+        for n in range(self._count):
+            yield ((start + n) % self.capacity) * self._width
+
+    def series(self, field):
+        """(timestamp, value) pairs, oldest first"""
+        i = self._index[field]
+        return [(self._data[offset], self._data[offset + i]) for offset in self._rows()]
+
+    def values(self, field):
+        """Non-missing values of a field, oldest first"""
+        return [v for _, v in self.series(field) if not math.isnan(v)]
+
+    def latest(self):
+        """Most recent row as a dict, or None if empty"""
+        if not self._count:
+            return None
+        offset = ((self._head - 1) % self.capacity) * self._width
+        row = {"timestamp": self._data[offset]}
+        for name, i in self._index.items():
+            value = self._data[offset + i]
+            row[name] = None if math.isnan(value) else value
+        return row
+
+    def __len__(self):
+        return self._count
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (0-100) of a list, None if empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class StatusCollector:
+    """Poll recursive status for process groups into per-component ring buffers"""
+
+    def __init__(self, process_group_ids=("root",), interval=STATUS_INTERVAL,
+                 capacity=STATUS_HISTORY, client=None, backpressure_threshold=BACKPRESSURE_ALERT):
+        self.process_group_ids = list(dict.fromkeys(process_group_ids))
+        # Watchers per group; several UI sessions can share one collector
+        self._watchers = Counter(self.process_group_ids)
+        self.interval = interval
+        self.capacity = capacity
+        self.client = client or get_client()
+        self.backpressure_threshold = backpressure_threshold
+        self.buffers = {}
+        self.components = {}
+        self.errors = {}
+        self.polls = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _record(self, kind, snapshot, group_id, root_id, now):
+        component_id = snapshot["id"]
+        buffer = self.buffers.get(component_id)
+        if buffer is None:
+            buffer = self.buffers[component_id] = RingBuffer(self.capacity, FIELDS[kind])
+        buffer.append(now, snapshot)
+        self.components[component_id] = {
+            "id": component_id,
+            "kind": kind,
+            "name": snapshot.get("name", component_id),
+            "group_id": group_id,
+            "root_id": root_id,
+            "run_status": snapshot.get("runStatus"),
+            "source_id": snapshot.get("sourceId"),
+            "destination_id": snapshot.get("destinationId"),
+        }
+
+    def _walk(self, group_snapshot, root_id, now):
+        group_id = group_snapshot["id"]
+        self._record("group", group_snapshot, group_id, root_id, now)
+        for entry in group_snapshot.get("processorStatusSnapshots", []):
+            self._record("processor", entry["processorStatusSnapshot"], group_id, root_id, now)
+        for entry in group_snapshot.get("connectionStatusSnapshots", []):
+            self._record("connection", entry["connectionStatusSnapshot"], group_id, root_id, now)
+        for entry in group_snapshot.get("processGroupStatusSnapshots", []):
+            self._walk(entry["processGroupStatusSnapshot"], root_id, now)
+
+    def poll_once(self):
+        """Collect one sample for every watched group; returns the number of new components"""
+        seen = 0
+        with self._lock:
+            pg_ids = list(self.process_group_ids)
+        for pg_id in pg_ids:
+            try:
+                status = self.client.get_group_status(pg_id, recursive=True)
+            except Exception as e:
+                with self._lock:
+                    if pg_id in self.process_group_ids:
+                        self.errors[pg_id] = str(e)
+                continue
+            now = time.time()
+            with self._lock:
+                # Unwatched while its status was fetched; recording it would bring its history back
+                if pg_id not in self.process_group_ids:
+                    continue
+                self.errors.pop(pg_id, None)
+                before = len(self.buffers)
+                self._walk(status["processGroupStatus"]["aggregateSnapshot"], pg_id, now)
+                seen += len(self.buffers) - before
+        self.polls += 1
+        return seen
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.poll_once()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        """Poll in a daemon thread until ``stop()``"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="nifi-status", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def watch(self, pg_id):
+        """Poll a group; each call needs a matching ``unwatch``"""
+        with self._lock:
+            self._watchers[pg_id] += 1
+            if pg_id not in self.process_group_ids:
+                self.process_group_ids.append(pg_id)
+
+    def unwatch(self, pg_id):
+        """Release one ``watch``; the last one stops polling and drops the group's history"""
+        with self._lock:
+            if self._watchers[pg_id] > 1:
+                self._watchers[pg_id] -= 1
+                return
+            self._watchers.pop(pg_id, None)
+            if pg_id in self.process_group_ids:
+                self.process_group_ids.remove(pg_id)
+            self.errors.pop(pg_id, None)
+            for component_id in [c for c, info in self.components.items() if info["root_id"] == pg_id]:
+                del self.components[component_id]
+                del self.buffers[component_id]
+
+    def history(self, component_id, field):
+        """(timestamp, value) pairs for one metric of one component"""
+        with self._lock:
+            return self.buffers[component_id].series(field)
+
+    def rate(self, component_id, field="flowFilesOut"):
+        """Per-second rate of a windowed counter, from its latest sample"""
+        if field not in WINDOWED_FIELDS:
+            raise ValueError(f"{field} is a gauge, not a windowed counter")
+        with self._lock:
+            latest = self.buffers[component_id].latest() or {}
+        value = latest.get(field)
+        return None if value is None else value / STATS_WINDOW
+
+    def percentile(self, component_id, field, q=95):
+        """Percentile of a metric over the buffered history"""
+        with self._lock:
+            return percentile(self.buffers[component_id].values(field), q)
+
+    def summary(self, kind=None):
+        """Latest sample per component with its per-second rates"""
+        rows = []
+        with self._lock:
+            for component_id, info in self.components.items():
+                if kind is not None and info["kind"] != kind:
+                    continue
+                latest = self.buffers[component_id].latest() or {}
+                row = dict(info, samples=len(self.buffers[component_id]))
+                for field, value in latest.items():
+                    row[field] = value
+                    if field in WINDOWED_FIELDS and value is not None:
+                        row[f"{field}PerSec"] = value / STATS_WINDOW
+                rows.append(row)
+        return rows
+
+    def alerts(self, threshold=None, min_samples=3):
+        """Connections near back-pressure and running processors that get no input"""
+        threshold = self.backpressure_threshold if threshold is None else threshold
+        alerts = []
+        with self._lock:
+            fed = {info["destination_id"] for info in self.components.values()
+                   if info["kind"] == "connection"}
+            for component_id, info in self.components.items():
+                buffer = self.buffers[component_id]
+                latest = buffer.latest() or {}
+                if info["kind"] == "connection":
+                    usage = max(latest.get("percentUseCount") or 0, latest.get("percentUseBytes") or 0) / 100.0
+                    if usage >= threshold:
+                        alerts.append({
+                            "level": "critical" if usage >= 1.0 else "warning",
+                            "kind": "backpressure",
+                            "component_id": component_id,
+                            "root_id": info["root_id"],
+                            "name": info["name"],
+                            "group_id": info["group_id"],
+                            "value": round(usage, 3),
+                            "message": f"Queue {info['name'] or component_id} is {usage:.0%} of its back-pressure threshold "
+                                       f"({latest.get('flowFilesQueued') or 0:.0f} flowfiles queued)",
+                        })
+                elif info["kind"] == "processor" and info["run_status"] == "Running" and component_id in fed:
+                    received = buffer.values("flowFilesIn")[-min_samples:]
+                    if len(received) >= min_samples and not any(received):
+                        alerts.append({
+                            "level": "warning",
+                            "kind": "starving",
+                            "component_id": component_id,
+                            "root_id": info["root_id"],
+                            "name": info["name"],
+                            "group_id": info["group_id"],
+                            "value": 0,
+                            "message": f"Processor {info['name']} is running but received no flowfiles "
+                                       f"in the last {min_samples} samples",
+                        })
+        return alerts
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
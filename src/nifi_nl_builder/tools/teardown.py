@@ -0,0 +1,172 @@
+"""
+Dependency-ordered, parallel teardown of process groups.
+
+NiFi refuses to delete a running processor, a connection that still has
+queued FlowFiles, or a processor that still has connections. Teardown
+therefore runs in levels. All calls within a level are independent and
+run on a thread pool:
+
+1. stop every group in bulk (one recursive scheduling call per group)
+2. list the group trees, one level of child groups at a time, and the
+   connections and processors of every group
+3. drop the queued FlowFiles of every connection that has any
+4. delete every connection
+5. delete every processor
+6. delete the child groups deepest first, then the groups themselves
+
+Each delete uses the revision from the listing made after the stop,
+and a stale revision is refreshed and retried (``NIFI_CONFLICT_RETRIES``).
+A failed call is retried once after the rest of its level. If it fails
+again it is recorded and teardown moves on. NiFi then refuses to delete
+the group that still holds the failed component, and that refusal is
+recorded too.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .nifi_api import SCHEDULE_TIMEOUT, get_client
+
+TEARDOWN_PARALLELISM = int(os.getenv("NIFI_TEARDOWN_PARALLELISM", "8"))
+
+
+def _queued(connection):
+    """Queued FlowFiles of a listed connection (unknown counts as queued)"""
+    snapshot = (connection.get("status") or {}).get("aggregateSnapshot") or {}
+    return snapshot.get("flowFilesQueued", 1)
+
+
+def _run_level(pool, fn, items, describe, errors):
+    """``fn`` over ``items`` concurrently; (item, result) of those that succeeded.
+
+    Items that fail are retried once after the rest of the level, so a
+    transient error does not make every later level fail on them too.
+    """
+    results, failed = [], []
+    for attempt in range(2):
+        futures = [(item, pool.submit(fn, item)) for item in (items if attempt == 0 else failed)]
+        failed = []
+        for item, future in futures:
+            try:
+                results.append((item, future.result()))
+            except Exception as e:
+                if attempt:
+                    errors.append(f"{describe(item)}: {type(e).__name__}: {e}")
+                else:
+                    failed.append(item)
+        if not failed:
+            break
+    return results
+
+
+def teardown_groups(pg_ids, client=None, parallelism=TEARDOWN_PARALLELISM, keep_groups=False,
+                    timeout=SCHEDULE_TIMEOUT):
+    """Stop, empty and delete process groups and everything inside them.
+
+    With ``keep_groups`` the groups in ``pg_ids`` are emptied but kept;
+    their child groups are still deleted. Returns the number of groups,
+    FlowFiles dropped and components deleted, any errors and per-level
+    timings in seconds.
+    """
+    client = client or get_client()
+    pg_ids = list(dict.fromkeys(pg_ids))
+    errors = []
+    timings = {}
+    deleted = {"connections": 0, "processors": 0, "process_groups": 0}
+    started = time.perf_counter()
+
+    def mark(phase):
+        timings[phase] = round(time.perf_counter() - started, 4)
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as pool:
+        for pg_id, result in _run_level(pool, lambda g: client.stop_flow(g, wait=True, timeout=timeout),
+                                        pg_ids, lambda g: f"stop {g}", errors):
+            if not result["converged"]:
+                errors.append(f"stop {pg_id}: {result['pending']} processor(s) still running, "
+                              f"{result['failed']} failed")
+        mark("stop")
+
+        levels = [pg_ids]
+        while levels[-1]:
+            children = _run_level(pool, client.list_process_groups, levels[-1],
+                                  lambda g: f"list child groups of {g}", errors)
+            levels.append([group["id"] for _, groups in children for group in groups])
+        groups = [g for level in levels for g in level]
+        connections = [c for _, listed in _run_level(pool, client.list_connections, groups,
+                                                     lambda g: f"list connections of {g}", errors)
+                       for c in listed]
+        processors = [p for _, listed in _run_level(pool, client.list_processors, groups,
+                                                    lambda g: f"list processors of {g}", errors)
+                      for p in listed]
+        mark("list")
+
+        queued = [c for c in connections if _queued(c)]
+        drained = _run_level(pool, lambda c: client.drop_queue(c["id"], timeout), queued,
+                             lambda c: f"drop queue of connection {c['id']}", errors)
+        dropped = sum(count for _, count in drained)
+        # A connection that still holds data cannot be deleted; its failed drop is already reported
+        still_queued = {c["id"] for c in queued} - {c["id"] for c, _ in drained}
+        mark("drop_queues")
+
+        deleted["connections"] = len(_run_level(pool, lambda c: client.delete_connection(c["id"]),
+                                                [c for c in connections if c["id"] not in still_queued],
+                                                lambda c: f"delete connection {c['id']}", errors))
+        mark("connections")
+
+        deleted["processors"] = len(_run_level(pool, lambda p: client.delete_processor(p["id"]), processors,
+                                               lambda p: f"delete processor {p['component'].get('name')} "
+                                                         f"({p['id']})", errors))
+        mark("processors")
+
+        # A parent can only go once its child groups are gone
+        for level in reversed(levels[1:] if keep_groups else levels):
+            deleted["process_groups"] += len(_run_level(pool, client.delete_process_group, level,
+                                                        lambda g: f"delete process group {g}", errors))
+        mark("process_groups")
+
+    return {
+        "process_groups": len(groups),
+        "dropped_flowfiles": dropped,
+        "deleted": deleted,
+        "errors": errors,
+        "timings": timings,
+    }
+
+
+def teardown_group(pg_id, **kwargs):
+    """Tear down a single process group (see ``teardown_groups``)"""
+    return teardown_groups([pg_id], **kwargs)
+
+
+def main(argv=None):
+    """Tear down process groups from the command line"""
+    parser = argparse.ArgumentParser(description="Stop, empty and delete NiFi process groups")
+    parser.add_argument("pg_ids", nargs="*", help="process group ids to tear down")
+    parser.add_argument("--children-of", metavar="PARENT",
+                        help="also tear down every child group of PARENT (e.g. root)")
+    parser.add_argument("--match", metavar="REGEX", help="with --children-of, only groups whose name matches")
+    parser.add_argument("--keep-groups", action="store_true", help="empty the groups but do not delete them")
+    parser.add_argument("-j", "--parallelism", type=int, default=TEARDOWN_PARALLELISM,
+                        help="concurrent calls per level (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    pg_ids = list(args.pg_ids)
+    if args.children_of:
+        pattern = re.compile(args.match) if args.match else None
+        pg_ids += [g["id"] for g in get_client().list_process_groups(args.children_of)
+                   if pattern is None or pattern.search(g["component"]["name"])]
+    if not pg_ids:
+        parser.error("no process groups to tear down")
+
+    result = teardown_groups(pg_ids, parallelism=args.parallelism, keep_groups=args.keep_groups)
+    print(json.dumps(result, indent=2))
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
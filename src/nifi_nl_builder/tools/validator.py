@@ -0,0 +1,221 @@
+"""
+Local validation of ``templates/*.json`` flow specs before a build.
+
+Every check is one pass over the processors and connections, plus one
+strongly connected components pass for cycles, so a spec of V processors
+and E connections is validated in O(V + E). All issues are returned at
+once, before any ``create_pg`` or ``add_processor`` call, instead of
+NiFi rejecting the build half-way:
+
+- missing names and types, duplicate processor names
+- unknown processor types (against the processor catalog when loaded)
+- connections to processors that do not exist
+- relationships a processor does not have
+- required properties that are not set (when the catalog has the definition)
+- cycles in which no connection carries a loop-breaking relationship
+- relationships that are neither connected nor auto-terminated
+
+Findings backed by the target NiFi's catalog are errors. Findings based
+only on the built-in relationship table are warnings, because that table
+does not know about dynamic relationships.
+"""
+
+import difflib
+
+from .compiler import known_relationships
+from .flow_spec import connection_relationships
+
+# A cycle is intended when FlowFiles only go round it on one of these
+LOOP_RELATIONSHIPS = {"failure", "retry", "no retry", "unmatched", "reject", "timeout"}
+CYCLE_NAMES_SHOWN = 8
+
+
+class SpecValidationError(ValueError):
+    """A flow spec failed validation; ``errors`` and ``warnings`` list every issue"""
+
+    def __init__(self, errors, warnings=()):
+        self.errors = list(errors)
+        self.warnings = list(warnings)
+        super().__init__("Invalid flow spec: " + "; ".join(self.errors))
+
+
+def _relationships(ptype, catalog):
+    """(known relationships, from the catalog?, dynamic?) of ``ptype``"""
+    if catalog is not None:
+        relationships = catalog.relationships(ptype)
+        if relationships is not None:
+            return relationships, True, catalog.dynamic_relationships(ptype)
+    return known_relationships(ptype), False, False
+
+
+def _strongly_connected(names, edges):
+    """Tarjan's algorithm without recursion; components in reverse topological order"""
+    index, lowlink, on_stack = {}, {}, set()
+    stack, components = [], []
+    for root in names:
+        if root in index:
+            continue
+        work = [(root, iter(edges[root]))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, targets = work[-1]
+            for target in targets:
+                if target not in index:
+                    index[target] = lowlink[target] = len(index)
+                    stack.append(target)
+                    on_stack.add(target)
+                    work.append((target, iter(edges[target])))
+                    break
+                if target in on_stack:
+                    lowlink[node] = min(lowlink[node], index[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def validate_spec(spec, catalog=None, auto_terminate=True):
+    """Every problem in ``spec`` as ``{"valid", "errors", "warnings"}``.
+
+    ``catalog`` is a loaded ``ProcessorCatalog`` of the target NiFi; its
+    cached definitions also enable required-property checks. With
+    ``auto_terminate`` the caller fills in ``autoTerminatedRelationships``
+    for processors that do not set it (``resolve_relationships``, the
+    compiler), so only explicit lists are checked for open relationships.
+    """
+    errors, warnings = [], []
+    if catalog is not None and not catalog.loaded:
+        catalog = None
+
+    def report(authoritative, message):
+        (errors if authoritative else warnings).append(message)
+
+    if not isinstance(spec, dict) or not spec.get("name"):
+        errors.append("spec needs a 'name'")
+        spec = spec if isinstance(spec, dict) else {}
+    processors, connections = spec.get("processors") or [], spec.get("connections") or []
+    if not isinstance(processors, list) or not isinstance(connections, list):
+        errors.append("'processors' and 'connections' must be lists")
+        return {"valid": False, "errors": errors, "warnings": warnings}
+
+    # Processors: structure, types, properties
+    types, declared = {}, {}
+    for i, processor in enumerate(processors):
+        if not isinstance(processor, dict) or not processor.get("name") or not processor.get("type"):
+            errors.append(f"processors[{i}]: needs 'name' and 'type'")
+            continue
+        name, ptype = processor["name"], processor["type"]
+        if name in types:
+            errors.append(f"processors[{i}]: duplicate name '{name}'")
+            continue
+        types[name] = ptype
+        declared[name] = processor
+        if catalog is not None:
+            problem = catalog.check_type(ptype)
+            if problem:
+                errors.append(f"{name}: {problem}")
+                continue
+            properties = (processor.get("config") or {}).get("properties")
+            errors.extend(f"{name}: missing required property '{p}'"
+                          for p in catalog.missing_properties(ptype, properties))
+            warnings.extend(f"{name}: {problem}"
+                            for problem in catalog.property_errors(ptype, properties, required=False))
+        elif "." not in ptype:
+            errors.append(f"{name}: type '{ptype}' must be a fully qualified class name")
+
+    relationships = {name: _relationships(ptype, catalog) for name, ptype in types.items()}
+
+    def check_relationship(name, relationship, where):
+        known, authoritative, dynamic = relationships[name]
+        if known and relationship not in known and not dynamic:
+            report(authoritative, f"{where}: '{name}' has no relationship '{relationship}' "
+                                  f"(known: {', '.join(known)})")
+
+    # Connections: endpoints and relationships, building the graph as we go
+    edges = {name: [] for name in types}
+    edge_relationships = {}
+    connected = {name: set() for name in types}
+    for i, connection in enumerate(connections):
+        if not isinstance(connection, dict) or not connection.get("source") or not connection.get("target"):
+            errors.append(f"connections[{i}]: must be an object with 'source' and 'target'")
+            continue
+        source, target = connection["source"], connection["target"]
+        where = f"connections[{i}] ({source} -> {target})"
+        dangling = [n for n in (source, target) if n not in types]
+        for missing in dangling:
+            close = difflib.get_close_matches(missing, types, 1)
+            hint = f"; did you mean '{close[0]}'?" if close else ""
+            errors.append(f"{where}: unknown processor '{missing}'{hint}")
+        if dangling:
+            continue
+        selected = connection_relationships(connection)
+        if selected is None:
+            # What resolve_relationships and NiFi pick by default
+            selected = relationships[source][0][:1] or ["success"]
+        elif not selected or not all(isinstance(r, str) and r for r in selected):
+            errors.append(f"{where}: 'relationships' must be a non-empty list of names")
+            continue
+        for relationship in selected:
+            check_relationship(source, relationship, where)
+        connected[source].update(selected)
+        edges[source].append(target)
+        edge_relationships.setdefault((source, target), set()).update(r.lower() for r in selected)
+
+    # Relationships nobody handles make the processor invalid
+    for name, processor in declared.items():
+        known, authoritative, _ = relationships[name]
+        auto_terminated = (processor.get("config") or {}).get("autoTerminatedRelationships")
+        if auto_terminated is None:
+            if not auto_terminate:
+                for relationship in known:
+                    if relationship not in connected[name]:
+                        warnings.append(f"{name}: relationship '{relationship}' is neither connected nor "
+                                        f"auto-terminated, so the processor will be invalid")
+            continue
+        for relationship in auto_terminated:
+            check_relationship(name, relationship, f"{name} autoTerminatedRelationships")
+        for relationship in known:
+            if relationship not in connected[name] and relationship not in auto_terminated:
+                report(authoritative, f"{name}: relationship '{relationship}' is neither connected nor "
+                                      f"auto-terminated")
+
+    # Cycles: components with an edge inside them, unless one such edge breaks the loop
+    components = _strongly_connected(list(types), edges)
+    component_of = {name: i for i, component in enumerate(components) for name in component}
+    cyclic, breaks = set(), set()
+    for (source, target), selected in edge_relationships.items():
+        if component_of[source] == component_of[target]:
+            cyclic.add(component_of[source])
+            if selected & LOOP_RELATIONSHIPS:
+                breaks.add(component_of[source])
+    order = {name: i for i, name in enumerate(types)}
+    for i in sorted(cyclic - breaks):
+        members = sorted(components[i], key=order.get)
+        cycle = " -> ".join(members[:CYCLE_NAMES_SHOWN])
+        if len(members) > CYCLE_NAMES_SHOWN:
+            cycle += f" -> ... ({len(members)} processors)"
+        errors.append(f"cycle {cycle} has no loop-breaking relationship "
+                      f"({', '.join(sorted(LOOP_RELATIONSHIPS))}); FlowFiles would circulate forever")
+
+    return {"valid": not errors, "errors": errors, "warnings": warnings}
+
+
+def check_spec(spec, catalog=None, auto_terminate=True):
+    """Warnings of a valid ``spec``; raises ``SpecValidationError`` listing every error"""
+    result = validate_spec(spec, catalog, auto_terminate)
+    if result["errors"]:
+        raise SpecValidationError(result["errors"], result["warnings"])
+    return result["warnings"]
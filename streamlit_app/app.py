@@ -1,7 +1,10 @@
 import streamlit as st
 import sys
 import os
+import json
+import re
 import yaml
+from datetime import datetime
 from pathlib import Path
 
 # Add the src directory to the Python path
@@ -10,9 +13,13 @@ if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
 try:
-    from nifi_nl_builder.crew import NiFiNLCrew
+    from nifi_nl_builder.service import get_service, QueueFullError
+    from nifi_nl_builder.tools.nifi_api import list_process_groups, export_flow
+    from nifi_nl_builder.history import get_history
+    from nifi_nl_builder.tools.status_collector import StatusCollector, STATUS_INTERVAL, STATS_WINDOW
+    from nifi_nl_builder.metrics import REGISTRY
 except ImportError as e:
-    st.error(f"Failed to import NiFiNLCrew: {e}")
+    st.error(f"Failed to import the crew execution service: {e}")
     st.error(f"Python path: {sys.path}")
     st.stop()
 
@@ -37,17 +44,34 @@ def load_css():
 
 load_css()
 
+# Runs per page of Recent Executions (older pages load on demand)
+HISTORY_LIMIT = int(os.getenv("NIFI_NL_UI_HISTORY", "20"))
+# Seconds between progress refreshes of a running job
+POLL_INTERVAL = float(os.getenv("NIFI_NL_UI_POLL", "1.0"))
+# Seconds the list of process groups is reused across reruns
+GROUPS_TTL = float(os.getenv("NIFI_NL_UI_GROUPS_TTL", "30"))
+
 # Initialize session state
-if 'crew_manager' not in st.session_state:
-    st.session_state.crew_manager = None
-if 'execution_history' not in st.session_state:
-    st.session_state.execution_history = []
+if 'crew_service' not in st.session_state:
+    st.session_state.crew_service = None
+if 'history_cursors' not in st.session_state:
+    # ``before`` id of every loaded history page; None is the newest page
+    st.session_state.history_cursors = [None]
+if 'active_flow_name' not in st.session_state:
+    st.session_state.active_flow_name = None
+if 'watched_groups' not in st.session_state:
+    # Groups this session asked the shared collector to poll
+    st.session_state.watched_groups = []
+if 'active_job' not in st.session_state:
+    st.session_state.active_job = None
+if 'job_events' not in st.session_state:
+    st.session_state.job_events = []
 
 def initialize_crew():
-    """Initialize the NiFi NL Builder crew"""
+    """Warm up the shared crew execution service"""
     try:
-        if st.session_state.crew_manager is None:
-            st.session_state.crew_manager = NiFiNLCrew()
+        if st.session_state.crew_service is None:
+            st.session_state.crew_service = get_service().warm_up()
             st.success("Crew initialized successfully!")
         return True
     except FileNotFoundError as e:
@@ -63,6 +87,196 @@ def initialize_crew():
         st.info("Please check your environment variables and dependencies")
         return False
 
+UUID_PATTERN = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b")
+
+def find_process_group(result):
+    """First process group under root whose id appears in the crew output"""
+    ids = set(UUID_PATTERN.findall(str(result)))
+    if not ids:
+        return None
+    for group in list_process_groups("root"):
+        if group["id"] in ids:
+            return group
+    return None
+
+def record_execution(job, result, tool_calls):
+    """Persist a finished run, with a snapshot of the process group it created"""
+    group, snapshot = None, None
+    if job["status"] == "succeeded":
+        try:
+            group = find_process_group(result)
+            if group is not None:
+                snapshot = export_flow(group["id"])
+        except Exception as e:
+            st.caption(f"Flow snapshot skipped: {e}")
+    finished = job["finished_at"] or job["submitted_at"]
+    get_history().record_run(
+        job["description"], job["status"], result,
+        flow_name=group["component"]["name"] if group else st.session_state.active_flow_name,
+        process_group_id=group["id"] if group else None,
+        seconds=finished - (job["started_at"] or job["submitted_at"]),
+        tool_calls=tool_calls, snapshot=snapshot, job_id=job["id"]
+    )
+
+@st.cache_resource
+def get_status_collector():
+    """One background status poller shared by every session"""
+    return StatusCollector([]).start()
+
+@st.cache_data(ttl=GROUPS_TTL, show_spinner=False)
+def root_process_groups():
+    """Id -> name of the groups under root, shared by reruns and sessions for a short while"""
+    return {g["id"]: g["component"]["name"] for g in list_process_groups("root")}
+
+def update_watched_groups(watched):
+    """Add and release this session's watches on the shared collector"""
+    collector = get_status_collector()
+    previous = st.session_state.watched_groups
+    for pg_id in watched:
+        if pg_id not in previous:
+            collector.watch(pg_id)
+    for pg_id in previous:
+        if pg_id not in watched:
+            collector.unwatch(pg_id)
+    st.session_state.watched_groups = list(watched)
+
+@st.fragment(run_every=STATUS_INTERVAL)
+def show_flow_metrics(groups):
+    """Throughput and queue depth charts plus alerts for this session's watched groups"""
+    import pandas as pd
+    
+    collector = get_status_collector()
+    watched = st.session_state.watched_groups
+    for pg_id, error in list(collector.errors.items()):
+        if pg_id in watched:
+            st.error(f"Status of {groups.get(pg_id, pg_id)}: {error}")
+    for alert in collector.alerts():
+        if alert["root_id"] in watched:
+            st.warning(alert["message"], icon="🔥" if alert["level"] == "critical" else "⚠️")
+    
+    for pg_id in watched:
+        if pg_id not in collector.buffers:
+            st.caption(f"{groups.get(pg_id, pg_id)}: waiting for the first sample...")
+            continue
+        out = collector.history(pg_id, "flowFilesOut")
+        queued = collector.history(pg_id, "flowFilesQueued")
+        frame = pd.DataFrame({
+            "out/sec": [v / STATS_WINDOW for _, v in out],
+            "queued": [v for _, v in queued],
+        }, index=pd.to_datetime([t for t, _ in out], unit="s"))
+        st.markdown(f"**{groups.get(pg_id, pg_id)}**")
+        st.line_chart(frame, height=160)
+        p95 = collector.percentile(pg_id, "flowFilesQueued", 95)
+        if p95 is not None:
+            st.caption(f"p95 queued: {p95:,.0f} flowfiles · {len(out)} samples")
+
+def render_event(event):
+    """Show one task output or tool call of a running job"""
+    if event["type"] == "task":
+        label = f"✅ {event['task']} ({event['agent']})" + (" · cached" if event.get("cached") else "")
+        with st.expander(label):
+            st.markdown(event["output"])
+    elif event["type"] == "tool":
+        icon = "❌" if event["error"] else "🔧"
+        detail = event["error"] or f"{event['result_size']:,} chars"
+        st.caption(f"{icon} `{event['tool']}` · {event['latency'] * 1000:.0f} ms · {detail}")
+
+@st.fragment(run_every=POLL_INTERVAL)
+def show_job_progress():
+    """Poll the active job and stream its new events"""
+    service = st.session_state.crew_service
+    job_id = st.session_state.active_job
+    if service is None or job_id is None:
+        return
+    try:
+        job = service.status(job_id)
+    except KeyError:
+        st.session_state.active_job = None
+        return
+    
+    events = st.session_state.job_events
+    events.extend(service.events(job_id, since=events[-1]["seq"] + 1 if events else 0))
+    
+    st.subheader("⏳ Progress")
+    st.caption(f"Job `{job_id[:8]}` · {job['status']}")
+    for event in events:
+        render_event(event)
+    
+    if job["status"] in ("queued", "running"):
+        if st.button("⏹️ Cancel", key=f"cancel-{job_id}"):
+            service.cancel(job_id)
+        return
+    
+    result = job["error"]
+    if job["status"] == "succeeded":
+        result = service.result(job_id)
+        st.success("Flow generated successfully!")
+    else:
+        st.error(f"Flow generation {job['status'].replace('_', ' ')}: {job['error']}")
+    
+    record_execution(job, result, sum(1 for e in events if e["type"] == "tool"))
+    st.session_state.history_cursors = [None]
+    st.session_state.active_job = None
+    st.rerun()
+
+def show_run_details(run_id):
+    """Result and flow snapshot of one run, read from the store on demand"""
+    history = get_history()
+    run = history.get_run(run_id)
+    if run is None:
+        st.caption("This run has been pruned from the history")
+        return
+    st.text_area("Result", run["result"] or "", height=150, disabled=True, key=f"result-{run_id}")
+    if run["snapshot_hash"]:
+        snapshot = history.snapshot(run["snapshot_hash"])
+        st.download_button(
+            "Flow definition",
+            json.dumps(snapshot, indent=2),
+            file_name=f"{run['flow_name'] or 'flow'}.json",
+            key=f"snapshot-{run_id}"
+        )
+
+def reset_history_pages():
+    st.session_state.history_cursors = [None]
+
+def show_history():
+    """Pages of past runs from the persistent history store"""
+    history = get_history()
+    flow_names = history.flow_names()
+    flow_filter = None
+    if flow_names:
+        flow_filter = st.selectbox("Flow", [None] + flow_names, format_func=lambda n: n or "All flows",
+                                   key="history_flow", on_change=reset_history_pages)
+    # Each loaded page is one indexed keyset query; one extra row tells whether an older page exists
+    runs, older = [], False
+    for before in st.session_state.history_cursors:
+        rows = history.page(HISTORY_LIMIT + 1, before=before, flow_name=flow_filter)
+        older = len(rows) > HISTORY_LIMIT
+        runs += rows[:HISTORY_LIMIT]
+    if not runs:
+        st.info("No executions yet")
+        return
+    for run in runs:
+        timestamp = datetime.fromtimestamp(run["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        label = f"{timestamp} · {run['flow_name'] or 'unnamed'} · {run['status']}"
+        with st.expander(label):
+            st.text_area("Description", run["description"], height=100, disabled=True,
+                         key=f"description-{run['id']}")
+            details = []
+            if run["seconds"] is not None:
+                details.append(f"{run['seconds']:.1f}s")
+            if run["tool_calls"]:
+                details.append(f"{run['tool_calls']} NiFi tool calls")
+            if run["process_group_id"]:
+                details.append(f"group `{run['process_group_id']}`")
+            if details:
+                st.caption(" · ".join(details))
+            if st.toggle("Show result", key=f"details-{run['id']}"):
+                show_run_details(run["id"])
+    if older and st.button("Load older runs"):
+        st.session_state.history_cursors.append(runs[-1]["id"])
+        st.rerun()
+
 def main():
     # Header
     st.title("🔄 NiFi NL Builder")
@@ -135,56 +349,65 @@ def main():
                 priority = st.selectbox("Priority", ["Low", "Medium", "High"], index=1)
         
         # Execute button
-        if st.button("🚀 Generate & Deploy Flow", type="primary", disabled=not description.strip()):
-            if not st.session_state.crew_manager:
+        running = st.session_state.active_job is not None
+        if st.button("🚀 Generate & Deploy Flow", type="primary", disabled=running or not description.strip()):
+            if not st.session_state.crew_service:
                 st.error("Please initialize the crew first!")
                 return
             
-            with st.spinner("Processing your request..."):
-                try:
-                    # Execute the crew
-                    result = st.session_state.crew_manager.run(description)
-                    
-                    # Store in history
-                    st.session_state.execution_history.append({
-                        "description": description,
-                        "result": result,
-                        "timestamp": st.session_state.get("timestamp", "Now")
-                    })
-                    
-                    st.success("Flow generated successfully!")
-                    
-                except Exception as e:
-                    st.error(f"Error generating flow: {str(e)}")
+            try:
+                # Runs on a worker thread; the page polls it below
+                st.session_state.active_job = st.session_state.crew_service.submit(description)
+                st.session_state.active_flow_name = flow_name
+                st.session_state.job_events = []
+                st.rerun()
+            except QueueFullError as e:
+                st.error(f"Too many flows are being generated right now: {e}")
+        
+        if st.session_state.active_job is not None:
+            show_job_progress()
     
     with col2:
         st.header("📊 Status")
         
         # Crew status
-        if st.session_state.crew_manager:
+        if st.session_state.crew_service:
             st.success("✅ Crew Ready")
         else:
             st.warning("⚠️ Crew Not Initialized")
         
+        # Live flow metrics
+        st.subheader("Flow Monitoring")
+        try:
+            groups = root_process_groups()
+        except Exception as e:
+            groups = {}
+            st.caption(f"NiFi not reachable: {e}")
+        if groups:
+            watched = st.multiselect(
+                "Process groups to watch",
+                options=list(groups),
+                default=[g for g in st.session_state.watched_groups if g in groups],
+                format_func=lambda pg_id: groups[pg_id]
+            )
+            update_watched_groups(watched)
+            if watched:
+                show_flow_metrics(groups)
+        
+        # Where time and tokens went, process-wide
+        with st.expander("⏱️ Metrics"):
+            totals = REGISTRY.to_json()["totals"]
+            st.caption(
+                f"NiFi: {totals['nifi_requests']:.0f} calls, {totals['nifi_seconds']:.1f}s · "
+                f"Tools: {totals['tool_calls']:.0f} calls, {totals['tool_output_chars']:,.0f} chars · "
+                f"LLM: {totals['llm_calls']:.0f} calls, {totals['llm_seconds']:.1f}s, "
+                f"{totals['llm_prompt_tokens'] + totals['llm_completion_tokens']:,} tokens"
+            )
+            st.download_button("Prometheus", REGISTRY.to_prometheus(), file_name="metrics.prom")
+        
         # Recent executions
         st.subheader("Recent Executions")
-        if st.session_state.execution_history:
-            for i, execution in enumerate(reversed(st.session_state.execution_history[-5:])):
-                with st.expander(f"Execution {len(st.session_state.execution_history) - i}"):
-                    st.text_area(
-                        "Description",
-                        execution["description"],
-                        height=100,
-                        disabled=True
-                    )
-                    st.text_area(
-                        "Result",
-                        str(execution["result"]),
-                        height=150,
-                        disabled=True
-                    )
-        else:
-            st.info("No executions yet")
+        show_history()
     
     # Footer
     st.markdown("---")
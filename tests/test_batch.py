@@ -0,0 +1,64 @@
+"""
+Tests for batch mode's results file.
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from nifi_nl_builder.batch import run_batch  # noqa: E402
+
+CACHED_TASKS = ("parse_req", "plan_templates")
+TASKS = CACHED_TASKS + ("build_json", "deploy_flow")
+
+
+class CachingCrew:
+    """Reports tasks the way ``NiFiNLCrew.run`` does, caching the cacheable ones per description"""
+
+    cache = set()
+    lock = threading.Lock()
+
+    def run(self, description, use_cache=True, listener=None):
+        with self.lock:
+            hit = use_cache and description in self.cache
+            self.cache.add(description)
+        served = CACHED_TASKS if hit else ()
+        for task_id in served:
+            listener({"type": "task", "task": task_id, "agent": "agent", "output": task_id, "cached": True})
+        outputs = [SimpleNamespace(name=task_id, raw=f"{task_id} output")
+                   for task_id in TASKS if task_id not in served]
+        for output in outputs:
+            listener({"type": "task", "task": output.name, "agent": "agent", "output": output.raw, "cached": False})
+        return SimpleNamespace(raw=outputs[-1].raw, tasks_output=outputs, token_usage=None)
+
+
+def run(items, output, use_cache=True):
+    CachingCrew.cache = set()
+    run_batch(items, output, parallelism=1, use_cache=use_cache, crew_factory=CachingCrew)
+    with open(output) as f:
+        return {record["id"]: record for record in map(json.loads, f)}
+
+
+def test_records_tasks_served_from_cache(tmp_path):
+    items = [{"id": "first", "description": "copy files"},
+             {"id": "again", "description": "copy files"},
+             {"id": "other", "description": "tail a log"}]
+    records = run(items, tmp_path / "results.jsonl")
+
+    assert records["first"]["cached"] is False
+    assert records["first"]["cached_tasks"] == []
+    assert records["again"]["cached"] is True
+    assert records["again"]["cached_tasks"] == list(CACHED_TASKS)
+    assert records["other"]["cached"] is False
+
+
+def test_no_cache_never_reports_cached(tmp_path):
+    items = [{"id": "first", "description": "copy files"},
+             {"id": "again", "description": "copy files"}]
+    records = run(items, tmp_path / "results.jsonl", use_cache=False)
+
+    assert [r["cached"] for r in records.values()] == [False, False]
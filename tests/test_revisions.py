@@ -0,0 +1,40 @@
+"""
+Tests for the bounded entity/revision cache.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from nifi_nl_builder.tools.revisions import EntityCache  # noqa: E402
+
+
+def entity(component_id, version=0):
+    return {"id": component_id, "revision": {"version": version}, "component": {"name": component_id}}
+
+
+def test_least_recently_used_entity_is_evicted():
+    cache = EntityCache(limit=2)
+    cache.remember(entity("a"))
+    cache.remember(entity("b"))
+    cache.get("a")
+    cache.remember(entity("c"))
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+
+def test_older_revision_does_not_replace_newer():
+    cache = EntityCache()
+    cache.remember(entity("a", version=3))
+    cache.remember(entity("a", version=1))
+    assert cache.revision("a") == {"version": 3}
+
+
+def test_get_returns_a_copy():
+    cache = EntityCache()
+    cache.remember(entity("a"))
+    cache.get("a")["revision"]["version"] = 9
+    assert cache.revision("a") == {"version": 0}
@@ -0,0 +1,78 @@
+"""
+Tests for the shared process-group status collector.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from nifi_nl_builder.tools.status_collector import StatusCollector  # noqa: E402
+
+
+def group_status(pg_id):
+    processor = {"id": f"{pg_id}-proc", "name": "proc", "runStatus": "Running", "flowFilesOut": 3}
+    return {"processGroupStatus": {"aggregateSnapshot": {
+        "id": pg_id,
+        "name": pg_id,
+        "flowFilesQueued": 0,
+        "processorStatusSnapshots": [{"processorStatusSnapshot": processor}],
+    }}}
+
+
+class StatusClient:
+    """Answers status requests; ``during_fetch`` runs while a request is in flight"""
+
+    def __init__(self):
+        self.during_fetch = None
+
+    def get_group_status(self, pg_id, recursive=False):
+        if self.during_fetch is not None:
+            self.during_fetch(pg_id)
+        return group_status(pg_id)
+
+
+def test_poll_records_every_watched_group():
+    collector = StatusCollector(["a", "b"], client=StatusClient())
+    assert collector.poll_once() == 4
+    assert {info["root_id"] for info in collector.components.values()} == {"a", "b"}
+
+
+def test_last_unwatch_drops_history():
+    collector = StatusCollector([], client=StatusClient())
+    collector.watch("a")
+    collector.watch("a")
+    collector.poll_once()
+    collector.unwatch("a")
+    assert "a-proc" in collector.buffers
+    collector.unwatch("a")
+    assert collector.buffers == {} and collector.components == {}
+
+
+def test_unwatch_during_poll_does_not_bring_history_back():
+    client = StatusClient()
+    collector = StatusCollector([], client=client)
+    collector.watch("a")
+    collector.watch("b")
+    # Another session lets go of "a" while its status is being fetched
+    client.during_fetch = lambda pg_id: collector.unwatch("a") if pg_id == "a" else None
+
+    collector.poll_once()
+
+    assert collector.process_group_ids == ["b"]
+    assert {info["root_id"] for info in collector.components.values()} == {"b"}
+    assert set(collector.buffers) == {"b", "b-proc"}
+    assert "a" not in collector.errors
+
+
+def test_failed_fetch_of_unwatched_group_records_no_error():
+    collector = StatusCollector([], client=StatusClient())
+    collector.watch("a")
+
+    def fail(pg_id):
+        collector.unwatch(pg_id)
+        raise ConnectionError("NiFi unreachable")
+
+    collector.client.during_fetch = fail
+    collector.poll_once()
+    assert collector.errors == {}